@@ -0,0 +1,235 @@
+"""
+Benchmark de formatos de respuesta de georef-api
+
+Mide el tiempo de generación (y tamaño) de las respuestas HTTP de la API para
+distintos formatos, utilizando resultados sintéticos. Para los formatos
+binarios o de intercambio (JSON, MessagePack), también mide el tiempo de
+decodificación del lado del cliente. No requiere conexión a Elasticsearch ni
+a PostgreSQL.
+
+Para utilizar, ejecutar desde el directorio raíz del proyecto:
+
+$ make benchmark_formatter
+"""
+
+import argparse
+import copy
+import os
+import sys
+import time
+import timeit
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from service import app, formatter  # noqa: E402
+from service import names as N  # noqa: E402
+import geojson  # noqa: E402
+import json  # noqa: E402
+import msgpack  # noqa: E402
+from flask import jsonify, make_response  # noqa: E402
+
+DEFAULT_ITEMS = 5000
+DEFAULT_REPEAT = 5
+
+# Campos de las localidades generadas por 'build_localities'
+FIELDS = [N.ID, N.NAME, N.C_LAT, N.C_LON, N.STATE_ID, N.STATE_NAME,
+          N.DEPT_ID, N.DEPT_NAME, N.MUN_ID, N.MUN_NAME, N.LOCALITY_TYPE,
+          N.SOURCE]
+
+
+def build_localities(count):
+    """Genera una lista de localidades sintéticas, con la misma estructura
+    que los resultados obtenidos desde Elasticsearch.
+
+    Args:
+        count (int): Cantidad de localidades a generar.
+
+    Returns:
+        list: Localidades generadas.
+
+    """
+    return [
+        {
+            N.ID: '{:011d}'.format(i),
+            N.NAME: 'LOCALIDAD {}'.format(i),
+            N.CENTROID: {
+                N.LAT: -34.0 - i / 10000,
+                N.LON: -58.0 - i / 10000
+            },
+            N.STATE: {
+                N.ID: '06',
+                N.NAME: 'BUENOS AIRES'
+            },
+            N.DEPT: {
+                N.ID: '06427',
+                N.NAME: 'LA MATANZA'
+            },
+            N.MUN: {
+                N.ID: '064270',
+                N.NAME: 'LA MATANZA'
+            },
+            N.LOCALITY_TYPE: 'LOCALIDAD SIMPLE',
+            N.SOURCE: N.SOURCE_BAHRA
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_geojson_response(result):
+    """Implementación original de 'create_geojson_response', basada en los
+    objetos de la librería geojson. Se utiliza como punto de comparación.
+
+    Args:
+        result (list): Lista de entidades.
+
+    Returns:
+        flask.Response: Respuesta HTTP con contenido GeoJSON.
+
+    """
+    features = []
+    for item in result:
+        centroid = item.pop(N.CENTROID)
+        point = geojson.Point((centroid[N.LAT], centroid[N.LON]))
+        features.append(geojson.Feature(geometry=point, properties=item))
+
+    return make_response(jsonify(geojson.FeatureCollection(features)))
+
+
+def geojson_response(result):
+    return formatter.create_geojson_response(result, True)
+
+
+def json_response(result):
+    return formatter.create_ok_response(N.LOCALITIES, result, {
+        N.FORMAT: 'json',
+        N.FIELDS: FIELDS
+    })
+
+
+def msgpack_response(result):
+    return formatter.create_ok_response(N.LOCALITIES, result, {
+        N.FORMAT: 'msgpack',
+        N.FIELDS: FIELDS
+    })
+
+
+def json_bulk_response(result):
+    return formatter.create_ok_response_bulk(
+        N.LOCALITIES, bulk_results(result), bulk_formats(result))
+
+
+def msgpack_bulk_response(result):
+    return formatter.create_ok_response_bulk(
+        N.LOCALITIES, bulk_results(result), bulk_formats(result),
+        output_format='msgpack')
+
+
+def bulk_results(result, size=10):
+    # Simular consultas en lote de 'size' resultados cada una
+    return [result[i:i + size] for i in range(0, len(result), size)]
+
+
+def bulk_formats(result, size=10):
+    return [{N.FIELDS: FIELDS} for _ in range(0, len(result), size)]
+
+
+def decode_msgpack(data):
+    return msgpack.unpackb(data, raw=False)
+
+
+# Nombre del formato, función de creación de respuestas y función de
+# decodificación del contenido (o None).
+BENCHMARKS = [
+    ('geojson (librería geojson)', legacy_geojson_response, None),
+    ('geojson', geojson_response, None),
+    ('json', json_response, json.loads),
+    ('msgpack', msgpack_response, decode_msgpack),
+    ('json (lotes)', json_bulk_response, json.loads),
+    ('msgpack (lotes)', msgpack_bulk_response, decode_msgpack)
+]
+
+
+def run_benchmark(function, items, repeat):
+    """Ejecuta una función de creación de respuestas varias veces, y calcula
+    el mejor tiempo obtenido.
+
+    Args:
+        function (function): Función que toma una lista de resultados y
+            devuelve una respuesta HTTP.
+        items (list): Resultados a utilizar.
+        repeat (int): Cantidad de repeticiones.
+
+    Returns:
+        tuple: Mejor tiempo (en segundos) y contenido de la respuesta.
+
+    """
+    best = None
+    data = None
+
+    for _ in range(repeat):
+        # Los formateadores modifican los resultados, por lo que se utiliza
+        # una copia nueva en cada repetición.
+        result = copy.deepcopy(items)
+
+        start = timeit.default_timer()
+        with app.test_request_context():
+            data = function(result).get_data()
+        elapsed = timeit.default_timer() - start
+
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, data
+
+
+def run_decode_benchmark(decoder, data, repeat):
+    """Ejecuta una función de decodificación varias veces, y calcula el mejor
+    tiempo obtenido.
+
+    Args:
+        decoder (function): Función de decodificación.
+        data (bytes): Contenido a decodificar.
+        repeat (int): Cantidad de repeticiones.
+
+    Returns:
+        float: Mejor tiempo (en segundos).
+
+    """
+    return min(timeit.repeat(lambda: decoder(data), number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--items', metavar='<count>', type=int,
+                        default=DEFAULT_ITEMS,
+                        help='Cantidad de resultados por respuesta.')
+    parser.add_argument('-r', '--repeat', metavar='<count>', type=int,
+                        default=DEFAULT_REPEAT,
+                        help='Cantidad de repeticiones por formato.')
+    args = parser.parse_args()
+
+    items = build_localities(args.items)
+
+    print('Resultados por respuesta: {}'.format(args.items))
+    print('Fecha: {}'.format(time.strftime('%Y-%m-%d %H:%M:%S')))
+    print('')
+    print('{:<30}{:>12}{:>16}{:>14}{:>18}'.format(
+        'Formato', 'Tiempo (ms)', 'Resultados/s', 'Tamaño (KB)',
+        'Decodif. (ms)'))
+
+    for name, function, decoder in BENCHMARKS:
+        elapsed, data = run_benchmark(function, items, args.repeat)
+
+        if decoder:
+            decode_elapsed = '{:.1f}'.format(
+                run_decode_benchmark(decoder, data, args.repeat) * 1000)
+        else:
+            decode_elapsed = '-'
+
+        print('{:<30}{:>12.1f}{:>16.0f}{:>14.1f}{:>18}'.format(
+            name, elapsed * 1000, args.items / elapsed, len(data) / 1024,
+            decode_elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""
+Benchmark de perfiles de índices de georef-api
+
+Crea, en un nodo Elasticsearch local, una copia de un índice por cada perfil
+de configuración (ver 'INDEX_PROFILES' en 'elasticsearch_params.py'), a
+partir de un archivo de datos, y mide la latencia de búsquedas por nombre,
+por ID y por provincia sobre cada copia. Los índices creados se eliminan al
+terminar.
+
+El nodo debe contar con el archivo de sinónimos utilizado por los índices de
+la API (ver la guía de instalación). Para utilizar, ejecutar desde el
+directorio raíz del proyecto:
+
+$ make benchmark_index_profiles DATA_FILE=backups/calles.json DATA_TYPE=calles
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import timeit
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from elasticsearch import Elasticsearch, helpers  # noqa: E402
+from elasticsearch_params import INDEX_PROFILES, index_settings  # noqa: E402
+from elasticsearch_mappings import MAP_STATE, MAP_DEPT  # noqa: E402
+from elasticsearch_mappings import MAP_MUNI, MAP_SETTLEMENT  # noqa: E402
+from elasticsearch_mappings import MAP_STREET  # noqa: E402
+from service import data  # noqa: E402
+from service import names as N  # noqa: E402
+
+DEFAULT_HOST = 'localhost:9200'
+DEFAULT_QUERIES = 200
+INDEX_PREFIX = 'benchmark-'
+
+# Mapeo y clave de documentos por tipo de archivo de datos
+DATA_TYPES = {
+    N.STATES: (MAP_STATE, 'entidades'),
+    N.DEPARTMENTS: (MAP_DEPT, 'entidades'),
+    N.MUNICIPALITIES: (MAP_MUNI, 'entidades'),
+    N.LOCALITIES: (MAP_SETTLEMENT, 'entidades'),
+    N.STREETS: (MAP_STREET, 'vias')
+}
+
+
+def build_queries(docs, street_index, count):
+    """Genera búsquedas a partir de documentos elegidos al azar: una búsqueda
+    por nombre, una por ID y una por ID de provincia por documento.
+
+    Args:
+        docs (list): Documentos indexados.
+        street_index (bool): Verdadero si los documentos son calles.
+        count (int): Cantidad de documentos a utilizar.
+
+    Returns:
+        list: Tuplas (tipo de búsqueda, búsqueda de tipo Search).
+
+    """
+    builder = (data.build_streets_search if street_index
+               else data.build_entity_search)
+    id_param, name_param = (('street_id', 'road_name') if street_index
+                            else ('entity_id', 'name'))
+
+    queries = []
+    for doc in random.sample(docs, min(count, len(docs))):
+        queries.append(('nombre', builder(**{name_param: doc[N.NAME]})))
+        queries.append(('id', builder(**{id_param: doc[N.ID]})))
+        if N.STATE in doc:
+            queries.append(('provincia', builder(
+                state=doc[N.STATE][N.ID])))
+
+    return queries
+
+
+def create_index(es, index, mapping, settings, docs):
+    """Crea un índice y carga sus documentos.
+
+    Args:
+        es (Elasticsearch): Conexión a Elasticsearch.
+        index (str): Nombre del índice.
+        mapping (dict): Mapeo del índice.
+        settings (dict): Configuración del índice.
+        docs (list): Documentos a indexar.
+
+    Returns:
+        float: Tiempo de carga, en segundos.
+
+    """
+    start = timeit.default_timer()
+    es.indices.create(index=index, body={
+        'settings': settings,
+        'mappings': mapping
+    })
+
+    helpers.bulk(es, ({
+        '_index': index,
+        '_type': '_doc',
+        '_id': doc[N.ID],
+        '_source': doc
+    } for doc in docs))
+
+    es.indices.refresh(index=index)
+    return timeit.default_timer() - start
+
+
+def run_queries(es, index, queries):
+    """Ejecuta búsquedas sobre un índice y mide la latencia de cada una.
+
+    Args:
+        es (Elasticsearch): Conexión a Elasticsearch.
+        index (str): Nombre del índice.
+        queries (list): Tuplas (tipo de búsqueda, búsqueda de tipo Search).
+
+    Returns:
+        dict: Latencias (en segundos) por tipo de búsqueda.
+
+    """
+    latencies = {}
+    for kind, search in queries:
+        body = search.to_dict()
+        start = timeit.default_timer()
+        es.search(index=index, body=body, request_cache=False)
+        latencies.setdefault(kind, []).append(
+            timeit.default_timer() - start)
+
+    return latencies
+
+
+def percentile(values, p):
+    """Calcula un percentil de una lista de valores.
+
+    Args:
+        values (list): Valores (no vacía).
+        p (int): Percentil a calcular (0 a 100).
+
+    Returns:
+        float: Valor del percentil.
+
+    """
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('file', metavar='<path>',
+                        help='Archivo de datos (o backup) a indexar.')
+    parser.add_argument('-t', '--type', required=True,
+                        choices=list(DATA_TYPES),
+                        help='Tipo de entidad del archivo de datos.')
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                        help='Host del nodo Elasticsearch.')
+    parser.add_argument('-n', '--queries', metavar='<count>', type=int,
+                        default=DEFAULT_QUERIES,
+                        help='Cantidad de documentos a buscar por perfil.')
+    args = parser.parse_args()
+
+    with open(args.file) as f:
+        mapping, docs_key = DATA_TYPES[args.type]
+        docs = json.load(f)[docs_key]
+
+    # Descartar geometrías, al igual que en los índices sin geometría de
+    # la API.
+    for doc in docs:
+        doc.pop(N.GEOM, None)
+
+    es = Elasticsearch(args.host, timeout=300)
+    # Utilizar las mismas búsquedas en todos los perfiles
+    queries = build_queries(docs, args.type == N.STREETS, args.queries)
+
+    print('Documentos: {} ({})'.format(len(docs), args.type))
+    print('Nodo: {}'.format(args.host))
+    print('Fecha: {}'.format(time.strftime('%Y-%m-%d %H:%M:%S')))
+    print('')
+    print('{:<10}{:>8}{:>12}{:>12}{:>10}{:>10}{:>10}'.format(
+        'Perfil', 'Shards', 'Carga (s)', 'Búsqueda', 'p50 (ms)', 'p95 (ms)',
+        'Máx (ms)'))
+
+    for name, _, profile_settings in INDEX_PROFILES:
+        # En un nodo local, las réplicas no pueden ser asignadas.
+        settings = index_settings(profile_settings,
+                                  {'number_of_replicas': 0})
+        shards = settings['index']['number_of_shards']
+        index = INDEX_PREFIX + name
+
+        try:
+            load_time = create_index(es, index, mapping, settings, docs)
+            # Descartar la primera ejecución, para no medir la carga
+            # inicial de estructuras en memoria.
+            run_queries(es, index, queries)
+            latencies = run_queries(es, index, queries)
+        finally:
+            es.indices.delete(index=index, ignore=[404])
+
+        for kind, values in sorted(latencies.items()):
+            print('{:<10}{:>8}{:>12.1f}{:>12}{:>10.1f}{:>10.1f}{:>10.1f}'
+                  .format(name, shards, load_time, kind,
+                          percentile(values, 50) * 1000,
+                          percentile(values, 95) * 1000,
+                          max(values) * 1000))
+
+
+if __name__ == '__main__':
+    main()
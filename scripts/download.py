@@ -1,17 +1,35 @@
+import hashlib
+import json
+import os
 import requests
 import time
 
 DEFAULT_TRIES = 1
 RETRY_DELAY = 1
+CHUNK_SIZE = 1024 * 1024
+PART_SUFFIX = '.part'
+METADATA_SUFFIX = '.meta.json'
 
 
-def download(url, tries=DEFAULT_TRIES, retry_delay=RETRY_DELAY,
-             try_timeout=None, proxies=None, verify=True):
+def download_to_file(url, path, tries=DEFAULT_TRIES, retry_delay=RETRY_DELAY,
+                     try_timeout=None, proxies=None, verify=True,
+                     chunk_size=CHUNK_SIZE, previous=None):
     """
-    Descarga un archivo a través del protocolo HTTP, en uno o más intentos.
+    Descarga un archivo a través del protocolo HTTP, en uno o más intentos,
+    escribiendo su contenido a disco a medida que es recibido (sin cargarlo
+    completo en memoria).
+
+    El contenido se escribe primero en un archivo parcial ('path' + '.part');
+    si el mismo ya existe (por ejemplo, por un intento o una ejecución
+    anterior interrumpida), la descarga se continúa utilizando el header
+    'Range'. Si se especifican los metadatos de una descarga anterior del
+    mismo archivo, se utilizan los headers 'If-None-Match' e
+    'If-Modified-Since' para no descargarlo si no fue modificado, y se
+    compara el checksum SHA-256 del contenido descargado con el anterior.
 
     Args:
         url (str): URL (schema HTTP) del archivo a descargar.
+        path (str): Path donde escribir el archivo.
         tries (int): Intentos a realizar (default: 1).
         retry_delay (int o float): Tiempo a esperar, en segundos, entre cada
             intento.
@@ -19,14 +37,20 @@ def download(url, tries=DEFAULT_TRIES, retry_delay=RETRY_DELAY,
         proxies (dict): Proxies a utilizar. El diccionario debe contener los
             valores 'http' y 'https', cada uno asociados a la URL del proxy
             correspondiente.
+        chunk_size (int): Cantidad de bytes a escribir por vez.
+        previous (dict): Metadatos de una descarga anterior (ver
+            'read_metadata').
 
     Returns:
-        bytes: Contenido del archivo
+        dict: Metadatos de la descarga ('url', 'etag', 'last_modified',
+            'sha256' y 'size'), o None si el archivo no fue modificado desde
+            la descarga anterior (en cuyo caso 'path' no es escrito).
+
     """
     for i in range(tries):
         try:
-            return requests.get(url, timeout=try_timeout, proxies=proxies,
-                                verify=verify).content
+            return _download_to_file(url, path, try_timeout, proxies, verify,
+                                     chunk_size, previous)
         except Exception as e:
             download_exception = e
 
@@ -34,3 +58,161 @@ def download(url, tries=DEFAULT_TRIES, retry_delay=RETRY_DELAY,
                 time.sleep(retry_delay)
 
     raise download_exception
+
+
+def _download_to_file(url, path, timeout, proxies, verify, chunk_size,
+                      previous):
+    """Realiza un intento de descarga (ver 'download_to_file').
+
+    Returns:
+        dict: Metadatos de la descarga, o None si el archivo no fue
+            modificado.
+
+    """
+    part_path = path + PART_SUFFIX
+    part_metadata = read_metadata(part_path)
+    # Evitar compresión, ya que los rangos deben corresponder a los bytes
+    # escritos en el archivo parcial.
+    headers = {'Accept-Encoding': 'identity'}
+
+    validator = None
+    if part_metadata and part_metadata['url'] == url and \
+       os.path.exists(part_path):
+        validator = part_metadata['etag'] or part_metadata['last_modified']
+
+    # Posición desde la cual se solicita el contenido (None si se solicita
+    # el archivo completo)
+    offset = None
+    if validator:
+        # Si el archivo fue modificado, el servidor responde con el archivo
+        # completo (If-Range).
+        offset = os.path.getsize(part_path)
+        headers['Range'] = 'bytes={}-'.format(offset)
+        headers['If-Range'] = validator
+    elif previous and previous['url'] == url:
+        if previous['etag']:
+            headers['If-None-Match'] = previous['etag']
+        if previous['last_modified']:
+            headers['If-Modified-Since'] = previous['last_modified']
+
+    digest = hashlib.sha256()
+
+    with requests.get(url, headers=headers, timeout=timeout, proxies=proxies,
+                      verify=verify, stream=True) as response:
+        if response.status_code == 304:
+            return None
+
+        if response.status_code == 416 or (
+                response.status_code == 206 and
+                content_range_start(response) != offset):
+            if offset is None:
+                raise requests.HTTPError(
+                    'Respuesta parcial no solicitada', response=response)
+
+            # El rango no es válido (por ejemplo, el archivo parcial está
+            # completo o es más grande que el archivo actual), o el servidor
+            # respondió con un rango distinto al solicitado: descargar
+            # nuevamente desde el comienzo.
+            _remove(part_path)
+            _remove(metadata_filepath(part_path))
+            return _download_to_file(url, path, timeout, proxies, verify,
+                                     chunk_size, previous)
+
+        response.raise_for_status()
+
+        metadata = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        }
+
+        if response.status_code == 206:
+            mode = 'ab'
+            with open(part_path, 'rb') as f:
+                for block in iter(lambda: f.read(chunk_size), b''):
+                    digest.update(block)
+        else:
+            mode = 'wb'
+
+        write_metadata(part_path, metadata)
+
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size):
+                f.write(chunk)
+                digest.update(chunk)
+
+    metadata['sha256'] = digest.hexdigest()
+    metadata['size'] = os.path.getsize(part_path)
+    _remove(metadata_filepath(part_path))
+
+    if previous and previous['sha256'] == metadata['sha256']:
+        _remove(part_path)
+        return None
+
+    os.replace(part_path, path)
+    return metadata
+
+
+def content_range_start(response):
+    """Obtiene la posición inicial del contenido de una respuesta parcial
+    (HTTP 206), a partir del header 'Content-Range'.
+
+    Args:
+        response (requests.Response): Respuesta HTTP.
+
+    Returns:
+        int: Posición inicial del contenido, o None si el header no existe
+            o no es válido.
+
+    """
+    unit, _, content_range = response.headers.get(
+        'Content-Range', '').partition(' ')
+    start = content_range.partition('-')[0]
+
+    if unit != 'bytes' or not start.isdigit():
+        return None
+
+    return int(start)
+
+
+def metadata_filepath(path):
+    return path + METADATA_SUFFIX
+
+
+def read_metadata(path):
+    """Lee los metadatos de descarga de un archivo.
+
+    Args:
+        path (str): Path del archivo descargado.
+
+    Returns:
+        dict: Metadatos de la descarga, o None si no existen.
+
+    """
+    try:
+        with open(metadata_filepath(path)) as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    for key in ['url', 'etag', 'last_modified', 'sha256']:
+        metadata.setdefault(key, None)
+
+    return metadata
+
+
+def write_metadata(path, metadata):
+    """Escribe los metadatos de descarga de un archivo.
+
+    Args:
+        path (str): Path del archivo descargado.
+        metadata (dict): Metadatos de la descarga.
+
+    """
+    with open(metadata_filepath(path), 'w') as f:
+        json.dump(metadata, f)
+
+
+def _remove(path):
+    if os.path.exists(path):
+        os.remove(path)
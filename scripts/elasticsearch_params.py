@@ -15,6 +15,45 @@ NAME_ANALYZER = 'name_analyzer'
 NAME_ANALYZER_SYNONYMS = 'name_analyzer_synonyms'
 
 
+# Cantidad máxima de resultados por búsqueda (igual al máximo valor del
+# parámetro 'max' de la API).
+MAX_RESULT_WINDOW = 5000
+
+# Perfiles de configuración de índices, según la cantidad de documentos a
+# indexar: los índices pequeños utilizan un único shard (cada búsqueda se
+# ejecuta sobre un solo shard por réplica), y los grandes distribuyen sus
+# documentos en más shards. Ya que los índices no se modifican luego de ser
+# creados, el intervalo de refresco es alto en todos los perfiles (ver
+# 'index_settings'). Para medir la latencia de búsquedas con cada perfil,
+# utilizar 'benchmark_index_profiles.py'.
+INDEX_PROFILES = [
+    ('pequeño', 10000, {
+        'number_of_shards': 1,
+        'number_of_replicas': 2,
+        'refresh_interval': '30s',
+        'max_result_window': MAX_RESULT_WINDOW
+    }),
+    ('mediano', 100000, {
+        'number_of_shards': 2,
+        'number_of_replicas': 2,
+        'refresh_interval': '30s',
+        'max_result_window': MAX_RESULT_WINDOW
+    }),
+    ('grande', None, {
+        'number_of_shards': 5,
+        'number_of_replicas': 2,
+        'refresh_interval': '30s',
+        'max_result_window': MAX_RESULT_WINDOW
+    })
+]
+
+# Configuración adicional para índices con geometrías: los documentos son
+# grandes y se leen poco frecuentemente, por lo que se prioriza reducir su
+# tamaño en disco.
+GEOM_INDEX_SETTINGS = {
+    'codec': 'best_compression'
+}
+
 DEFAULT_SETTINGS = {
     'index': {
         'number_of_shards': 5,
@@ -63,3 +102,43 @@ DEFAULT_SETTINGS = {
         }
     }
 }
+
+
+def index_profile(doc_count):
+    """Selecciona el perfil de configuración de un índice según su cantidad
+    de documentos.
+
+    Args:
+        doc_count (int): Cantidad de documentos a indexar.
+
+    Returns:
+        tuple: Nombre y configuración del perfil.
+
+    """
+    for name, max_docs, settings in INDEX_PROFILES:
+        if max_docs is None or doc_count <= max_docs:
+            return name, settings
+
+    raise RuntimeError('No existe un perfil para {} documentos.'.format(
+        doc_count))
+
+
+def index_settings(profile_settings, overrides=None):
+    """Genera la configuración completa de un índice, a partir de
+    'DEFAULT_SETTINGS' y de la configuración de un perfil.
+
+    Args:
+        profile_settings (dict): Configuración del perfil (ver
+            'INDEX_PROFILES').
+        overrides (dict): Configuración adicional específica del índice
+            (opcional).
+
+    Returns:
+        dict: Configuración del índice.
+
+    """
+    settings = dict(DEFAULT_SETTINGS)
+    settings['index'] = dict(DEFAULT_SETTINGS['index'])
+    settings['index'].update(profile_settings)
+    settings['index'].update(overrides or {})
+    return settings
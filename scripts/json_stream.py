@@ -0,0 +1,225 @@
+"""Módulo 'json_stream' de georef-api
+
+Contiene funciones que leen archivos JSON de datos incrementalmente, sin
+cargar su contenido completo en memoria. Los archivos de datos contienen un
+objeto JSON con metadatos (por ejemplo, 'timestamp' y 'version') y un arreglo
+de documentos (por ejemplo, 'entidades' o 'vias'), que puede ser muy grande.
+"""
+
+import json
+import re
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+# Caracteres que pueden continuar un número JSON
+NUMBER_CHARS = '0123456789+-.eE'
+
+
+class JSONStreamParser:
+    """Lee un objeto JSON desde un archivo de texto de forma incremental.
+    Cada valor del objeto (o de su arreglo de documentos) se decodifica con
+    'json.JSONDecoder.raw_decode' a medida que es leído.
+
+    Attributes:
+        _file (file): Archivo de texto a leer.
+        _chunk_size (int): Cantidad mínima de caracteres a leer por vez.
+        _decoder (json.JSONDecoder): Decodificador de valores JSON.
+        _buffer (str): Contenido leído y todavía no procesado.
+        _pos (int): Posición actual dentro de '_buffer'.
+        _eof (bool): Verdadero si se terminó de leer el archivo.
+
+    """
+
+    def __init__(self, f, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Inicializa un objeto de tipo 'JSONStreamParser'.
+
+        Args:
+            f (file): Archivo de texto a leer.
+            chunk_size (int): Cantidad mínima de caracteres a leer por vez.
+
+        """
+        self._file = f
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def members(self, array_key):
+        """Recorre los miembros del objeto JSON. El valor del miembro
+        'array_key' no es decodificado completo: en su lugar, se devuelve un
+        generador de sus elementos. Si el generador no es consumido, sus
+        elementos son descartados al continuar la iteración.
+
+        Args:
+            array_key (str): Clave del arreglo de documentos.
+
+        Yields:
+            tuple: Clave y valor de cada miembro del objeto.
+
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+
+        while True:
+            key = self._value()
+            self._expect(':')
+
+            if key == array_key:
+                items = self._array_items()
+                yield key, items
+
+                for _ in items:
+                    pass
+            else:
+                yield key, self._value()
+
+            if self._expect(',}') == '}':
+                return
+
+    def _array_items(self):
+        """Recorre los elementos de un arreglo JSON.
+
+        Yields:
+            object: Elementos del arreglo, decodificados.
+
+        """
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+
+        while True:
+            yield self._value()
+
+            if self._expect(',]') == ']':
+                return
+
+    def _fill(self, size):
+        """Lee más contenido del archivo, descartando el contenido ya
+        procesado de '_buffer'.
+
+        Args:
+            size (int): Cantidad de caracteres a leer.
+
+        """
+        data = self._file.read(size)
+        if not data:
+            self._eof = True
+
+        self._buffer = self._buffer[self._pos:] + data
+        self._pos = 0
+
+    def _peek(self):
+        """Omite espacios en blanco y devuelve el próximo caracter, sin
+        consumirlo.
+
+        Returns:
+            str: Próximo caracter, o '' si se terminó el archivo.
+
+        """
+        while True:
+            self._pos = WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer) or self._eof:
+                return self._buffer[self._pos:self._pos + 1]
+
+            self._fill(self._chunk_size)
+
+    def _expect(self, chars):
+        """Consume el próximo caracter, que debe ser uno de 'chars'.
+
+        Args:
+            chars (str): Caracteres esperados.
+
+        Raises:
+            ValueError: Si el próximo caracter no es uno de los esperados.
+
+        Returns:
+            str: Caracter consumido.
+
+        """
+        char = self._peek()
+        if not char or char not in chars:
+            raise ValueError('Se esperaba uno de {!r} (se encontró {!r}).'
+                             .format(chars, char))
+
+        self._pos += 1
+        return char
+
+    def _value(self):
+        """Decodifica el próximo valor JSON. Si el valor no está completo en
+        '_buffer', se lee más contenido (duplicando la cantidad leída en cada
+        intento, para que valores muy grandes no sean decodificados
+        demasiadas veces).
+
+        Raises:
+            json.JSONDecodeError: Si el contenido no es JSON válido.
+
+        Returns:
+            object: Valor decodificado.
+
+        """
+        self._peek()
+
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+
+                # Un número seguido del final de '_buffer' (o de un
+                # caracter que puede continuarlo) puede estar incompleto:
+                # por ejemplo, '-2.5' decodificado como -2 a partir de '-2.'.
+                if self._eof or (end < len(self._buffer) and
+                                 self._buffer[end] not in NUMBER_CHARS):
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+
+            self._fill(max(self._chunk_size, len(self._buffer)))
+
+
+def read_metadata(path, array_key):
+    """Lee los metadatos de un archivo de datos, y cuenta sus documentos.
+    Los documentos son decodificados y descartados uno a uno.
+
+    Args:
+        path (str): Path del archivo.
+        array_key (str): Clave del arreglo de documentos.
+
+    Returns:
+        tuple: Diccionario de metadatos (todos los miembros del objeto
+            excepto 'array_key'), y cantidad de documentos.
+
+    """
+    metadata, count = {}, 0
+
+    with open(path, encoding='utf-8') as f:
+        for key, value in JSONStreamParser(f).members(array_key):
+            if key == array_key:
+                count = sum(1 for _ in value)
+            else:
+                metadata[key] = value
+
+    return metadata, count
+
+
+def iter_documents(path, array_key):
+    """Recorre los documentos de un archivo de datos, leyendo el archivo
+    incrementalmente.
+
+    Args:
+        path (str): Path del archivo.
+        array_key (str): Clave del arreglo de documentos.
+
+    Yields:
+        dict: Documentos del archivo.
+
+    """
+    with open(path, encoding='utf-8') as f:
+        for key, value in JSONStreamParser(f).members(array_key):
+            if key == array_key:
+                yield from value
+                return
@@ -0,0 +1,106 @@
+"""Módulo 'throttle' de georef-api
+
+Contiene utilidades para limitar la velocidad de indexación de documentos, de
+forma que la indexación no afecte la latencia de las búsquedas realizadas
+sobre el mismo cluster de Elasticsearch.
+"""
+
+import threading
+import time
+
+
+class ThrottledIterator:
+    """Iterador que puede ser compartido entre varios threads, y que limita
+    la velocidad a la cual se obtienen sus elementos.
+
+    La velocidad se limita de dos formas (ambas opcionales): con una cantidad
+    máxima de elementos por segundo, y pausando la iteración mientras la cola
+    del thread pool 'search' de algún nodo del cluster supere un tamaño
+    máximo (modo adaptativo).
+
+    Attributes:
+        _iterator (iterator): Iterador de elementos.
+        _lock (threading.Lock): Lock utilizado para acceder a '_iterator'.
+        _es (Elasticsearch): Conexión a Elasticsearch (modo adaptativo).
+        _interval (float): Tiempo mínimo entre elementos, en segundos.
+        _next_time (float): Momento a partir del cual puede obtenerse el
+            próximo elemento.
+        _max_search_queue (int): Tamaño máximo de la cola de búsquedas.
+        _check_interval (float): Tiempo entre consultas del tamaño de la
+            cola de búsquedas, en segundos.
+        _next_check (float): Momento de la próxima consulta del tamaño de la
+            cola de búsquedas.
+        paused_time (float): Tiempo total de pausa por búsquedas encoladas.
+
+    """
+
+    def __init__(self, iterable, max_rate=0, es=None, max_search_queue=0,
+                 check_interval=5):
+        """Inicializa un objeto de tipo 'ThrottledIterator'.
+
+        Args:
+            iterable (iterable): Elementos a iterar.
+            max_rate (float): Cantidad máxima de elementos por segundo (0
+                para no limitar).
+            es (Elasticsearch): Conexión a Elasticsearch, utilizada para
+                consultar el tamaño de las colas de búsquedas (opcional).
+            max_search_queue (int): Tamaño máximo de la cola de búsquedas de
+                cada nodo (0 para no consultarlo).
+            check_interval (float): Tiempo entre consultas del tamaño de la
+                cola de búsquedas, en segundos.
+
+        """
+        self._iterator = iter(iterable)
+        self._lock = threading.Lock()
+        self._es = es
+        self._interval = 1 / max_rate if max_rate else 0
+        self._next_time = time.monotonic()
+        self._max_search_queue = max_search_queue if es else 0
+        self._check_interval = check_interval
+        self._next_check = time.monotonic()
+        self.paused_time = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with self._lock:
+            if self._max_search_queue:
+                self._wait_search_queue()
+
+            if self._interval:
+                delay = self._next_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+                self._next_time = max(self._next_time, time.monotonic()) + \
+                    self._interval
+
+            return next(self._iterator)
+
+    def search_queue_size(self):
+        """Obtiene el tamaño de la cola del thread pool 'search' más grande
+        entre los nodos del cluster.
+
+        Returns:
+            int: Tamaño de la cola.
+
+        """
+        pools = self._es.cat.thread_pool('search', format='json',
+                                         h='node_name,queue')
+        return max((int(pool['queue']) for pool in pools), default=0)
+
+    def _wait_search_queue(self):
+        """Pausa la iteración mientras la cola de búsquedas supere el tamaño
+        máximo. El tamaño se consulta cada '_check_interval' segundos.
+
+        """
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+
+        while self.search_queue_size() > self._max_search_queue:
+            time.sleep(self._check_interval)
+            self.paused_time += self._check_interval
+
+        self._next_check = time.monotonic() + self._check_interval
@@ -2,23 +2,36 @@ import download
 
 from elasticsearch import Elasticsearch
 from elasticsearch import helpers
-from elasticsearch_params import DEFAULT_SETTINGS
+from elasticsearch_params import GEOM_INDEX_SETTINGS
+from elasticsearch_params import index_profile, index_settings
 from elasticsearch_mappings import MAP_STATE, MAP_STATE_GEOM
 from elasticsearch_mappings import MAP_DEPT, MAP_DEPT_GEOM
 from elasticsearch_mappings import MAP_MUNI, MAP_MUNI_GEOM
 from elasticsearch_mappings import MAP_SETTLEMENT, MAP_SETTLEMENT_GEOM
 from elasticsearch_mappings import MAP_STREET
+from throttle import ThrottledIterator
+import json_stream
 import psycopg2
 
 from flask import Flask
 import argparse
+import functools
+import hashlib
+import itertools
 import os
+import shutil
 from io import StringIO
 import urllib.parse
 import json
 import smtplib
+import subprocess
+import sys
+import threading
+import time
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import Future, as_completed
 import logging
 import uuid
 from datetime import datetime
@@ -31,9 +44,69 @@ logger = logging.getLogger(__name__)
 # nuevas versiones de los archivos.
 FILE_VERSION = '2.0.0'
 
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SEPARATOR_WIDTH = 60
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
 ACTIONS = ['index', 'index_stats', 'run_sql']
 
+# Cantidad por defecto de grupos de índices creados simultáneamente (ver
+# 'run_index')
+DEFAULT_INDEX_WORKERS = 2
+
+# Valores por defecto de la descarga de archivos de datos (ver
+# 'GeorefIndexGroup.download_file'). Los archivos se descargan
+# simultáneamente, utilizando hasta 'workers' threads.
+DOWNLOAD_DEFAULTS = {
+    'workers': 5,
+    'tries': 3,
+    'retry_delay': 5,
+    'timeout': None
+}
+
+# Valores por defecto de la carga rápida de índices (ver
+# 'GeorefIndex.finish_fast_load')
+FAST_LOAD_DEFAULTS = {
+    'enabled': True,
+    'max_segments': 1,
+    'green_timeout': '10m'
+}
+
+# Valores por defecto de la inserción de documentos (ver
+# 'GeorefIndexGroup.insert_documents'). Un valor de 'processes' igual a 0
+# utiliza un proceso por CPU.
+BULK_DEFAULTS = {
+    'threads': 4,
+    'chunk_size': 1000,
+    'chunk_bytes': 10 * 1024 * 1024,
+    'processes': 0,
+    'process_min_docs': 100000,
+    'max_retries': 5,
+    'initial_backoff': 2,
+    'max_backoff': 60,
+    'max_docs_per_second': 0,
+    'max_search_queue': 0,
+    'queue_check_interval': 5
+}
+# Valores por defecto del modo delta (ver 'GeorefIndexGroup.plan_delta').
+# 'max_changes' es la proporción máxima de documentos modificados o
+# eliminados a partir de la cual se crea el índice completo.
+DELTA_DEFAULTS = {
+    'enabled': False,
+    'max_changes': 0.2
+}
+# Segundos entre consultas del estado de una copia de índice, y cantidad de
+# IDs eliminados por request (ver 'GeorefIndex.copy_index' y
+# 'GeorefIndex.delete_documents')
+REINDEX_POLL_INTERVAL = 5
+DELETE_CHUNK_SIZE = 1000
+
+# Cantidad de documentos enviados juntos a cada proceso al serializar, y
+# cantidad de documentos leídos por vez para ser serializados (ver
+# 'map_batches')
+PROCESS_CHUNK_SIZE = 1000
+PROCESS_BATCH_SIZE = 50000
+
 
 def setup_logger(l, loggerStream):
     l.setLevel(logging.INFO)
@@ -44,8 +117,7 @@ def setup_logger(l, loggerStream):
     strHandler = logging.StreamHandler(loggerStream)
     strHandler.setLevel(logging.INFO)
 
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s',
-                                  '%Y-%m-%d %H:%M:%S')
+    formatter = logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT)
     stdoutHandler.setFormatter(formatter)
     strHandler.setFormatter(formatter)
 
@@ -53,6 +125,92 @@ def setup_logger(l, loggerStream):
     l.addHandler(strHandler)
 
 
+class ThreadLogBuffer(logging.Filter):
+    """Filtro de logs que, en los threads donde fue activado, retiene los
+    registros en lugar de emitirlos. Permite crear varios índices
+    simultáneamente manteniendo separados los logs de cada uno: los
+    registros retenidos se emiten juntos al terminar (ver 'run_index'), y
+    opcionalmente se escriben a medida que se generan en un handler propio
+    del thread (por ejemplo, un archivo de log por grupo de índices).
+
+    Attributes:
+        _local (threading.local): Registros retenidos por el thread actual
+            (atributo 'records', o None si el filtro no fue activado), y
+            handler del thread (atributo 'handler').
+
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+
+    def start(self, records=None, handler=None):
+        """Comienza a retener los registros del thread actual.
+
+        Args:
+            records (list): Lista donde almacenar los registros (opcional).
+            handler (logging.Handler): Handler al cual enviar cada registro
+                retenido al momento de generarse (opcional).
+
+        """
+        self._local.records = [] if records is None else records
+        self._local.handler = handler
+
+    def stop(self):
+        """Deja de retener los registros del thread actual.
+
+        Returns:
+            list: Registros retenidos.
+
+        """
+        records = getattr(self._local, 'records', None)
+        self._local.records = None
+        self._local.handler = None
+        return records or []
+
+    def bind(self, function):
+        """Crea una versión de una función que, al ser ejecutada en otro
+        thread, retiene sus registros en el mismo lugar que el thread
+        actual.
+
+        Args:
+            function (function): Función a ejecutar.
+
+        Returns:
+            function: Función que retiene sus registros.
+
+        """
+        records = getattr(self._local, 'records', None)
+        if records is None:
+            return function
+
+        handler = self._local.handler
+
+        def bound(*args, **kwargs):
+            self.start(records, handler)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.stop()
+
+        return bound
+
+    def filter(self, record):
+        records = getattr(self._local, 'records', None)
+        if records is None:
+            return True
+
+        records.append(record)
+        if self._local.handler:
+            self._local.handler.handle(record)
+
+        return False
+
+
+log_buffer = ThreadLogBuffer()
+logger.addFilter(log_buffer)
+
+
 def send_email(host, user, password, subject, message, recipients,
                attachments=None):
     with smtplib.SMTP_SSL(host) as smtp:
@@ -83,16 +241,310 @@ def print_log_separator(l, message):
     l.info("=" * SEPARATOR_WIDTH)
 
 
+def is_url(path):
+    return urllib.parse.urlparse(path).scheme in ['http', 'https']
+
+
+def completed_future(function):
+    """Ejecuta una función, y devuelve su resultado (o excepción) como un
+    objeto Future.
+
+    Args:
+        function (function): Función a ejecutar.
+
+    Returns:
+        Future: Resultado de la función.
+
+    """
+    future = Future()
+    try:
+        future.set_result(function())
+    except Exception as e:
+        future.set_exception(e)
+
+    return future
+
+
+class DataFile:
+    """Representa un archivo de datos ya descargado (o accedido) y
+    validado. Los documentos del archivo no se mantienen en memoria: se leen
+    incrementalmente desde disco cada vez que son necesarios.
+
+    Attributes:
+        path (str): Path local del archivo.
+        docs_key (str): Clave del arreglo de documentos.
+        metadata (dict): Metadatos del archivo ('timestamp', 'version',
+            etc.).
+        count (int): Cantidad de documentos.
+        temporary (bool): Verdadero si el archivo fue descargado, y debe ser
+            eliminado si no se lo utiliza como backup.
+        download_metadata (dict): Metadatos de la descarga del archivo (ver
+            'download.download_to_file'), o None.
+
+    """
+
+    def __init__(self, path, docs_key, temporary=False,
+                 download_metadata=None):
+        self.path = path
+        self.docs_key = docs_key
+        self.temporary = temporary
+        self.download_metadata = download_metadata
+        self.metadata, self.count = json_stream.read_metadata(path, docs_key)
+
+    def __getitem__(self, key):
+        return self.metadata[key]
+
+    def documents(self):
+        """Recorre los documentos del archivo.
+
+        Returns:
+            iterator: Documentos del archivo.
+
+        """
+        return json_stream.iter_documents(self.path, self.docs_key)
+
+
 class GeorefIndex:
-    def __init__(self, alias, filepath, backup_filepath, mapping,
-                 excludes=None, docs_key='entidades'):
+    def __init__(self, alias, mapping, excludes=None, routed=False,
+                 settings=None):
         self.alias = alias
-        self.docs_key = docs_key
-        self.filepath = filepath
-        self.backup_filepath = backup_filepath
+        self.routed = routed
+        self.settings = settings
         self.mapping = mapping
         self.excludes = excludes or []
 
+    def create_index(self, es, index, doc_count, fast_load=False):
+        """Crea un índice, utilizando el perfil de configuración
+        correspondiente a su cantidad de documentos. Si se utiliza carga
+        rápida, el índice se crea sin réplicas y sin refresco periódico, y
+        la configuración del perfil debe ser restaurada luego de insertar los
+        documentos (ver 'finish_fast_load').
+
+        Args:
+            es (Elasticsearch): Conexión a Elasticsearch.
+            index (str): Nombre del índice.
+            doc_count (int): Cantidad de documentos a indexar.
+            fast_load (bool): Crear el índice para carga rápida.
+
+        Returns:
+            dict: Configuración del perfil del índice.
+
+        """
+        profile, profile_settings = index_profile(doc_count)
+        settings = index_settings(profile_settings, self.settings)
+
+        logger.info('Creando nuevo índice: {}...'.format(index))
+        logger.info(' + Perfil: {} ({} shards, {} réplicas)'.format(
+            profile, settings['index']['number_of_shards'],
+            settings['index']['number_of_replicas']))
+
+        create_settings = settings
+        if fast_load:
+            logger.info(' + Utilizando carga rápida (sin réplicas ni '
+                        'refresco).')
+            create_settings = index_settings(settings['index'], {
+                'number_of_replicas': 0,
+                'refresh_interval': '-1'
+            })
+
+        logger.info('')
+        es.indices.create(index=index, body={
+            'settings': create_settings,
+            'mappings': self.mapping
+        })
+
+        return settings
+
+    def finish_fast_load(self, es, index, settings, load_config):
+        """Finaliza la carga rápida de un índice: restaura la cantidad de
+        réplicas y el intervalo de refresco de su perfil, reduce la cantidad
+        de segmentos del índice (force merge) y espera a que todas sus
+        réplicas estén asignadas (estado 'green'). Si las réplicas no son
+        asignadas antes de 'green_timeout', se continúa de todas formas, ya
+        que los shards primarios ya contienen todos los documentos.
+
+        Args:
+            es (Elasticsearch): Conexión a Elasticsearch.
+            index (str): Nombre del índice.
+            settings (dict): Configuración del perfil del índice.
+            load_config (dict): Configuración de carga rápida.
+
+        Returns:
+            list: Tuplas (fase, duración en segundos).
+
+        """
+        timings = []
+
+        logger.info('Finalizando carga rápida...')
+        start = time.monotonic()
+        es.indices.refresh(index=index)
+        es.indices.forcemerge(index=index,
+                              max_num_segments=load_config['max_segments'])
+        timings.append(('Force merge', time.monotonic() - start))
+
+        start = time.monotonic()
+        es.indices.put_settings(index=index, body={'index': {
+            'number_of_replicas': settings['index']['number_of_replicas'],
+            'refresh_interval': settings['index']['refresh_interval']
+        }})
+
+        health = es.cluster.health(index=index, wait_for_status='green',
+                                   timeout=load_config['green_timeout'],
+                                   ignore=[408])
+        timings.append(('Asignación de réplicas', time.monotonic() - start))
+
+        if health.get('timed_out'):
+            logger.warning('El índice no alcanzó el estado green (estado: '
+                           '{}).'.format(health.get('status')))
+
+        logger.info('Carga rápida finalizada.')
+        logger.info('')
+        return timings
+
+    def copy_index(self, es, index, old_index):
+        """Copia los documentos de un índice a otro, utilizando la API
+        '_reindex' de Elasticsearch (se conserva el routing de cada
+        documento), y espera a que la copia termine.
+
+        Args:
+            es (Elasticsearch): Conexión a Elasticsearch.
+            index (str): Nombre del índice destino.
+            old_index (str): Nombre del índice origen.
+
+        Raises:
+            RuntimeError: Si la copia no pudo ser completada.
+
+        """
+        logger.info('Copiando documentos de {}...'.format(old_index))
+        task = es.reindex(body={
+            'source': {'index': old_index},
+            'dest': {'index': index}
+        }, wait_for_completion=False)['task']
+
+        status = es.tasks.get(task_id=task)
+        while not status.get('completed'):
+            time.sleep(REINDEX_POLL_INTERVAL)
+            status = es.tasks.get(task_id=task)
+
+        response = status.get('response', {})
+        error = status.get('error') or response.get('failures')
+        if error:
+            raise RuntimeError('No se pudo copiar el índice {}: {}'.format(
+                old_index, error))
+
+        logger.info(' + Documentos copiados: {}'.format(
+            response.get('created', 0)))
+        logger.info('')
+
+    def delete_documents(self, es, index, ids):
+        """Elimina documentos de un índice por ID. Se utiliza
+        'delete_by_query' ya que el routing de los documentos eliminados del
+        archivo de datos no es conocido.
+
+        Args:
+            es (Elasticsearch): Conexión a Elasticsearch.
+            index (str): Nombre del índice.
+            ids (list): IDs de los documentos a eliminar.
+
+        """
+        logger.info('Eliminando {} documentos de {}...'.format(len(ids),
+                                                               index))
+        # Hacer visibles los documentos copiados (el índice puede no tener
+        # refresco periódico).
+        es.indices.refresh(index=index)
+
+        for i in range(0, len(ids), DELETE_CHUNK_SIZE):
+            es.delete_by_query(index=index, body={
+                'query': {'ids': {'values': ids[i:i + DELETE_CHUNK_SIZE]}}
+            })
+
+        logger.info('')
+
+    def delete_index(self, es, old_index):
+        logger.info('Eliminando índice anterior ({})...'.format(old_index))
+        es.indices.delete(old_index)
+        logger.info('Índice eliminado.')
+        logger.info('')
+
+    def update_aliases(self, es, index, old_index):
+        logger.info('Actualizando aliases...')
+
+        alias_ops = []
+        if old_index:
+            alias_ops.append({
+                'remove': {
+                    'index': old_index,
+                    'alias': self.alias
+                }
+            })
+
+        alias_ops.append({
+            'add': {
+                'index': index,
+                'alias': self.alias
+            }
+        })
+
+        logger.info('Existen {} operaciones de alias.'.format(len(alias_ops)))
+
+        for op in alias_ops:
+            if 'add' in op:
+                logger.info(' + Agregar {} como alias de {}'.format(
+                    op['add']['alias'], op['add']['index']))
+            else:
+                logger.info(' + Remover {} como alias de {}'.format(
+                    op['remove']['alias'], op['remove']['index']))
+
+        es.indices.update_aliases({'actions': alias_ops})
+
+        logger.info('')
+        logger.info('Aliases actualizados.')
+        logger.info('')
+
+    def check_index_newer(self, new_index, old_index):
+        if not old_index:
+            return True
+
+        new_date = datetime.fromtimestamp(int(new_index.split('-')[-1]))
+        old_date = datetime.fromtimestamp(int(old_index.split('-')[-1]))
+
+        return new_date > old_date
+
+    def get_old_index(self, es):
+        if not es.indices.exists_alias(name=self.alias):
+            return None
+        return list(es.indices.get_alias(name=self.alias).keys())[0]
+
+
+class GeorefIndexGroup:
+    """Conjunto de índices generados a partir del mismo archivo de datos (por
+    ejemplo, 'provincias' y 'provincias-geometria'). El archivo se lee una
+    única vez: cada documento se prepara para todos los índices del grupo
+    (cada uno con sus campos excluidos y su routing), y las operaciones de
+    todos los índices se envían en un único stream de requests bulk.
+
+    Attributes:
+        filepath (str): Path o URL del archivo de datos.
+        backup_filepath (str): Path del archivo de backup.
+        indices (list): Índices del grupo (GeorefIndex).
+        docs_key (str): Clave del arreglo de documentos del archivo.
+        download (Future): Descarga del archivo de datos, si fue comenzada
+            con 'start_download'.
+
+    """
+
+    def __init__(self, filepath, backup_filepath, indices,
+                 docs_key='entidades'):
+        self.filepath = filepath
+        self.backup_filepath = backup_filepath
+        self.indices = indices
+        self.docs_key = docs_key
+        self.download = None
+
+    @property
+    def aliases(self):
+        return [index.alias for index in self.indices]
+
     def fetch_data(self, filepath, files_cache):
         if filepath in files_cache:
             logger.info('Utilizando versión cacheada de:')
@@ -100,17 +552,31 @@ class GeorefIndex:
             logger.info('')
             return files_cache[filepath]
 
-        if urllib.parse.urlparse(filepath).scheme in ['http', 'https']:
+        if is_url(filepath):
             logger.info('Descargando archivo:')
             logger.info(' + {}'.format(filepath))
             logger.info('')
 
             try:
-                content = download.download(filepath)
-                data = json.loads(content.decode())
+                if not self.download:
+                    self.download = completed_future(self.download_file)
+
+                metadata = self.download.result()
+                if metadata:
+                    data = DataFile(self.download_filepath, self.docs_key,
+                                    temporary=True,
+                                    download_metadata=metadata)
+                else:
+                    logger.info('El archivo no fue modificado desde la '
+                                'última descarga: utilizando backup.')
+                    logger.info('')
+                    data = DataFile(self.backup_filepath, self.docs_key)
+                    filepath = self.backup_filepath
             except Exception:
                 logger.warning('No se pudo descargar el archivo.')
                 logger.warning('')
+                if os.path.exists(self.download_filepath):
+                    os.remove(self.download_filepath)
                 return None
         else:
             logger.info('Accediendo al archivo:')
@@ -118,8 +584,7 @@ class GeorefIndex:
             logger.info('')
 
             try:
-                with open(filepath) as f:
-                    data = json.load(f)
+                data = DataFile(filepath, self.docs_key)
             except Exception:
                 logger.warning('No se pudo acceder al archivo JSON.')
                 logger.warning('')
@@ -128,209 +593,765 @@ class GeorefIndex:
         files_cache[filepath] = data
         return data
 
-    def create_or_reindex(self, es, files_cache, forced=False):
-        print_log_separator(logger,
-                            'Creando/reindexando {}'.format(self.alias))
+    @property
+    def download_filepath(self):
+        # Descargar el archivo junto al backup, para luego poder reemplazarlo
+        # sin copiar su contenido (ver 'write_backup').
+        return self.backup_filepath + '.download'
+
+    def start_download(self, executor, download_config=None):
+        """Comienza a descargar el archivo de datos (si es una URL) en otro
+        thread, para que el archivo ya esté disponible al crear los índices
+        del grupo (ver 'fetch_data').
+
+        Args:
+            executor (ThreadPoolExecutor): Executor a utilizar.
+            download_config (dict): Configuración de la descarga.
+
+        """
+        if is_url(self.filepath):
+            self.download = executor.submit(self.download_file,
+                                            download_config)
+
+    def download_file(self, download_config=None):
+        """Descarga el archivo de datos. Si el backup del grupo fue creado a
+        partir de una descarga anterior, el archivo solo se descarga si fue
+        modificado desde entonces (ver 'download.download_to_file'). Las
+        descargas interrumpidas se continúan en el siguiente intento (o en
+        la siguiente ejecución).
+
+        Args:
+            download_config (dict): Configuración de la descarga (ver
+                'DOWNLOAD_DEFAULTS').
+
+        Returns:
+            dict: Metadatos de la descarga, o None si el archivo no fue
+                modificado (en cuyo caso puede utilizarse el backup).
+
+        """
+        download_config = dict(DOWNLOAD_DEFAULTS, **(download_config or {}))
+        previous = None
+        if os.path.exists(self.backup_filepath):
+            previous = download.read_metadata(self.backup_filepath)
+
+        return download.download_to_file(
+            self.filepath, self.download_filepath,
+            tries=download_config['tries'],
+            retry_delay=download_config['retry_delay'],
+            try_timeout=download_config['timeout'], previous=previous)
+
+    def create_or_reindex(self, es, files_cache, forced=False,
+                          load_config=None, bulk_config=None,
+                          delta_config=None):
+        """Crea o reindexa los índices del grupo.
+
+        Args:
+            es (Elasticsearch): Conexión a Elasticsearch.
+            files_cache (dict): Archivos de datos ya accedidos, por path.
+            forced (bool): Omitir el chequeo de timestamps, y utilizar el
+                archivo de backup si no se pudo utilizar el archivo de datos.
+            load_config (dict): Configuración de carga rápida.
+            bulk_config (dict): Configuración de la inserción.
+            delta_config (dict): Configuración del modo delta.
+
+        Returns:
+            list: Alias de los índices actualizados.
+
+        """
+        print_log_separator(logger, 'Creando/reindexando {}'.format(
+            ', '.join(self.aliases)))
         logger.info('')
 
         data = self.fetch_data(self.filepath, files_cache)
-        ok = self.create_or_reindex_with_data(es, data,
-                                              check_timestamp=not forced)
+        updated = self.create_or_reindex_with_data(
+            es, data, check_timestamp=not forced, load_config=load_config,
+            bulk_config=bulk_config, delta_config=delta_config)
 
-        if forced and not ok:
+        if forced and not updated:
             logger.warning('No se pudo indexar utilizando fuente primaria.')
             logger.warning('Intentando nuevamente con backup...')
             logger.warning('')
 
             data = self.fetch_data(self.backup_filepath, files_cache)
-            ok = self.create_or_reindex_with_data(es, data,
-                                                  check_timestamp=False)
+            updated = self.create_or_reindex_with_data(
+                es, data, check_timestamp=False, load_config=load_config,
+                bulk_config=bulk_config, delta_config=delta_config)
 
-            if not ok:
+            if not updated:
                 # TODO: Agregar manejo de errores adicional
                 logger.error('No se pudo indexar utilizando backups.')
                 logger.error('')
 
-        if ok:
+        if updated:
             self.write_backup(data, files_cache)
 
-    def create_or_reindex_with_data(self, es, data, check_timestamp=True):
+        return updated
+
+    def create_or_reindex_with_data(self, es, data, check_timestamp=True,
+                                    load_config=None, bulk_config=None,
+                                    delta_config=None):
+        """Crea nuevos índices a partir de un archivo de datos, y actualiza
+        los alias correspondientes. Si 'check_timestamp' es verdadero, se
+        omiten los índices cuyo índice actual es igual o más reciente que el
+        archivo, y, si el modo delta está activado, los nuevos índices se
+        crean copiando los índices actuales y aplicando solo los cambios del
+        archivo (ver 'plan_delta').
+
+        Args:
+            es (Elasticsearch): Conexión a Elasticsearch.
+            data (DataFile): Archivo de datos (o None).
+            check_timestamp (bool): Comparar el timestamp del archivo con el
+                de los índices actuales.
+            load_config (dict): Configuración de carga rápida.
+            bulk_config (dict): Configuración de la inserción.
+            delta_config (dict): Configuración del modo delta.
+
+        Returns:
+            list: Alias de los índices actualizados.
+
+        """
         if not data:
             logger.warning('No existen datos a indexar.')
-            return False
+            return []
 
         timestamp = data['timestamp']
         version = data['version']
-        docs = data[self.docs_key]
 
         logger.info('Versión de API:   {}'.format(FILE_VERSION))
         logger.info('Versión de Datos: {}'.format(version))
         logger.info('')
 
         if version.split('.')[0] != FILE_VERSION.split('.')[0]:
-            logger.warning('Salteando creación de nuevo índice:')
+            logger.warning('Salteando creación de nuevos índices:')
             logger.warning('Versiones de datos no compatibles.')
             logger.info('')
-            return False
+            return []
 
-        new_index = '{}-{}-{}'.format(self.alias,
-                                      uuid.uuid4().hex[:8], timestamp)
-        old_index = self.get_old_index(es)
+        if not check_timestamp:
+            logger.info('Omitiendo chequeo de timestamp.')
+            logger.info('')
+
+        # Tuplas (índice, nombre del nuevo índice, nombre del índice actual)
+        targets = []
+        for index in self.indices:
+            new_index = '{}-{}-{}'.format(index.alias,
+                                          uuid.uuid4().hex[:8], timestamp)
+            old_index = index.get_old_index(es)
 
-        if check_timestamp:
-            if not self.check_index_newer(new_index, old_index):
+            if check_timestamp and \
+               not index.check_index_newer(new_index, old_index):
                 logger.warning(
                     'Salteando creación de índice {}'.format(new_index))
                 logger.warning(
                     (' + El índice {} ya existente es idéntico o más' +
                      ' reciente').format(old_index))
                 logger.info('')
-                return False
+                continue
+
+            targets.append((index, new_index, old_index))
+
+        delta_config = dict(DELTA_DEFAULTS, **(delta_config or {}))
+        delta = delta_config['enabled']
+        # Cambios a aplicar en los índices creados en modo delta, y hashes
+        # de documentos ya calculados, por nombre de índice nuevo
+        plans, hashes = {}, {}
+
+        if delta and check_timestamp:
+            targets, plans, hashes = self.plan_delta(targets, data,
+                                                     delta_config,
+                                                     bulk_config)
+
+        if not targets:
+            return []
+
+        load_config = dict(FAST_LOAD_DEFAULTS, **(load_config or {}))
+        fast_load = load_config['enabled']
+        timings = []
+
+        start = time.monotonic()
+        settings = []
+        for index, new_index, old_index in targets:
+            settings.append(index.create_index(es, new_index, data.count,
+                                               fast_load))
+            if new_index not in plans:
+                continue
+
+            try:
+                index.copy_index(es, new_index, old_index)
+            except Exception as e:
+                logger.warning(e)
+                logger.warning('Utilizando reindexado completo.')
+                logger.warning('')
+
+                del plans[new_index]
+                index.delete_index(es, new_index)
+                settings[-1] = index.create_index(es, new_index, data.count,
+                                                  fast_load)
+
+        for index, new_index, _ in targets:
+            if new_index in plans and plans[new_index][1]:
+                index.delete_documents(es, new_index, plans[new_index][1])
+
+        if all(new_index in plans for _, new_index, _ in targets):
+            # Todos los índices se crean en modo delta: solo se envían a la
+            # inserción los documentos nuevos o modificados, a medida que se
+            # leen (sin serializar el resto).
+            changed = set().union(*(plans[new_index][0]
+                                    for _, new_index, _ in targets))
+            docs = (doc for doc in data.documents() if doc['id'] in changed)
+            doc_count = len(changed)
         else:
-            logger.info('Omitiendo chequeo de timestamp.')
-            logger.info('')
+            docs, doc_count = data.documents(), data.count
+
+        hashes.update(self.insert_documents(
+            es, [(index, new_index) for index, new_index, _ in targets],
+            docs, doc_count, bulk_config, plans,
+            [new_index for _, new_index, _ in targets
+             if new_index not in hashes] if delta else []))
+        timings.append(('Carga de documentos', time.monotonic() - start))
+
+        updated = []
+        for (index, new_index, old_index), profile_settings in zip(
+                targets, settings):
+            try:
+                if fast_load:
+                    timings.extend(
+                        ('{} ({})'.format(phase, index.alias), elapsed)
+                        for phase, elapsed in index.finish_fast_load(
+                            es, new_index, profile_settings, load_config))
+                else:
+                    # Hacer visibles los documentos antes de actualizar los
+                    # alias, ya que el intervalo de refresco de los perfiles
+                    # es alto.
+                    es.indices.refresh(index=new_index)
+
+                start = time.monotonic()
+                index.update_aliases(es, new_index, old_index)
+                if old_index:
+                    index.delete_index(es, old_index)
+                timings.append(('Actualización de alias ({})'.format(
+                    index.alias), time.monotonic() - start))
+
+                if delta:
+                    self.write_hashes(index, new_index, hashes[new_index])
+            except Exception as e:
+                logger.error('Ocurrió un error al finalizar el índice '
+                             '{}:'.format(new_index))
+                logger.error('')
+                logger.error(e)
+                logger.error('')
+                continue
 
-        self.create_index(es, new_index)
-        self.insert_documents(es, new_index, docs)
+            updated.append(index.alias)
 
-        self.update_aliases(es, new_index, old_index)
-        if old_index:
-            self.delete_index(es, old_index)
+        logger.info('Tiempos de indexación:')
+        for phase, elapsed in timings:
+            logger.info(' + {}: {:.1f} s'.format(phase, elapsed))
+        logger.info('')
+
+        return updated
+
+    def plan_delta(self, targets, data, delta_config, bulk_config):
+        """Determina qué índices pueden crearse en modo delta: para cada
+        índice actual con hashes almacenados (ver 'write_hashes'), se
+        comparan los hashes de sus documentos con los de los documentos del
+        archivo. Los índices sin cambios se omiten, y los índices con más
+        cambios que 'max_changes' se crean completos.
+
+        Los documentos se recorren una única vez, calculando y comparando sus
+        hashes a medida que se leen: solo se mantienen en memoria sus IDs y
+        hashes, no los documentos.
 
-        return True
+        Args:
+            targets (list): Tuplas (índice de tipo GeorefIndex, nombre del
+                nuevo índice, nombre del índice actual).
+            data (DataFile): Archivo de datos.
+            delta_config (dict): Configuración del modo delta.
+            bulk_config (dict): Configuración de la inserción.
+
+        Returns:
+            tuple: Tuplas de 'targets' que deben ser creadas; cambios a
+                aplicar por nombre de nuevo índice (IDs de documentos nuevos
+                o modificados, e IDs de documentos a eliminar antes de
+                insertarlos); y hashes de los documentos del archivo, por
+                nombre de nuevo índice.
+
+        """
+        previous = {}
+        for index, new_index, old_index in targets:
+            hashes = self.read_hashes(index, old_index) if old_index else None
+            if hashes is not None:
+                previous[new_index] = hashes
+
+        if not previous:
+            return targets, {}, {}
+
+        logger.info('Calculando cambios (modo delta)...')
+        candidates = [(index, new_index) for index, new_index, _ in targets
+                      if new_index in previous]
+        max_changes = delta_config['max_changes'] * data.count
+
+        current = {name: {} for _, name in candidates}
+        changed = {name: set() for _, name in candidates}
+        exceeded = set()
+
+        prepare = functools.partial(hash_documents, targets=[
+            (index.excludes, index.routed) for index, _ in candidates
+        ])
+        results, executor = map_documents(prepare, data.documents(),
+                                          data.count, bulk_config)
+
+        try:
+            for digests in results:
+                for (_, name), (doc_id, digest) in zip(candidates, digests):
+                    current[name][doc_id] = digest
+                    if name in exceeded or \
+                       previous[name].get(doc_id) == digest:
+                        continue
+
+                    changed[name].add(doc_id)
+                    if len(changed[name]) > max_changes:
+                        # El índice se creará completo: dejar de acumular
+                        # sus cambios.
+                        exceeded.add(name)
+        finally:
+            if executor:
+                executor.shutdown()
+
+        remaining, plans = [], {}
+        for target in targets:
+            index, new_index, _ = target
+            if new_index not in previous:
+                remaining.append(target)
+                continue
+
+            old_hashes = previous[new_index]
+            new_hashes = current[new_index]
+            deleted = [doc_id for doc_id in old_hashes
+                       if doc_id not in new_hashes]
+            changes = len(changed[new_index]) + len(deleted)
+
+            logger.info(' + {}: {}{} nuevos o modificados, {} eliminados'
+                        .format(index.alias,
+                                'más de ' if new_index in exceeded else '',
+                                len(changed[new_index]), len(deleted)))
+
+            if not changes:
+                logger.info('   Salteando índice (sin cambios).')
+            elif new_index in exceeded or changes > max_changes:
+                logger.info('   Creando índice completo.')
+                remaining.append(target)
+            else:
+                # Los documentos modificados también se eliminan antes de
+                # insertarlos: en los índices con routing, si la provincia
+                # de un documento cambió, el documento nuevo se almacenaría
+                # en otro shard, sin reemplazar al copiado del índice actual.
+                remaining.append(target)
+                plans[new_index] = changed[new_index], deleted + [
+                    doc_id for doc_id in changed[new_index]
+                    if doc_id in old_hashes
+                ]
+
+        logger.info('')
+        return remaining, plans, current
+
+    def hashes_filepath(self, index):
+        return os.path.join(os.path.dirname(self.backup_filepath),
+                            '{}.hashes.json'.format(index.alias))
+
+    def read_hashes(self, index, old_index):
+        """Lee los hashes de los documentos de un índice, almacenados al
+        crearlo.
+
+        Args:
+            index (GeorefIndex): Índice.
+            old_index (str): Nombre del índice actual.
+
+        Returns:
+            dict: Hashes por ID de documento, o None si no existen hashes
+                del índice actual.
+
+        """
+        try:
+            with open(self.hashes_filepath(index)) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if stored.get('index') != old_index:
+            return None
+
+        return stored['hashes']
+
+    def write_hashes(self, index, new_index, hashes):
+        """Almacena los hashes de los documentos de un índice, para poder
+        crear el próximo índice en modo delta.
+
+        Args:
+            index (GeorefIndex): Índice.
+            new_index (str): Nombre del índice creado.
+            hashes (dict): Hashes por ID de documento.
+
+        """
+        path = self.hashes_filepath(index)
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'index': new_index, 'hashes': hashes}, f)
+
+        os.replace(path + '.tmp', path)
 
     def write_backup(self, data, files_cache):
-        if self.backup_filepath in files_cache:
+        if self.backup_filepath in files_cache or \
+           data.path == self.backup_filepath:
             logger.info(
                 'Omitiendo creación de backup (ya fue creado anteriormente).')
             logger.info('')
             return
 
         logger.info('Creando archivo de backup...')
-        with open(self.backup_filepath, 'w') as f:
-            json.dump(data, f)
+        if data.temporary:
+            # El archivo descargado se convierte en el backup
+            os.replace(data.path, self.backup_filepath)
+            data.temporary = False
+        else:
+            shutil.copyfile(data.path, self.backup_filepath + '.tmp')
+            os.replace(self.backup_filepath + '.tmp', self.backup_filepath)
+
+        # Almacenar los metadatos de descarga del backup, para utilizarlos en
+        # la próxima descarga (ver 'download_file').
+        metadata_path = download.metadata_filepath(self.backup_filepath)
+        if data.download_metadata:
+            download.write_metadata(self.backup_filepath,
+                                    data.download_metadata)
+        elif os.path.exists(metadata_path):
+            os.remove(metadata_path)
+
+        data.path = self.backup_filepath
         logger.info('Archivo creado.')
         logger.info('')
 
         files_cache[self.backup_filepath] = data
 
-    def create_index(self, es, index):
-        logger.info('Creando nuevo índice: {}...'.format(index))
-        logger.info('')
-        es.indices.create(index=index, body={
-            'settings': DEFAULT_SETTINGS,
-            'mappings': self.mapping
-        })
+    def insert_documents(self, es, targets, docs, doc_count,
+                         bulk_config=None, plans=None, hash_names=None):
+        """Inserta documentos en uno o más índices, utilizando varios
+        threads. Cada documento se lee una única vez, y se inserta en todos
+        los índices de 'targets'. Cada thread envía lotes de operaciones con
+        'helpers.streaming_bulk', que reintenta (con tiempos de espera
+        exponenciales) las operaciones rechazadas por Elasticsearch con el
+        código 429, por lo que la cantidad de requests bulk simultáneas es
+        igual a la cantidad de threads. Opcionalmente, se limita la cantidad
+        de documentos por segundo, y se pausa la inserción mientras las colas
+        de búsquedas del cluster superen un tamaño máximo (ver
+        'ThrottledIterator').
+
+        Los documentos se serializan previamente a JSON; si la cantidad de
+        documentos supera 'process_min_docs', la serialización se realiza en
+        varios procesos, por lotes (ver 'map_documents').
 
-    def insert_documents(self, es, index, docs):
-        operations = self.bulk_update_generator(docs, index)
-        creations, errors = 0, 0
+        Args:
+            es (Elasticsearch): Conexión a Elasticsearch.
+            targets (list): Tuplas (índice de tipo GeorefIndex, nombre del
+                índice a utilizar).
+            docs (iterable): Documentos a indexar.
+            doc_count (int): Cantidad de documentos.
+            bulk_config (dict): Configuración de la inserción (ver
+                'BULK_DEFAULTS').
+            plans (dict): Cambios a aplicar en los índices creados en modo
+                delta, por nombre de índice (ver 'plan_delta'). En esos
+                índices, solo se insertan los documentos nuevos o
+                modificados.
+            hash_names (list): Nombres de los índices cuyos hashes de
+                documentos deben ser almacenados (None para todos).
+
+        Returns:
+            dict: Hashes por ID de documento, por nombre de índice de
+                'hash_names'.
 
-        logger.info('Insertando documentos...')
+        """
+        bulk_config = dict(BULK_DEFAULTS, **(bulk_config or {}))
+        total_bytes = 0
+        names = [name for _, name in targets]
+        hashes = {name: {} for name in (names if hash_names is None
+                                        else hash_names)}
+
+        logger.info('Insertando documentos ({} threads)...'.format(
+            bulk_config['threads']))
+        start = time.monotonic()
+
+        prepare = functools.partial(prepare_documents, targets=[
+            (index.excludes, index.routed) for index, _ in targets
+        ])
+
+        documents, executor = map_documents(prepare, docs, doc_count,
+                                            bulk_config)
+
+        def count_bytes(documents):
+            nonlocal total_bytes
+            for prepared in documents:
+                for name, document in zip(names, prepared):
+                    total_bytes += document[3]
+                    if name in hashes:
+                        hashes[name][document[0]] = document[4]
+
+                yield prepared
+
+        operations = ThrottledIterator(
+            self.bulk_update_generator(count_bytes(documents), names,
+                                       plans),
+            max_rate=bulk_config['max_docs_per_second'] * len(targets),
+            es=es, max_search_queue=bulk_config['max_search_queue'],
+            check_interval=bulk_config['queue_check_interval'])
 
-        for ok, response in helpers.streaming_bulk(es, operations,
-                                                   raise_on_error=False):
-            if ok and response['create']['result'] == 'created':
-                creations += 1
-            else:
-                errors += 1
-                identifier = response['create']['_id']
-                error = response['create']['error']
+        try:
+            with ThreadPoolExecutor(bulk_config['threads']) as pool:
+                futures = [
+                    pool.submit(log_buffer.bind(self.bulk_worker), es,
+                                operations, bulk_config)
+                    for _ in range(bulk_config['threads'])
+                ]
 
-                logger.warning(
-                    'Error al procesar el documento ID {}:'.format(identifier))
-                logger.warning(json.dumps(error, indent=4, ensure_ascii=False))
-                logger.warning('')
+                results = [future.result() for future in futures]
+        finally:
+            if executor:
+                executor.shutdown()
+
+        elapsed = max(time.monotonic() - start, 1e-6)
 
         logger.info('Resumen:')
-        logger.info(' + Documentos procesados: {}'.format(len(docs)))
-        logger.info(' + Documentos creados: {}'.format(creations))
-        logger.info(' + Errores: {}'.format(errors))
+        logger.info(' + Documentos procesados: {}'.format(doc_count))
+        for name in names:
+            creations = sum(result[name][0] for result in results
+                            if name in result)
+            errors = sum(result[name][1] for result in results
+                         if name in result)
+            logger.info(' + Documentos insertados en {}: {}'.format(
+                name, creations))
+            logger.info(' + Errores en {}: {}'.format(name, errors))
+        logger.info(' + Documentos/s: {:.0f}'.format(doc_count / elapsed))
+        logger.info(' + MB/s: {:.2f}'.format(
+            total_bytes / elapsed / 1024 / 1024))
+        if operations.paused_time:
+            logger.info(' + Pausa por búsquedas encoladas: {:.1f} s'.format(
+                operations.paused_time))
         logger.info('')
 
-    def delete_index(self, es, old_index):
-        logger.info('Eliminando índice anterior ({})...'.format(old_index))
-        es.indices.delete(old_index)
-        logger.info('Índice eliminado.')
-        logger.info('')
+        return hashes
 
-    def update_aliases(self, es, index, old_index):
-        logger.info('Actualizando aliases...')
+    def bulk_worker(self, es, operations, bulk_config):
+        """Envía operaciones a Elasticsearch en lotes, desde un thread de
+        'insert_documents'.
 
-        alias_ops = []
-        if old_index:
-            alias_ops.append({
-                'remove': {
-                    'index': old_index,
-                    'alias': self.alias
+        Args:
+            es (Elasticsearch): Conexión a Elasticsearch.
+            operations (ThrottledIterator): Operaciones a enviar,
+                compartidas con los demás threads.
+            bulk_config (dict): Configuración de la inserción.
+
+        Returns:
+            dict: Cantidad de documentos insertados y cantidad de errores,
+                por nombre de índice.
+
+        """
+        results = {}
+
+        for ok, response in helpers.streaming_bulk(
+                es, operations, chunk_size=bulk_config['chunk_size'],
+                max_chunk_bytes=bulk_config['chunk_bytes'],
+                max_retries=bulk_config['max_retries'],
+                initial_backoff=bulk_config['initial_backoff'],
+                max_backoff=bulk_config['max_backoff'],
+                raise_on_error=False):
+            # Operación 'create', o 'index' (modo delta)
+            item = next(iter(response.values()))
+            counts = results.setdefault(item['_index'], [0, 0])
+
+            if ok and item['result'] in ['created', 'updated']:
+                counts[0] += 1
+            else:
+                counts[1] += 1
+                identifier = item['_id']
+                error = item['error']
+
+                logger.warning('Error al procesar el documento ID '
+                               '{}:'.format(identifier))
+                logger.warning(json.dumps(error, indent=4,
+                                          ensure_ascii=False))
+                logger.warning('')
+
+        return results
+
+    def bulk_update_generator(self, documents, indices, plans=None):
+        """Crea un generador de operaciones 'create' para Elasticsearch a
+        partir de una lista de documentos a indexar, ya preparados con
+        'prepare_documents'. Las operaciones de un mismo documento (una por
+        índice) se generan consecutivamente. Si un índice utiliza routing,
+        cada documento se almacena en el shard correspondiente al ID de su
+        provincia (ver 'data.query_routing' en la API).
+
+        En los índices creados en modo delta, solo se generan operaciones
+        'index' para los documentos nuevos o modificados.
+
+        Args:
+            documents (iterable): Documentos a indexar, como listas de tuplas
+                (ID, routing, JSON, tamaño, hash), una por índice.
+            indices (list): Nombres de los índices.
+            plans (dict): Cambios a aplicar en los índices creados en modo
+                delta, por nombre de índice.
+
+        """
+        plans = plans or {}
+
+        for prepared in documents:
+            for index, (doc_id, routing, source, _, _) in zip(indices,
+                                                              prepared):
+                op_type = 'create'
+                if index in plans:
+                    if doc_id not in plans[index][0]:
+                        continue
+                    op_type = 'index'
+
+                action = {
+                    '_op_type': op_type,
+                    '_type': '_doc',
+                    '_id': doc_id,
+                    '_index': index,
+                    '_source': source
                 }
-            })
 
-        alias_ops.append({
-            'add': {
-                'index': index,
-                'alias': self.alias
-            }
-        })
+                if routing:
+                    action['_routing'] = routing
 
-        logger.info('Existen {} operaciones de alias.'.format(len(alias_ops)))
+                yield action
 
-        for op in alias_ops:
-            if 'add' in op:
-                logger.info(' + Agregar {} como alias de {}'.format(
-                    op['add']['alias'], op['add']['index']))
-            else:
-                logger.info(' + Remover {} como alias de {}'.format(
-                    op['remove']['alias'], op['remove']['index']))
 
-        es.indices.update_aliases({'actions': alias_ops})
+def map_documents(function, docs, doc_count, bulk_config):
+    """Aplica una función a cada documento a indexar. Si la cantidad de
+    documentos supera 'process_min_docs', se utilizan varios procesos (ver
+    'map_batches').
 
-        logger.info('')
-        logger.info('Aliases actualizados.')
-        logger.info('')
+    Args:
+        function (function): Función a aplicar.
+        docs (iterable): Documentos.
+        doc_count (int): Cantidad de documentos.
+        bulk_config (dict): Configuración de la inserción.
 
-    def check_index_newer(self, new_index, old_index):
-        if not old_index:
-            return True
+    Returns:
+        tuple: Iterador de resultados, y ProcessPoolExecutor utilizado (o
+            None), que debe ser finalizado luego de recorrer los resultados.
 
-        new_date = datetime.fromtimestamp(int(new_index.split('-')[-1]))
-        old_date = datetime.fromtimestamp(int(old_index.split('-')[-1]))
+    """
+    bulk_config = dict(BULK_DEFAULTS, **(bulk_config or {}))
 
-        return new_date > old_date
+    if doc_count < bulk_config['process_min_docs']:
+        return map(function, docs), None
 
-    def get_old_index(self, es):
-        if not es.indices.exists_alias(name=self.alias):
-            return None
-        return list(es.indices.get_alias(name=self.alias).keys())[0]
+    executor = ProcessPoolExecutor(bulk_config['processes'] or None)
+    return map_batches(executor, function, docs, PROCESS_BATCH_SIZE), executor
 
-    def bulk_update_generator(self, docs, index):
-        """Crea un generador de operaciones 'create' para Elasticsearch a
-        partir de una lista de documentos a indexar.
 
-        Args:
-            docs (list): Documentos a indexar.
-            index (str): Nombre del índice.
+def map_batches(executor, function, items, batch_size):
+    """Aplica una función a cada elemento de un iterable utilizando un
+    ProcessPoolExecutor, procesando los elementos por lotes: a diferencia de
+    'executor.map', no se consume el iterable completo de una vez, por lo
+    que la memoria utilizada depende solo del tamaño de los lotes. Mientras
+    se recorren los resultados de un lote, se procesa el lote siguiente.
 
-        """
-        for original_doc in docs:
-            doc = {
-                key: original_doc[key]
-                for key in original_doc
-                if key not in self.excludes
-            }
+    Args:
+        executor (ProcessPoolExecutor): Executor a utilizar.
+        function (function): Función a aplicar.
+        items (iterable): Elementos a procesar.
+        batch_size (int): Cantidad de elementos por lote.
 
-            action = {
-                '_op_type': 'create',
-                '_type': '_doc',
-                '_id': doc['id'],
-                '_index': index,
-                '_source': doc
-            }
+    Yields:
+        object: Resultados de la función, en el orden de 'items'.
+
+    """
+    items = iter(items)
+    pending = None
+
+    while True:
+        batch = list(itertools.islice(items, batch_size))
+        results = executor.map(function, batch,
+                               chunksize=PROCESS_CHUNK_SIZE) if batch else None
+
+        if pending is not None:
+            yield from pending
 
-            yield action
+        if results is None:
+            return
+
+        pending = results
+
+
+def prepare_document(doc, excludes, routed):
+    """Prepara un documento para ser indexado: remueve los campos excluidos
+    del índice, y lo serializa a JSON (el cliente de Elasticsearch envía los
+    valores de tipo str sin volver a serializarlos). Las claves se ordenan,
+    para que el hash del documento (utilizado en modo delta) no dependa del
+    orden de las mismas en el archivo de datos. Se ejecuta
+    potencialmente en otro proceso (ver 'GeorefIndexGroup.insert_documents').
+
+    Args:
+        doc (dict): Documento a indexar.
+        excludes (list): Campos a remover del documento.
+        routed (bool): Verdadero si el índice utiliza routing.
+
+    Returns:
+        tuple: ID del documento, valor de routing (o None), documento
+            serializado, tamaño del mismo en bytes, y hash del mismo.
+
+    """
+    source = json.dumps({
+        key: value
+        for key, value in doc.items()
+        if key not in excludes
+    }, ensure_ascii=False, sort_keys=True)
+
+    encoded = source.encode()
+    routing = doc['provincia']['id'] if routed else None
+    return (doc['id'], routing, source, len(encoded),
+            hashlib.sha1(encoded).hexdigest())
+
+
+def prepare_documents(doc, targets):
+    """Prepara un documento para ser indexado en uno o más índices (ver
+    'prepare_document').
+
+    Args:
+        doc (dict): Documento a indexar.
+        targets (list): Tuplas (campos excluidos, uso de routing), una por
+            índice.
+
+    Returns:
+        list: Documento preparado para cada índice.
 
+    """
+    return [prepare_document(doc, excludes, routed)
+            for excludes, routed in targets]
 
-def send_index_email(config, forced, env, log):
+
+def hash_documents(doc, targets):
+    """Calcula el hash de un documento para uno o más índices (ver
+    'prepare_document').
+
+    Args:
+        doc (dict): Documento.
+        targets (list): Tuplas (campos excluidos, uso de routing), una por
+            índice.
+
+    Returns:
+        list: Tuplas (ID, hash) del documento, una por índice.
+
+    """
+    hashes = []
+    for excludes, routed in targets:
+        doc_id, _, _, _, digest = prepare_document(doc, excludes, routed)
+        hashes.append((doc_id, digest))
+
+    return hashes
+
+
+def send_index_email(config, forced, env, log, durations=None):
     lines = log.splitlines()
     warnings = len([line for line in lines if 'WARNING' in line])
     errors = len([line for line in lines if 'ERROR' in line])
@@ -343,12 +1364,143 @@ def send_index_email(config, forced, env, log):
     msg = 'Indexación de datos para Georef API. Modo forzado: {}'.format(
         forced)
 
+    if durations:
+        msg += '\n\nDuración por índice:'
+        for aliases, elapsed, updated in durations:
+            for alias in aliases:
+                msg += '\n + {}: {:.1f} s ({})'.format(
+                    alias, elapsed,
+                    'actualizado' if alias in updated else 'sin cambios')
+
     send_email(config['host'], config['user'], config['password'], subject,
                msg, config['recipients'], {
                    'log.txt': log
                })
 
 
+def purge_cache(config, keys, purge_at=None):
+    """Notifica a los caches HTTP (por ejemplo, nginx) que las respuestas
+    generadas a partir de los índices actualizados deben ser invalidadas. Las
+    claves utilizadas son los nombres de los alias actualizados, que
+    coinciden con los valores del header 'Surrogate-Key' de las respuestas
+    de la API.
+
+    Args:
+        config (dict): Configuración de invalidación ('list_file': archivo
+            donde agregar las claves a invalidar, 'hook': comando a ejecutar
+            con las claves como argumentos).
+        keys (list): Claves a invalidar.
+        purge_at (float): Momento (según 'time.monotonic') a partir del cual
+            invalidar, para que la API deje de utilizar los nombres de
+            índices anteriores al generar ETags (ver 'INDEX_NAMES_TTL'). Si
+            es None o ya pasó, se invalida inmediatamente.
+
+    """
+    list_file = config.get('list_file')
+    hook = config.get('hook')
+
+    if not keys or not (list_file or hook):
+        return
+
+    print_log_separator(logger, 'Invalidando caches')
+    logger.info('')
+
+    delay = purge_at - time.monotonic() if purge_at is not None else 0
+    if delay > 0:
+        logger.info('Esperando {:.0f} segundos...'.format(delay))
+        time.sleep(delay)
+
+    if list_file:
+        logger.info('Escribiendo claves en: {}'.format(list_file))
+        with open(list_file, 'a') as f:
+            f.writelines(key + '\n' for key in keys)
+
+    if hook:
+        command = hook.split() if isinstance(hook, str) else list(hook)
+        logger.info('Ejecutando: {}'.format(' '.join(command + keys)))
+
+        try:
+            subprocess.run(command + keys, check=True)
+        except (OSError, subprocess.CalledProcessError) as e:
+            logger.error('No se pudo ejecutar el comando de invalidación:')
+            logger.error(e)
+
+    logger.info('Claves invalidadas: {}'.format(', '.join(keys)))
+    logger.info('')
+
+
+def generate_snapshots(directory):
+    """Genera los snapshots (respuestas precalculadas) de la API, utilizando
+    los índices actualmente apuntados por los alias. La API es importada
+    desde el directorio raíz del proyecto, y toma su configuración de la
+    variable de entorno GEOREF_CONFIG.
+
+    Args:
+        directory (str): Directorio donde almacenar los snapshots.
+
+    """
+    print_log_separator(logger, 'Generando snapshots')
+    logger.info('')
+
+    try:
+        sys.path.insert(0, ROOT_DIR)
+        from service import app as api_app, snapshots
+
+        etags = snapshots.generate_snapshots(api_app, directory)
+        logger.info('Snapshots vigentes: {}'.format(len(etags)))
+    except Exception as e:
+        logger.error('Ocurrió un error al generar snapshots:')
+        logger.error(e)
+
+    logger.info('')
+
+
+def index_group(group, es, files_cache, forced, load_config, bulk_config,
+                delta_config, log_path):
+    """Crea o reindexa un grupo de índices desde un thread de 'run_index',
+    reteniendo sus registros de log (ver 'ThreadLogBuffer'). Los registros
+    se escriben además en el archivo 'log_path' a medida que se generan, para
+    poder seguir el progreso del grupo y no perderlos si el proceso termina
+    inesperadamente.
+
+    Args:
+        group (GeorefIndexGroup): Grupo de índices.
+        es (Elasticsearch): Conexión a Elasticsearch.
+        files_cache (dict): Archivos de datos ya accedidos, por path.
+        forced (bool): Utilizar modo forzado.
+        load_config (dict): Configuración de carga rápida.
+        bulk_config (dict): Configuración de la inserción.
+        delta_config (dict): Configuración del modo delta.
+        log_path (str): Archivo donde escribir los registros de log del
+            grupo.
+
+    Returns:
+        tuple: Registros de log, alias actualizados y duración en segundos.
+
+    """
+    handler = logging.FileHandler(log_path, 'w')
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
+
+    log_buffer.start(handler=handler)
+    start = time.monotonic()
+    updated = []
+
+    try:
+        updated = group.create_or_reindex(es, files_cache, forced,
+                                          load_config, bulk_config,
+                                          delta_config)
+    except Exception as e:
+        logger.error('Ocurrió un error al indexar:')
+        logger.error('')
+        logger.error(e)
+        logger.error('')
+    finally:
+        records = log_buffer.stop()
+        handler.close()
+
+    return records, updated, time.monotonic() - start
+
+
 def run_index(app, es, forced):
     backups_dir = app.config['BACKUPS_DIR']
     os.makedirs(backups_dir, exist_ok=True)
@@ -357,69 +1509,149 @@ def run_index(app, es, forced):
     logger.info('Comenzando (re)indexación en Georef API [{}]'.format(env))
     logger.info('')
 
-    indices = [
-        GeorefIndex('provincias',
-                    app.config['STATES_FILE'],
-                    os.path.join(backups_dir, 'provincias.json'),
-                    MAP_STATE,
-                    ['geometria']),
-        GeorefIndex('provincias-geometria',
-                    app.config['STATES_FILE'],
-                    os.path.join(backups_dir, 'provincias.json'),
-                    MAP_STATE_GEOM),
-        GeorefIndex('departamentos',
-                    app.config['DEPARTMENTS_FILE'],
-                    os.path.join(backups_dir, 'departamentos.json'),
-                    MAP_DEPT,
-                    ['geometria']),
-        GeorefIndex('departamentos-geometria',
-                    app.config['DEPARTMENTS_FILE'],
-                    os.path.join(backups_dir, 'departamentos.json'),
-                    MAP_DEPT_GEOM),
-        GeorefIndex('municipios',
-                    app.config['MUNICIPALITIES_FILE'],
-                    os.path.join(backups_dir, 'municipios.json'),
-                    MAP_MUNI,
-                    ['geometria']),
-        GeorefIndex('municipios-geometria',
-                    app.config['MUNICIPALITIES_FILE'],
-                    os.path.join(backups_dir, 'municipios.json'),
-                    MAP_MUNI_GEOM),
-        GeorefIndex('localidades',
-                    app.config['LOCALITIES_FILE'],
-                    os.path.join(backups_dir, 'localidades.json'),
-                    MAP_SETTLEMENT,
-                    ['geometria']),
-        GeorefIndex('localidades-geometria',
-                    app.config['LOCALITIES_FILE'],
-                    os.path.join(backups_dir, 'localidades.json'),
-                    MAP_SETTLEMENT_GEOM),
-        GeorefIndex('calles',
-                    app.config['STREETS_FILE'],
-                    os.path.join(backups_dir, 'calles.json'),
-                    MAP_STREET,
-                    ['codigo_postal'],
-                    docs_key='vias')
+    # Los índices con y sin geometría de cada entidad se generan a partir
+    # del mismo archivo, leído una única vez.
+    groups = [
+        GeorefIndexGroup(app.config['STATES_FILE'],
+                         os.path.join(backups_dir, 'provincias.json'), [
+                             GeorefIndex('provincias', MAP_STATE,
+                                         ['geometria']),
+                             GeorefIndex('provincias-geometria',
+                                         MAP_STATE_GEOM,
+                                         settings=GEOM_INDEX_SETTINGS)
+                         ]),
+        GeorefIndexGroup(app.config['DEPARTMENTS_FILE'],
+                         os.path.join(backups_dir, 'departamentos.json'), [
+                             GeorefIndex('departamentos', MAP_DEPT,
+                                         ['geometria']),
+                             GeorefIndex('departamentos-geometria',
+                                         MAP_DEPT_GEOM,
+                                         settings=GEOM_INDEX_SETTINGS)
+                         ]),
+        GeorefIndexGroup(app.config['MUNICIPALITIES_FILE'],
+                         os.path.join(backups_dir, 'municipios.json'), [
+                             GeorefIndex('municipios', MAP_MUNI,
+                                         ['geometria']),
+                             GeorefIndex('municipios-geometria',
+                                         MAP_MUNI_GEOM,
+                                         settings=GEOM_INDEX_SETTINGS)
+                         ]),
+        GeorefIndexGroup(app.config['LOCALITIES_FILE'],
+                         os.path.join(backups_dir, 'localidades.json'), [
+                             GeorefIndex('localidades', MAP_SETTLEMENT,
+                                         ['geometria'], routed=True),
+                             GeorefIndex('localidades-geometria',
+                                         MAP_SETTLEMENT_GEOM,
+                                         settings=GEOM_INDEX_SETTINGS)
+                         ]),
+        GeorefIndexGroup(app.config['STREETS_FILE'],
+                         os.path.join(backups_dir, 'calles.json'), [
+                             GeorefIndex('calles', MAP_STREET,
+                                         ['codigo_postal'], routed=True)
+                         ], docs_key='vias')
     ]
 
     files_cache = {}
+    updated = []
+    load_config = app.config.get_namespace('FAST_LOAD_')
+    bulk_config = app.config.get_namespace('BULK_')
+    delta_config = app.config.get_namespace('DELTA_')
+    download_config = dict(DOWNLOAD_DEFAULTS,
+                           **app.config.get_namespace('DOWNLOAD_'))
 
-    for index in indices:
-        try:
-            index.create_or_reindex(es, files_cache, forced)
-        except Exception as e:
-            logger.error('Ocurrió un error al indexar:')
-            logger.error('')
-            logger.error(e)
+    purge_config = app.config.get_namespace('PURGE_')
+    purge_delay = app.config.get('INDEX_NAMES_TTL', 0)
+
+    workers = app.config.get('INDEX_WORKERS', DEFAULT_INDEX_WORKERS)
+    durations = {}
+
+    if purge_config.get('list_file'):
+        # Las claves de cada grupo se agregan al archivo a medida que se
+        # actualizan sus índices (ver 'purge_cache').
+        open(purge_config['list_file'], 'w').close()
+
+    logger.info('Grupos de índices simultáneos: {}'.format(workers))
+    logger.info('')
+
+    # Todos los archivos de datos comienzan a descargarse antes de crear los
+    # índices. Los logs de cada grupo se emiten juntos al terminar el mismo,
+    # para no mezclarlos con los de los demás grupos; mientras tanto, se
+    # escriben en un archivo por grupo en el directorio de backups. La
+    # invalidación de caches de cada grupo se realiza en un thread aparte,
+    # para no demorar la recolección de resultados del resto de los grupos.
+    purge_futures = []
+    with ThreadPoolExecutor(1) as purges, \
+            ThreadPoolExecutor(download_config['workers']) as downloads, \
+            ThreadPoolExecutor(workers) as pool:
+        for group in groups:
+            group.start_download(downloads, download_config)
+
+        futures, log_paths = {}, {}
+        for group in groups:
+            log_paths[group] = os.path.join(
+                backups_dir, '{}.log'.format(group.aliases[0]))
+            logger.info('Log de {}: {}'.format(', '.join(group.aliases),
+                                               log_paths[group]))
+            futures[pool.submit(index_group, group, es, files_cache, forced,
+                                load_config, bulk_config, delta_config,
+                                log_paths[group])] = group
+
+        logger.info('')
+
+        for future in as_completed(futures):
+            group = futures[future]
+            group_updated = []
+            try:
+                records, group_updated, elapsed = future.result()
+                for record in records:
+                    logger.handle(record)
+
+                updated.extend(group_updated)
+                durations[group] = elapsed, group_updated
+            except Exception as e:
+                # Continuar con el resto de los grupos
+                logger.error('Ocurrió un error al indexar {}:'.format(
+                    ', '.join(group.aliases)))
+                logger.error(e)
+                logger.error('Ver log del grupo: {}'.format(log_paths[group]))
+                logger.error('')
+                durations[group] = 0, []
+            finally:
+                # Invalidar los caches de cada grupo una vez transcurrido
+                # 'INDEX_NAMES_TTL' desde la actualización de sus alias, sin
+                # esperar al resto de los grupos.
+                purge_futures.append(purges.submit(
+                    purge_cache, purge_config, group_updated,
+                    time.monotonic() + purge_delay))
+
+    for future in purge_futures:
+        if future.exception():
+            logger.error('No se pudieron invalidar los caches:')
+            logger.error(future.exception())
             logger.error('')
 
+    # Listar los índices en el orden de 'groups'
+    updated.sort(key=[alias for group in groups
+                      for alias in group.aliases].index)
+
+    # Eliminar archivos descargados que no fueron utilizados como backup
+    for data in files_cache.values():
+        if data and data.temporary and os.path.exists(data.path):
+            os.remove(data.path)
+
     logger.info('')
 
+    if app.config.get('SNAPSHOTS_DIR'):
+        generate_snapshots(app.config['SNAPSHOTS_DIR'])
+
     mail_config = app.config.get_namespace('EMAIL_')
     if mail_config['enabled']:
         logger.info('Enviando mail...')
         send_index_email(mail_config, forced, env,
-                         loggerStream.getvalue())
+                         loggerStream.getvalue(), [
+                             (group.aliases,) + durations[group]
+                             for group in groups
+                         ])
         logger.info('Mail enviado.')
 
 
@@ -478,6 +1710,10 @@ def main():
     app = Flask(__name__)
     app.config.from_pyfile(args.config, silent=False)
 
+    # Permitir importar la API (por ejemplo, para generar snapshots)
+    # utilizando la misma configuración.
+    os.environ['GEOREF_CONFIG'] = os.path.join(app.root_path, args.config)
+
     if args.mode in ['index', 'index_stats']:
         options = {
             'hosts': app.config['ES_HOSTS'],
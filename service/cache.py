@@ -0,0 +1,168 @@
+"""Módulo 'cache' de georef-api
+
+Contiene estructuras utilizadas para almacenar temporalmente valores costosos
+de obtener (por ejemplo, datos que requieren consultas a Elasticsearch).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Diccionario de valores con tiempo de vida limitado. Una vez pasados
+    'ttl' segundos desde que un valor fue almacenado, el mismo se considera
+    inválido y debe ser obtenido nuevamente.
+
+    Opcionalmente, se limita la cantidad de valores almacenados: al superarse
+    'max_size', se descartan los valores expirados y luego los utilizados
+    menos recientemente (LRU). De esta forma, el tamaño del cache no depende
+    de la cantidad de claves distintas recibidas (por ejemplo, nombres
+    enviados por los usuarios).
+
+    Attributes:
+        _ttl (float): Tiempo de vida de los valores, en segundos.
+        _max_size (int): Cantidad máxima de valores (None para no limitar).
+        _values (OrderedDict): Valores almacenados, junto con su tiempo de
+            expiración, ordenados de menos a más recientemente utilizados.
+        _lock (threading.Lock): Lock utilizado para acceder a '_values'.
+
+    """
+
+    def __init__(self, ttl, max_size=None):
+        """Inicializa un objeto de tipo 'TTLCache'.
+
+        Args:
+            ttl (float): Tiempo de vida de los valores, en segundos.
+            max_size (int): Cantidad máxima de valores (None para no
+                limitar).
+
+        """
+        self._ttl = ttl
+        self._max_size = max_size
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._values)
+
+    def _lookup(self, key, now):
+        """Obtiene un valor no expirado, y lo marca como utilizado
+        recientemente. Debe ser llamado manteniendo '_lock'.
+
+        Args:
+            key (hashable): Clave del valor.
+            now (float): Tiempo actual.
+
+        Returns:
+            tuple: Valor y tiempo de expiración, o None si el valor no existe
+                o expiró.
+
+        """
+        entry = self._values.get(key)
+        if not entry:
+            return None
+
+        if entry[1] <= now:
+            del self._values[key]
+            return None
+
+        self._values.move_to_end(key)
+        return entry
+
+    def _store(self, key, value, now):
+        """Almacena un valor, descartando valores si se supera '_max_size'.
+        Debe ser llamado manteniendo '_lock'.
+
+        Args:
+            key (hashable): Clave del valor.
+            value (object): Valor a almacenar.
+            now (float): Tiempo en el que fue obtenido el valor.
+
+        """
+        self._values[key] = (value, now + self._ttl)
+        self._values.move_to_end(key)
+
+        if self._max_size is None or len(self._values) <= self._max_size:
+            return
+
+        expired = [expired_key for expired_key, entry in self._values.items()
+                   if entry[1] <= now]
+        for expired_key in expired:
+            del self._values[expired_key]
+
+        while len(self._values) > self._max_size:
+            self._values.popitem(last=False)
+
+    def get(self, key, factory):
+        """Devuelve el valor asociado a una clave. Si el valor no existe o
+        expiró, se lo obtiene utilizando la función 'factory' y se lo
+        almacena.
+
+        Args:
+            key (hashable): Clave del valor.
+            factory (function): Función sin argumentos que devuelve el valor
+                a almacenar para 'key'.
+
+        Returns:
+            object: Valor asociado a 'key'.
+
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._lookup(key, now)
+            if entry:
+                return entry[0]
+
+        # Obtener el valor sin mantener el lock, ya que 'factory' puede
+        # realizar operaciones lentas (consultas de red).
+        value = factory()
+
+        with self._lock:
+            self._store(key, value, now)
+
+        return value
+
+    def get_many(self, keys, factory):
+        """Devuelve los valores asociados a varias claves. Los valores que no
+        existen o expiraron se obtienen todos juntos, con una única llamada
+        a la función 'factory', y se almacenan.
+
+        Args:
+            keys (list): Claves de los valores.
+            factory (function): Función que recibe la lista de claves cuyos
+                valores deben ser obtenidos, y devuelve la lista de valores
+                correspondientes (en el mismo orden).
+
+        Returns:
+            list: Valores asociados a cada clave de 'keys'.
+
+        """
+        now = time.monotonic()
+        values = {}
+
+        with self._lock:
+            for key in keys:
+                entry = self._lookup(key, now)
+                if entry:
+                    values[key] = entry[0]
+
+        missing = list(dict.fromkeys(key for key in keys
+                                     if key not in values))
+        if missing:
+            # Al igual que en 'get', no mantener el lock durante la
+            # ejecución de 'factory'.
+            values.update(zip(missing, factory(missing)))
+
+            with self._lock:
+                for key in missing:
+                    self._store(key, values[key], now)
+
+        return [values[key] for key in keys]
+
+    def clear(self):
+        """Elimina todos los valores almacenados."""
+        with self._lock:
+            self._values.clear()
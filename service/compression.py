@@ -0,0 +1,295 @@
+"""Módulo 'compression' de georef-api
+
+Contiene funciones que comprimen el contenido de las respuestas HTTP, de
+acuerdo a las codificaciones aceptadas por el cliente (header
+'Accept-Encoding'). Siempre se soporta gzip; brotli y zstd se soportan solo si
+las librerías correspondientes están instaladas.
+"""
+
+import itertools
+import logging
+import threading
+import time
+import zlib
+from flask import current_app
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Valores por defecto de configuración
+DEFAULT_ENABLED = True
+DEFAULT_MIN_SIZE = 1024
+
+# Niveles de compresión por codificación: se priorizan niveles rápidos, ya que
+# el contenido de las respuestas es generado dinámicamente.
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+COMPRESSIBLE_MIMETYPES = [
+    'application/json',
+    'application/x-ndjson',
+    'application/x-msgpack',
+    'application/vnd.apache.arrow.stream',
+    'text/csv'
+]
+
+logger = logging.getLogger('georef')
+stats_logger = logging.getLogger('georef.stats')
+
+# 'time.thread_time' no está disponible en Python 3.6: en ese caso, se mide el
+# tiempo de CPU del proceso.
+cpu_time = getattr(time, 'thread_time', time.process_time)
+
+
+class BrotliCompressor:
+    """Adapta la interfaz de 'brotli.Compressor' a la interfaz de los
+    compresores de zlib (métodos 'compress' y 'flush').
+
+    """
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+def gzip_compressor():
+    return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def zstd_compressor():
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+
+# Codificaciones soportadas, en orden de preferencia (a igual calidad
+# declarada por el cliente).
+COMPRESSORS = [
+    ('zstd', zstd_compressor if zstandard else None),
+    ('br', BrotliCompressor if brotli else None),
+    ('gzip', gzip_compressor)
+]
+
+
+class CompressionStats:
+    """Acumula estadísticas de compresión de respuestas por codificación.
+
+    Las estadísticas son por proceso: si la API se ejecuta con varios workers,
+    cada uno acumula sus propios valores.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._next_log = None
+
+    def record(self, encoding, bytes_in, bytes_out, cpu_time):
+        """Registra la compresión de una respuesta.
+
+        Args:
+            encoding (str): Codificación utilizada.
+            bytes_in (int): Tamaño original del contenido.
+            bytes_out (int): Tamaño del contenido comprimido.
+            cpu_time (float): Tiempo de CPU utilizado, en segundos.
+
+        """
+        with self._lock:
+            stats = self._stats.setdefault(encoding, {
+                'respuestas': 0,
+                'bytes_originales': 0,
+                'bytes_comprimidos': 0,
+                'segundos_cpu': 0.0
+            })
+
+            stats['respuestas'] += 1
+            stats['bytes_originales'] += bytes_in
+            stats['bytes_comprimidos'] += bytes_out
+            stats['segundos_cpu'] += cpu_time
+
+    def snapshot(self):
+        """Devuelve una copia de las estadísticas acumuladas.
+
+        Returns:
+            dict: Estadísticas por codificación, incluyendo la cantidad de
+                bytes ahorrados.
+
+        """
+        with self._lock:
+            return {
+                encoding: dict(stats, bytes_ahorrados=(
+                    stats['bytes_originales'] - stats['bytes_comprimidos']))
+                for encoding, stats in self._stats.items()
+            }
+
+    def log_periodically(self, interval):
+        """Registra las estadísticas acumuladas en el log 'georef.stats' (nivel
+        INFO), como máximo una vez cada 'interval' segundos.
+
+        Args:
+            interval (float): Tiempo mínimo entre registros, en segundos (0
+                para no registrar estadísticas).
+
+        """
+        if not interval:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            if self._next_log is not None and now < self._next_log:
+                return
+            self._next_log = now + interval
+
+        stats_logger.info('Estadísticas de compresión: {}'.format(
+            self.snapshot()))
+
+
+stats = CompressionStats()
+
+
+def negotiate_encoding(request):
+    """Elige una codificación de compresión para una respuesta, a partir del
+    header 'Accept-Encoding' de la request recibida.
+
+    Args:
+        request (flask.Request): Request HTTP.
+
+    Returns:
+        tuple: Nombre de la codificación y función para crear compresores, o
+            (None, None) si no se aceptó ninguna codificación soportada.
+
+    """
+    best, best_quality = (None, None), 0
+    for encoding, compressor in COMPRESSORS:
+        if not compressor:
+            continue
+
+        quality = request.accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = (encoding, compressor), quality
+
+    return best
+
+
+def compressible(response):
+    """Determina si el contenido de una respuesta puede ser comprimido.
+
+    Args:
+        response (flask.Response): Respuesta HTTP.
+
+    Returns:
+        bool: Verdadero si la respuesta puede ser comprimida.
+
+    """
+    return (200 <= response.status_code < 300 and
+            response.status_code != 204 and
+            not response.direct_passthrough and
+            'Content-Encoding' not in response.headers and
+            response.mimetype in COMPRESSIBLE_MIMETYPES)
+
+
+def compress_chunks(chunks, encoding, compressor):
+    """Comprime un iterable de bloques de bytes incrementalmente. Al terminar,
+    registra las estadísticas de compresión.
+
+    Args:
+        chunks (iterable): Bloques de bytes a comprimir.
+        encoding (str): Nombre de la codificación.
+        compressor: Compresor a utilizar (con métodos 'compress' y 'flush').
+
+    Yields:
+        bytes: Bloques de bytes comprimidos.
+
+    """
+    bytes_in, bytes_out, elapsed = 0, 0, 0.0
+
+    for chunk in itertools.chain(chunks, [None]):
+        start = cpu_time()
+        if chunk is None:
+            compressed = compressor.flush()
+        else:
+            bytes_in += len(chunk)
+            compressed = compressor.compress(chunk)
+        elapsed += cpu_time() - start
+
+        if compressed:
+            bytes_out += len(compressed)
+            yield compressed
+
+    stats.record(encoding, bytes_in, bytes_out, elapsed)
+    logger.debug('Compresión {}: {} -> {} bytes ({:.1f} ms CPU)'.format(
+        encoding, bytes_in, bytes_out, elapsed * 1000))
+
+
+def compress_response(request, response):
+    """Comprime el contenido de una respuesta HTTP, si el cliente acepta
+    alguna de las codificaciones soportadas y el contenido supera el tamaño
+    mínimo configurado. Las respuestas streaming se comprimen
+    incrementalmente, a medida que su contenido es generado.
+
+    Args:
+        request (flask.Request): Request HTTP recibida.
+        response (flask.Response): Respuesta HTTP a comprimir.
+
+    Returns:
+        flask.Response: Respuesta HTTP, potencialmente comprimida.
+
+    """
+    if not current_app.config.get('COMPRESSION_ENABLED', DEFAULT_ENABLED) or \
+       not compressible(response):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    encoding, compressor = negotiate_encoding(request)
+    if not encoding:
+        return response
+
+    min_size = current_app.config.get('COMPRESSION_MIN_SIZE',
+                                      DEFAULT_MIN_SIZE)
+
+    if response.is_streamed:
+        # Leer el comienzo del contenido para determinar si supera el
+        # tamaño mínimo. Si la respuesta termina antes, no se comprime.
+        chunks = response.iter_encoded()
+        head, size = [], 0
+        for chunk in chunks:
+            head.append(chunk)
+            size += len(chunk)
+            if size >= min_size:
+                break
+        else:
+            response.set_data(b''.join(head))
+            return response
+
+        response.response = compress_chunks(itertools.chain(head, chunks),
+                                            encoding, compressor())
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        response.set_data(b''.join(compress_chunks([data], encoding,
+                                                   compressor())))
+
+    response.headers['Content-Encoding'] = encoding
+
+    # Cada codificación es una representación distinta del recurso, por lo
+    # que su ETag también debe ser distinto.
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag('{}-{}'.format(etag, encoding), weak)
+
+    return response
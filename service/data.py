@@ -4,9 +4,15 @@ Contiene funciones que ejecutan consultas a índices de Elasticsearch, o a la
 base de datos PostgreSQL.
 """
 
+import copy
 import elasticsearch
+import elasticsearch.helpers
+import itertools
+import threading
+import time
 from elasticsearch_dsl import Search, MultiSearch
 from elasticsearch_dsl.query import Match, Range, MatchPhrasePrefix, GeoShape
+from elasticsearch_dsl.query import Terms
 import logging
 import psycopg2.pool
 from service import names as N
@@ -15,8 +21,39 @@ from service import names as N
 MIN_AUTOCOMPLETE_CHARS = 4
 DEFAULT_MAX = 10
 DEFAULT_FUZZINESS = 'AUTO:4,8'
+DEFAULT_SCAN_BATCH_SIZE = 1000
+# Cantidad máxima de grupos en búsquedas de conteo (mayor a la cantidad de
+# departamentos del país).
+MAX_COUNT_GROUPS = 1000
+# Cantidad mínima de consultas por ID (sobre un mismo índice) a partir de la
+# cual se resuelven todas con una única búsqueda (ver 'search_multi').
+MIN_ID_LOOKUP_QUERIES = 2
+# Cantidad máxima de IDs a los que puede resolverse un nombre de entidad
+# (ver 'search_entity_ids').
+MAX_RESOLVED_IDS = 20
+
+# Parámetros de consultas que identifican el ID buscado, y parámetros que
+# filtran resultados, para índices de vías de circulación y de entidades.
+STREETS_ID_PARAMS = 'street_id', ['road_name', 'department', 'state',
+                                  'road_type', 'number']
+ENTITIES_ID_PARAMS = 'entity_id', ['name', 'state', 'department',
+                                   'municipality']
+
+# Índices cuyos documentos se indexan utilizando el ID de su provincia como
+# valor de routing (ver 'query_routing'). Los IDs de entidades y calles
+# comienzan con el ID de su provincia.
+ROUTED_INDICES = [N.LOCALITIES, N.STREETS]
+STATE_ID_LEN = 2
+
+# Niveles de búsqueda por nombre, de menor a mayor costo (ver
+# 'search_multi'): nombre exacto, prefijo y búsqueda difusa.
+TIER_EXACT = 'exacto'
+TIER_PREFIX = 'prefijo'
+TIER_FUZZY = 'difuso'
+NAME_TIERS = [TIER_EXACT, TIER_PREFIX, TIER_FUZZY]
 
 logger = logging.getLogger('georef')
+stats_logger = logging.getLogger('georef.stats')
 
 
 class DataConnectionException(Exception):
@@ -27,6 +64,70 @@ class DataConnectionException(Exception):
     pass
 
 
+class NameTierStats:
+    """Acumula estadísticas de búsquedas por nombre en niveles: cantidad de
+    consultas resueltas en cada nivel, y cantidad de consultas sin
+    resultados en ningún nivel.
+
+    Las estadísticas son por proceso: si la API se ejecuta con varios workers,
+    cada uno acumula sus propios valores.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._next_log = None
+
+    def record(self, tier):
+        """Registra el resultado de una búsqueda por nombre en niveles.
+
+        Args:
+            tier (str): Nivel en el que se obtuvieron resultados, o None si
+                no se obtuvieron resultados.
+
+        """
+        key = tier or 'sin_resultados'
+        with self._lock:
+            self._stats[key] = self._stats.get(key, 0) + 1
+
+        logger.debug('Búsqueda por nombre resuelta en nivel: {}'.format(key))
+
+    def snapshot(self):
+        """Devuelve una copia de las estadísticas acumuladas.
+
+        Returns:
+            dict: Cantidad de consultas por nivel.
+
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def log_periodically(self, interval):
+        """Registra las estadísticas acumuladas en el log 'georef.stats' (nivel
+        INFO), como máximo una vez cada 'interval' segundos.
+
+        Args:
+            interval (float): Tiempo mínimo entre registros, en segundos (0
+                para no registrar estadísticas).
+
+        """
+        if not interval:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            if self._next_log is not None and now < self._next_log:
+                return
+            self._next_log = now + interval
+
+        stats_logger.info('Estadísticas de búsquedas por nombre: {}'.format(
+            self.snapshot()))
+
+
+name_tier_stats = NameTierStats()
+
+
 def postgres_db_connection_pool(host, name, user, password, maxconn):
     """Crea una pool de conexiones a la base de datos PostgreSQL.
 
@@ -86,6 +187,29 @@ def elasticsearch_connection(hosts, sniff=False, sniffer_timeout=60):
         raise DataConnectionException()
 
 
+def get_index_names(es, aliases):
+    """Obtiene los nombres de los índices concretos a los que apuntan uno o
+    más alias de Elasticsearch.
+
+    Args:
+        es (Elasticsearch): Conexión a Elasticsearch.
+        aliases (list): Lista de nombres de alias.
+
+    Raises:
+        DataConnectionException: si ocurrió un error al obtener los alias.
+
+    Returns:
+        list: Nombres de los índices, ordenados alfabéticamente.
+
+    """
+    try:
+        indices = es.indices.get_alias(name=','.join(aliases))
+    except elasticsearch.ElasticsearchException:
+        raise DataConnectionException()
+
+    return sorted(indices)
+
+
 def run_searches(es, index, searches):
     """Ejecuta una lista de búsquedas Elasticsearch. Internamente, se utiliza
     la función MultiSearch.
@@ -93,7 +217,7 @@ def run_searches(es, index, searches):
     Args:
         es (Elasticsearch): Conexión a Elasticsearch.
         index (str): Nombre del índice sobre el cual se deberían ejecutar las
-            queries.
+            queries, o None si cada búsqueda especifica su índice.
         searches (list): Lista de búsquedas, de tipo Search.
 
     Raises:
@@ -120,7 +244,148 @@ def run_searches(es, index, searches):
         raise DataConnectionException()
 
 
-def search_entities(es, index, params_list):
+def search_page(es, index, search):
+    """Ejecuta una búsqueda Elasticsearch paginada por cursor (ver el
+    parámetro 'search_after' de 'build_entity_search' y
+    'build_streets_search'). Además de los documentos encontrados, se
+    devuelven los valores de ordenamiento del último de ellos, a partir de
+    los cuales se puede obtener la página siguiente.
+
+    Args:
+        es (Elasticsearch): Conexión a Elasticsearch.
+        index (str): Nombre del índice sobre el cual se debería ejecutar la
+            query.
+        search (Search): Búsqueda a ejecutar.
+
+    Raises:
+        DataConnectionException: si ocurrió un error al ejecutar la búsqueda.
+
+    Returns:
+        tuple: Lista de documentos encontrados, y lista de valores de
+            ordenamiento del último documento (o None si no se encontraron
+            documentos).
+
+    """
+    hits = run_search(es, index, search).hits
+    last_sort = list(hits[-1].meta.sort) if hits else None
+
+    return [hit.to_dict() for hit in hits], last_sort
+
+
+def count_search(es, index, search, group_by=None):
+    """Ejecuta una búsqueda Elasticsearch sin obtener documentos, devolviendo
+    solo la cantidad total de resultados y, opcionalmente, la cantidad de
+    resultados por cada valor de un campo. Ya que no se piden documentos, la
+    búsqueda es elegible para el caché de requests de Elasticsearch (shard
+    request cache), que se invalida solo cuando el índice es modificado.
+
+    Args:
+        es (Elasticsearch): Conexión a Elasticsearch.
+        index (str): Nombre del índice sobre el cual se debería ejecutar la
+            query.
+        search (Search): Búsqueda a ejecutar.
+        group_by (str): Campo por el cual agrupar los resultados (opcional).
+
+    Raises:
+        DataConnectionException: si ocurrió un error al ejecutar la búsqueda.
+
+    Returns:
+        tuple: Cantidad total de resultados, y lista de tuplas (valor,
+            cantidad) por cada grupo (o None si no se especificó
+            'group_by').
+
+    """
+    search = search[:0].params(request_cache=True)
+    if group_by:
+        search.aggs.bucket(N.GROUPS, 'terms', field=group_by,
+                           size=MAX_COUNT_GROUPS)
+
+    response = run_search(es, index, search)
+
+    groups = None
+    if group_by:
+        groups = [
+            (bucket.key, bucket.doc_count)
+            for bucket in response.aggregations[N.GROUPS].buckets
+        ]
+
+    return response.hits.total, groups
+
+
+def run_search(es, index, search):
+    """Ejecuta una búsqueda Elasticsearch individual. Internamente, se
+    utiliza la función MultiSearch, al igual que en 'run_searches'.
+
+    Args:
+        es (Elasticsearch): Conexión a Elasticsearch.
+        index (str): Nombre del índice sobre el cual se debería ejecutar la
+            query.
+        search (Search): Búsqueda a ejecutar.
+
+    Raises:
+        DataConnectionException: si ocurrió un error al ejecutar la búsqueda.
+
+    Returns:
+        elasticsearch_dsl.response.Response: Respuesta de la búsqueda.
+
+    """
+    ms = MultiSearch(index=index, using=es).add(search)
+
+    try:
+        return ms.execute(raise_on_error=True)[0]
+    except elasticsearch.ElasticsearchException:
+        raise DataConnectionException()
+
+
+def scan_index(es, index, fields=None, excludes=None,
+               batch_size=DEFAULT_SCAN_BATCH_SIZE):
+    """Recorre todos los documentos de un índice, utilizando la API scroll de
+    Elasticsearch. El primer lote de documentos es obtenido inmediatamente,
+    para poder detectar errores de conexión antes de comenzar a procesar los
+    resultados.
+
+    Args:
+        es (Elasticsearch): Conexión a Elasticsearch.
+        index (str): Nombre del índice.
+        fields (list): Campos a incluir en los documentos (o None para
+            incluir todos).
+        excludes (list): Campos a excluir de los documentos.
+        batch_size (int): Cantidad de documentos por lote.
+
+    Raises:
+        DataConnectionException: si ocurrió un error al obtener el primer
+            lote de documentos.
+
+    Returns:
+        iterable: Lotes (listas) de documentos, con la estructura almacenada
+            en Elasticsearch.
+
+    """
+    source = {'excludes': excludes or []}
+    if fields:
+        source['includes'] = fields
+
+    hits = elasticsearch.helpers.scan(es, index=index, size=batch_size,
+                                      query={'_source': source})
+
+    def next_batch():
+        return [hit['_source'] for hit in itertools.islice(hits, batch_size)]
+
+    try:
+        first = next_batch()
+    except elasticsearch.ElasticsearchException:
+        raise DataConnectionException()
+
+    def batches():
+        batch = first
+        while batch:
+            yield batch
+            batch = next_batch()
+
+    return batches()
+
+
+def search_entities(es, index, params_list, cascade=False):
     """Busca entidades políticas (localidades, departamentos, o provincias)
     según parámetros de una o más consultas.
 
@@ -130,13 +395,313 @@ def search_entities(es, index, params_list):
         params_list (list): Lista de conjuntos de parámetros de consultas. Ver
             la documentación de la función 'build_entity_search' para más
             detalles.
+        cascade (bool): Buscar nombres por niveles (ver 'search_multi').
 
     Returns:
         list: Resultados de búsqueda de entidades.
 
     """
-    searches = (build_entity_search(**params) for params in params_list)
-    return run_searches(es, index, searches)
+    return search_multi(es, [(index, params) for params in params_list],
+                        cascade)
+
+
+def search_entities_page(es, index, params):
+    """Busca una página de entidades políticas (localidades, departamentos,
+    o provincias) según parámetros de una consulta paginada por cursor.
+
+    Args:
+        es (Elasticsearch): Cliente de Elasticsearch.
+        index (str): Nombre del índice sobre el cual realizar la búsqueda.
+        params (dict): Parámetros de la consulta. Ver la documentación de la
+            función 'build_entity_search' para más detalles.
+
+    Returns:
+        tuple: Valor de retorno de 'search_page'.
+
+    """
+    return search_page(es, index, build_entity_search(**params))
+
+
+def count_entities(es, index, params, group_by=None):
+    """Cuenta las entidades políticas (localidades, departamentos, o
+    provincias) que coinciden con los parámetros de una consulta.
+
+    Args:
+        es (Elasticsearch): Cliente de Elasticsearch.
+        index (str): Nombre del índice sobre el cual realizar la búsqueda.
+        params (dict): Parámetros de la consulta. Ver la documentación de la
+            función 'build_entity_search' para más detalles.
+        group_by (str): Campo por el cual agrupar los resultados (opcional).
+
+    Returns:
+        tuple: Valor de retorno de 'count_search'.
+
+    """
+    return count_search(es, index, build_entity_search(**params), group_by)
+
+
+def search_entity_ids(es, lookups):
+    """Obtiene los IDs de las entidades (provincias, departamentos o
+    municipios) cuyos nombres coinciden con uno o más nombres buscados. Todas
+    las búsquedas se ejecutan con una única llamada a MultiSearch.
+
+    Args:
+        es (Elasticsearch): Cliente de Elasticsearch.
+        lookups (list): Lista de tuplas (índice, nombre, exacto).
+
+    Returns:
+        list: Lista de IDs encontrados por cada búsqueda, o None si el
+            nombre coincide con más de 'MAX_RESOLVED_IDS' entidades.
+
+    """
+    searches = [
+        Search(index=index).query(build_name_query(N.NAME, name, exact))
+        .source(include=[N.ID])[:MAX_RESOLVED_IDS + 1]
+        for index, name, exact in lookups
+    ]
+
+    return [
+        [hit[N.ID] for hit in result]
+        if len(result) <= MAX_RESOLVED_IDS else None
+        for result in run_searches(es, None, searches)
+    ]
+
+
+def query_routing(index, params):
+    """Calcula el valor de routing de una consulta sobre un índice de
+    'ROUTED_INDICES', a partir del ID de provincia, o del prefijo de los IDs
+    de la entidad buscada o de su departamento o municipio. De esta forma,
+    la búsqueda se ejecuta solo sobre los shards que pueden contener
+    resultados.
+
+    Args:
+        index (str): Nombre del índice a consultar.
+        params (dict): Parámetros de la consulta.
+
+    Returns:
+        str: Valor de routing (IDs de provincias separados por comas), o None
+            si la búsqueda debe ejecutarse sobre todos los shards.
+
+    """
+    if index not in ROUTED_INDICES:
+        return None
+
+    id_param = STREETS_ID_PARAMS[0] if index == N.STREETS else \
+        ENTITIES_ID_PARAMS[0]
+
+    for param in ['state', id_param, 'department', 'municipality']:
+        value = params.get(param)
+        values = value if isinstance(value, list) else [value]
+
+        if value and all(isinstance(v, str) and v.isdigit() for v in values):
+            return ','.join(sorted({v[:STATE_ID_LEN] for v in values}))
+
+    return None
+
+
+def id_lookup_value(index, params):
+    """Determina si una consulta busca únicamente un documento por ID (sin
+    otros filtros), y en ese caso devuelve el ID buscado.
+
+    Args:
+        index (str): Nombre del índice a consultar.
+        params (dict): Parámetros de la consulta.
+
+    Returns:
+        str: ID buscado, o None si la consulta utiliza otros filtros.
+
+    """
+    id_param, filter_params = (STREETS_ID_PARAMS if index == N.STREETS
+                               else ENTITIES_ID_PARAMS)
+
+    if any(params.get(param) for param in filter_params):
+        return None
+
+    return params.get(id_param)
+
+
+def build_id_lookup_search(ids, params_list):
+    """Construye una búsqueda con Elasticsearch DSL que obtiene varios
+    documentos por ID con una única query 'terms'. Los campos a obtener son
+    la unión de los campos pedidos por cada consulta (los campos sobrantes
+    son removidos luego al aplicar el parámetro 'campos').
+
+    Args:
+        ids (list): IDs a buscar (sin repetir).
+        params_list (list): Parámetros de las consultas por ID.
+
+    Returns:
+        Search: Búsqueda de tipo Search.
+
+    """
+    fields = set()
+    excludes = None
+    for params in params_list:
+        if not params.get('fields'):
+            # Al menos una consulta pide todos los campos
+            fields = None
+        elif fields is not None:
+            fields.update(params['fields'])
+
+        query_excludes = set(params.get('excludes') or [])
+        excludes = (query_excludes if excludes is None
+                    else excludes & query_excludes)
+
+    includes = sorted(fields | {N.ID}) if fields is not None else []
+    excludes = sorted((excludes or set()) | {N.TIMESTAMP})
+
+    s = Search().query(Terms(**{N.ID: ids}))
+    s = s.source(include=includes, exclude=excludes)
+
+    routing = [params.get('routing') for params in params_list]
+    if all(routing):
+        states = {state for value in routing for state in value.split(',')}
+        s = s.params(routing=','.join(sorted(states)))
+
+    return s[:len(ids)]
+
+
+def search_multi(es, queries, cascade=False):
+    """Busca entidades políticas y/o vías de circulación según parámetros de
+    una o más consultas, posiblemente sobre distintos índices. Todas las
+    búsquedas se ejecutan con una única llamada a MultiSearch, indicando el
+    índice de cada una.
+
+    Las consultas que solo buscan un documento por ID (muy comunes en
+    operaciones bulk) se agrupan por índice, y se resuelven con una única
+    búsqueda por índice. Los documentos obtenidos se asignan luego a cada
+    consulta según su ID.
+
+    Si se activa 'cascade', las consultas por nombre (no exactas) se
+    resuelven por niveles: primero por nombre exacto, luego por prefijo, y
+    por último con la búsqueda difusa habitual, pasando al siguiente nivel
+    solo las consultas sin resultados (ver 'name_tiers'). Cada nivel
+    adicional requiere una llamada más a MultiSearch.
+
+    Args:
+        es (Elasticsearch): Cliente de Elasticsearch.
+        queries (list): Lista de tuplas (índice, parámetros). Ver la
+            documentación de las funciones 'build_entity_search' y
+            'build_streets_search' para más detalles.
+        cascade (bool): Buscar nombres por niveles.
+
+    Returns:
+        list: Resultados de búsqueda, en el orden de 'queries'.
+
+    """
+    lookups = {}
+    for i, (index, params) in enumerate(queries):
+        entity_id = id_lookup_value(index, params)
+        if entity_id:
+            lookups.setdefault(index, []).append((i, entity_id))
+
+    lookups = {
+        index: positions
+        for index, positions in lookups.items()
+        if len(positions) >= MIN_ID_LOOKUP_QUERIES
+    }
+    grouped = {i for positions in lookups.values() for i, _ in positions}
+
+    tiers = {}
+    if cascade:
+        for i, (index, params) in enumerate(queries):
+            query_tiers = name_tiers(index, params)
+            if i not in grouped and query_tiers:
+                tiers[i] = query_tiers
+
+    searches = [
+        build_search(index, params, tiers[i][0] if i in tiers else None)
+        for i, (index, params) in enumerate(queries)
+        if i not in grouped
+    ]
+
+    for index, positions in lookups.items():
+        ids = list(dict.fromkeys(entity_id for _, entity_id in positions))
+        params_list = [queries[i][1] for i, _ in positions]
+        searches.append(build_id_lookup_search(ids, params_list).index(index))
+
+    responses = iter(run_searches(es, None, searches))
+    results = [
+        None if i in grouped else next(responses)
+        for i in range(len(queries))
+    ]
+
+    for index, positions in lookups.items():
+        docs = {doc[N.ID]: doc for doc in next(responses)}
+        for i, entity_id in positions:
+            # Los resultados son modificados luego al generar las
+            # respuestas, por lo que cada consulta recibe su propia copia.
+            doc = docs.get(entity_id)
+            results[i] = [copy.deepcopy(doc)] if doc else []
+
+    while tiers:
+        for i in list(tiers):
+            if results[i] or len(tiers[i]) == 1:
+                name_tier_stats.record(tiers[i][0] if results[i] else None)
+                del tiers[i]
+            else:
+                tiers[i] = tiers[i][1:]
+
+        if tiers:
+            positions = list(tiers)
+            searches = [
+                build_search(*queries[i], tier=tiers[i][0])
+                for i in positions
+            ]
+
+            for i, result in zip(positions,
+                                 run_searches(es, None, searches)):
+                results[i] = result
+
+    return results
+
+
+def name_tiers(index, params):
+    """Determina los niveles de búsqueda por nombre a utilizar para una
+    consulta (ver 'search_multi'). La búsqueda por prefijo solo se utiliza
+    con nombres de al menos 'MIN_AUTOCOMPLETE_CHARS' caracteres, al igual
+    que en 'build_name_query'.
+
+    Args:
+        index (str): Nombre del índice a consultar.
+        params (dict): Parámetros de la consulta.
+
+    Returns:
+        list: Niveles a utilizar, o None si la consulta no busca por nombre
+            (o si busca por nombre exacto).
+
+    """
+    name = params.get('road_name' if index == N.STREETS else 'name')
+    if not name or params.get('exact'):
+        return None
+
+    if len(name.strip()) >= MIN_AUTOCOMPLETE_CHARS:
+        return NAME_TIERS
+
+    return [TIER_EXACT, TIER_FUZZY]
+
+
+def build_search(index, params, tier=None):
+    """Construye la búsqueda de una consulta sobre un índice de entidades o
+    de vías de circulación.
+
+    Args:
+        index (str): Nombre del índice a consultar.
+        params (dict): Parámetros de la consulta. Ver la documentación de las
+            funciones 'build_entity_search' y 'build_streets_search' para
+            más detalles.
+        tier (str): Nivel de búsqueda por nombre (opcional).
+
+    Returns:
+        Search: Búsqueda de tipo Search.
+
+    """
+    if index == N.STREETS:
+        s = build_streets_search(**params, name_tier=tier)
+    else:
+        s = build_entity_search(**params, name_tier=tier)
+
+    return s.index(index)
 
 
 def search_places(es, index, params_list):
@@ -167,7 +732,7 @@ def search_places(es, index, params_list):
     ]
 
 
-def search_streets(es, params_list):
+def search_streets(es, params_list, cascade=False):
     """Busca vías de circulación según parámetros de una o más consultas.
 
     Args:
@@ -175,18 +740,54 @@ def search_streets(es, params_list):
         params_list (list): Lista de conjuntos de parámetros de consultas. Ver
             la documentación de la función 'build_streets_search' para más
             detalles.
+        cascade (bool): Buscar nombres por niveles (ver 'search_multi').
 
     Returns:
         list: Resultados de búsqueda de vías de circulación.
 
     """
-    searches = (build_streets_search(**params) for params in params_list)
-    return run_searches(es, N.STREETS, searches)
+    return search_multi(es, [(N.STREETS, params) for params in params_list],
+                        cascade)
+
+
+def search_streets_page(es, params):
+    """Busca una página de vías de circulación según parámetros de una
+    consulta paginada por cursor.
+
+    Args:
+        es (Elasticsearch): Cliente de Elasticsearch.
+        params (dict): Parámetros de la consulta. Ver la documentación de la
+            función 'build_streets_search' para más detalles.
+
+    Returns:
+        tuple: Valor de retorno de 'search_page'.
+
+    """
+    return search_page(es, N.STREETS, build_streets_search(**params))
+
+
+def count_streets(es, params, group_by=None):
+    """Cuenta las vías de circulación que coinciden con los parámetros de una
+    consulta.
+
+    Args:
+        es (Elasticsearch): Cliente de Elasticsearch.
+        params (dict): Parámetros de la consulta. Ver la documentación de la
+            función 'build_streets_search' para más detalles.
+        group_by (str): Campo por el cual agrupar los resultados (opcional).
+
+    Returns:
+        tuple: Valor de retorno de 'count_search'.
+
+    """
+    return count_search(es, N.STREETS, build_streets_search(**params),
+                        group_by)
 
 
 def build_entity_search(entity_id=None, name=None, state=None,
                         department=None, municipality=None, max=None,
-                        order=None, fields=None, exact=False):
+                        order=None, fields=None, exact=False,
+                        search_after=None, name_tier=None, routing=None):
     """Construye una búsqueda con Elasticsearch DSL para entidades políticas
     (localidades, departamentos, o provincias) según parámetros de búsqueda
     de una consulta.
@@ -203,6 +804,14 @@ def build_entity_search(entity_id=None, name=None, state=None,
         exact (bool): Activa búsqueda por nombres exactos. (toma efecto sólo si
             se especificaron los parámetros 'name', 'department',
             'municipality' o 'state'.) (opcional).
+        search_after (list): Valores de ordenamiento del último resultado
+            de la página anterior, o lista vacía para obtener la primera
+            página. Si se especifica, los resultados se ordenan siempre por
+            ID (luego de 'order'), para que el orden sea total (opcional).
+        name_tier (str): Nivel de búsqueda por nombre a utilizar para
+            'name' (ver 'build_name_query') (opcional).
+        routing (str): Valor de routing de la búsqueda (ver
+            'query_routing') (opcional).
 
     Returns:
         Search: Búsqueda de tipo Search.
@@ -217,30 +826,33 @@ def build_entity_search(entity_id=None, name=None, state=None,
         s = s.query(build_match_query(N.ID, entity_id))
 
     if name:
-        s = s.query(build_name_query(N.NAME, name, exact))
+        s = s.query(build_name_query(N.NAME, name, exact, name_tier))
 
     if municipality:
-        if municipality.isdigit():
-            s = s.query(build_match_query(N.MUN_ID, municipality))
-        else:
-            s = s.query(build_name_query(N.MUN_NAME, municipality, exact))
+        s = s.query(build_hierarchy_query(N.MUN_ID, N.MUN_NAME, municipality,
+                                          exact))
 
     if department:
-        if department.isdigit():
-            s = s.query(build_match_query(N.DEPT_ID, department))
-        else:
-            s = s.query(build_name_query(N.DEPT_NAME, department, exact))
+        s = s.query(build_hierarchy_query(N.DEPT_ID, N.DEPT_NAME, department,
+                                          exact))
 
     if state:
-        if state.isdigit():
-            s = s.query(build_match_query(N.STATE_ID, state))
-        else:
-            s = s.query(build_name_query(N.STATE_NAME, state, exact))
+        s = s.query(build_hierarchy_query(N.STATE_ID, N.STATE_NAME, state,
+                                          exact))
 
+    sort = []
     if order:
         if order == N.NAME:
             order += N.EXACT_SUFFIX
-        s = s.sort(order)
+        sort.append(order)
+
+    if search_after is not None:
+        s = paginate_search(s, sort, search_after)
+    elif sort:
+        s = s.sort(*sort)
+
+    if routing:
+        s = s.params(routing=routing)
 
     s = s.source(include=fields, exclude=[N.TIMESTAMP])
     return s[:(max or DEFAULT_MAX)]
@@ -248,7 +860,9 @@ def build_entity_search(entity_id=None, name=None, state=None,
 
 def build_streets_search(street_id=None, road_name=None, department=None,
                          state=None, road_type=None, max=None, fields=None,
-                         exact=False, number=None, excludes=None):
+                         exact=False, number=None, excludes=None,
+                         search_after=None, name_tier=None,
+                         routing=None):
     """Construye una búsqueda con Elasticsearch DSL para vías de circulación
     según parámetros de búsqueda de una consulta.
 
@@ -265,6 +879,14 @@ def build_streets_search(street_id=None, road_name=None, department=None,
         exact (bool): Activa búsqueda por nombres exactos. (toma efecto sólo si
             se especificaron los parámetros 'name', 'locality', 'state' o
             'department'.) (opcional).
+        search_after (list): Valores de ordenamiento del último resultado
+            de la página anterior, o lista vacía para obtener la primera
+            página. Si se especifica, los resultados se ordenan por ID
+            (opcional).
+        name_tier (str): Nivel de búsqueda por nombre a utilizar para
+            'road_name' (ver 'build_name_query') (opcional).
+        routing (str): Valor de routing de la búsqueda (ver
+            'query_routing') (opcional).
 
     Returns:
         Search: Búsqueda de tipo Search.
@@ -285,7 +907,7 @@ def build_streets_search(street_id=None, road_name=None, department=None,
         s = s.query(build_match_query(N.ID, street_id))
 
     if road_name:
-        s = s.query(build_name_query(N.NAME, road_name, exact))
+        s = s.query(build_name_query(N.NAME, road_name, exact, name_tier))
 
     if road_type:
         s = s.query(build_match_query(N.ROAD_TYPE, road_type, fuzzy=True))
@@ -295,21 +917,48 @@ def build_streets_search(street_id=None, road_name=None, department=None,
         s = s.query(build_range_query(N.END_L, '>=', number))
 
     if department:
-        if department.isdigit():
-            s = s.query(build_match_query(N.DEPT_ID, department))
-        else:
-            s = s.query(build_name_query(N.DEPT_NAME, department, exact))
+        s = s.query(build_hierarchy_query(N.DEPT_ID, N.DEPT_NAME, department,
+                                          exact))
 
     if state:
-        if state.isdigit():
-            s = s.query(build_match_query(N.STATE_ID, state))
-        else:
-            s = s.query(build_name_query(N.STATE_NAME, state, exact))
+        s = s.query(build_hierarchy_query(N.STATE_ID, N.STATE_NAME, state,
+                                          exact))
+
+    if search_after is not None:
+        s = paginate_search(s, [], search_after)
+
+    if routing:
+        s = s.params(routing=routing)
 
     s = s.source(include=fields, exclude=[N.TIMESTAMP])
     return s[:(max or DEFAULT_MAX)]
 
 
+def paginate_search(search, sort, search_after):
+    """Agrega a una búsqueda el ordenamiento y el punto de partida necesarios
+    para paginarla por cursor. Se agrega el ID como último criterio de
+    ordenamiento, ya que es único para cada documento.
+
+    Args:
+        search (Search): Búsqueda a modificar.
+        sort (list): Campos por los cuales ordenar los resultados.
+        search_after (list): Valores de ordenamiento del último resultado
+            de la página anterior (vacía para la primera página).
+
+    Returns:
+        Search: Búsqueda paginada.
+
+    """
+    if N.ID not in sort:
+        sort = sort + [N.ID]
+
+    search = search.sort(*sort)
+    if search_after:
+        search = search.extra(search_after=search_after)
+
+    return search
+
+
 def build_place_search(lat, lon, fields=None):
     """Construye una búsqueda con Elasticsearch DSL para entidades en una
     ubicación según parámetros de búsqueda de una consulta.
@@ -340,7 +989,30 @@ def build_place_search(lat, lon, fields=None):
     return s[:1]
 
 
-def build_name_query(field, value, exact=False):
+def build_hierarchy_query(id_field, name_field, value, exact=False):
+    """Crea una condición de búsqueda por entidad contenedora (provincia,
+    departamento o municipio) para Elasticsearch.
+
+    Args:
+        id_field (str): Campo de ID de la entidad contenedora.
+        name_field (str): Campo de nombre de la entidad contenedora.
+        value (str, list): ID o nombre de la entidad, o lista de IDs (ver
+            'normalizer.resolve_hierarchy_names').
+        exact (bool): Activar modo de búsqueda exacta (para nombres).
+
+    Returns:
+        Query: Condición para Elasticsearch.
+
+    """
+    if isinstance(value, list):
+        return Terms(**{id_field: value})
+    elif value.isdigit():
+        return build_match_query(id_field, value)
+    else:
+        return build_name_query(name_field, value, exact)
+
+
+def build_name_query(field, value, exact=False, tier=None):
     """Crea una condición de búsqueda por nombre para Elasticsearch.
        Las entidades con nombres son, por el momento, las provincias, los
        departamentos, los municipios, las localidades y las calles.
@@ -349,12 +1021,19 @@ def build_name_query(field, value, exact=False):
         field (str): Campo de la condición.
         value (str): Valor de comparación.
         exact (bool): Activar modo de búsqueda exacta.
+        tier (str): Nivel de búsqueda a utilizar en lugar de la búsqueda
+            habitual: 'TIER_EXACT' equivale a la búsqueda exacta,
+            'TIER_PREFIX' busca solo por prefijo, y 'TIER_FUZZY' equivale a
+            la búsqueda habitual (opcional).
 
     Returns:
         Query: Condición para Elasticsearch.
 
     """
-    if exact:
+    if tier == TIER_PREFIX:
+        return build_match_phrase_prefix_query(field, value)
+
+    if exact or tier == TIER_EXACT:
         field += N.EXACT_SUFFIX
         return build_match_query(field, value, False)
     else:
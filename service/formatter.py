@@ -6,13 +6,37 @@ las consultas a los índices o a la base de datos.
 
 from service import strings
 from service import names as N
-import geojson
-from flask import make_response, jsonify, Response
+import functools
+import json
+import msgpack
+from flask import current_app, make_response, jsonify, Response
+
+# Dependencia opcional (ver requirements-extra.txt)
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
 
 CSV_SEP = ','
 CSV_ESCAPE = '"'
 CSV_NEWLINE = '\n'
 FLAT_SEP = '_'
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+COUNT_FORMATS = ['json', 'csv', 'msgpack']
+
+# Formatos columnares (disponibles solo si la librería 'pyarrow' está
+# instalada), y sus tipos MIME.
+COLUMNAR_MIMETYPES = {
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet'
+}
+COLUMNAR_FORMATS = sorted(COLUMNAR_MIMETYPES) if pyarrow else []
+
+# Campos numéricos de los resultados. El resto de los campos se representan
+# como strings en los formatos columnares.
+FLOAT_FIELDS = [N.C_LAT, N.C_LON, N.LOCATION_LAT, N.LOCATION_LON]
+INT_FIELDS = [N.START_R, N.START_L, N.END_R, N.END_L, N.DOOR_NUM]
 
 STATES_CSV_FIELDS = [
     (N.ID, [N.STATE, N.ID]),
@@ -212,6 +236,77 @@ def create_internal_error_response():
     }), 500)
 
 
+def create_not_modified_response(etag):
+    """Retorna una respuesta HTTP con código 304, sin contenido.
+
+    Args:
+        etag (str): ETag de la representación que posee el cliente.
+
+    Returns:
+        flask.Response: Respuesta HTTP 304.
+
+    """
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def csv_columns(csv_fields, fields):
+    """Calcula las columnas de un CSV a partir de los campos CSV de una
+    entidad y de los campos a incluir en los resultados.
+
+    Args:
+        csv_fields (list): Campos CSV de la entidad (ver 'STATES_CSV_FIELDS',
+            'DEPARTMENTS_CSV_FIELDS', etc.).
+        fields (list): Campos a incluir.
+
+    Returns:
+        tuple: Lista de keys (de resultados aplanados) a utilizar para obtener
+            el valor de cada columna, y lista de nombres de columnas.
+
+    """
+    keys = []
+    field_names = []
+    for original_field, csv_field_name in csv_fields:
+        if original_field in fields:
+            keys.append(original_field.replace('.', FLAT_SEP))
+            field_names.append(FLAT_SEP.join(csv_field_name))
+
+    return keys, field_names
+
+
+def csv_line(values):
+    """Crea una línea de texto CSV a partir de una lista de valores.
+
+    Args:
+        values (list): Valores de la línea. Los valores None se representan
+            como campos vacíos.
+
+    Returns:
+        str: Línea CSV (incluyendo el caracter de fin de línea).
+
+    """
+    escaped = []
+    for original_val in values:
+        val = str(original_val) if original_val is not None else ''
+
+        escape = False
+        if CSV_SEP in val or CSV_NEWLINE in val:
+            escape = True
+
+        if CSV_ESCAPE in val:
+            val = val.replace(CSV_ESCAPE, CSV_ESCAPE * 2)
+            escape = True
+
+        if escape:
+            escaped.append('{}{}{}'.format(CSV_ESCAPE, val, CSV_ESCAPE))
+        else:
+            escaped.append(val)
+
+    return '{}{}'.format(CSV_SEP.join(escaped), CSV_NEWLINE)
+
+
 def create_csv_response(name, result, fmt):
     """Toma un resultado (iterable) de una consulta, y devuelve una respuesta
     HTTP 200 con el resultado en formato CSV.
@@ -226,37 +321,48 @@ def create_csv_response(name, result, fmt):
 
     """
     def csv_generator():
-        keys = []
-        field_names = []
-        for original_field, csv_field_name in fmt[N.CSV_FIELDS]:
-            if original_field in fmt[N.FIELDS]:
-                keys.append(original_field.replace('.', FLAT_SEP))
-                field_names.append(FLAT_SEP.join(csv_field_name))
-
-        yield '{}{}'.format(CSV_SEP.join(field_names), CSV_NEWLINE)
+        keys, field_names = csv_columns(fmt[N.CSV_FIELDS], fmt[N.FIELDS])
+        yield csv_line(field_names)
 
         for match in result:
             flatten_dict(match, max_depth=3)
+            yield csv_line(match[key] for key in keys)
+
+    resp = Response(csv_generator(), mimetype='text/csv')
+    return make_response((resp, {
+        'Content-Disposition': 'attachment; filename={}.csv'.format(
+            name.lower())
+    }))
 
-            values = []
-            for key in keys:
-                original_val = match[key]
-                val = str(original_val) if original_val is not None else ''
 
-                escape = False
-                if CSV_SEP in val or CSV_NEWLINE in val:
-                    escape = True
+def create_csv_response_bulk(name, results, formats):
+    """Toma una lista de resultados (iterables) de una consulta o más, y
+    devuelve una respuesta HTTP 200 con los resultados en formato CSV. Cada
+    fila del CSV incluye el índice (comenzando desde 0) de la consulta que
+    generó el resultado. Las columnas del CSV se calculan a partir de la unión
+    de los campos pedidos en cada consulta.
 
-                if CSV_ESCAPE in val:
-                    val = val.replace(CSV_ESCAPE, CSV_ESCAPE * 2)
-                    escape = True
+    Args:
+        name (str): Nombre de la entidad que fue consultada.
+        results (list): Lista de resultados.
+        formats (list): Lista de parámetros de formato por consulta.
 
-                if escape:
-                    values.append('{}{}{}'.format(CSV_ESCAPE, val, CSV_ESCAPE))
-                else:
-                    values.append(val)
+    Returns:
+        flask.Response: Respuesta HTTP con contenido CSV.
 
-            yield '{}{}'.format(CSV_SEP.join(values), CSV_NEWLINE)
+    """
+    def csv_generator():
+        fields = set()
+        for fmt in formats:
+            fields.update(fmt[N.FIELDS])
+
+        keys, field_names = csv_columns(formats[0][N.CSV_FIELDS], fields)
+        yield csv_line([N.QUERY_INDEX] + field_names)
+
+        for i, result in enumerate(results):
+            for match in result:
+                flatten_dict(match, max_depth=3)
+                yield csv_line([i] + [match.get(key) for key in keys])
 
     resp = Response(csv_generator(), mimetype='text/csv')
     return make_response((resp, {
@@ -265,26 +371,287 @@ def create_csv_response(name, result, fmt):
     }))
 
 
-def create_geojson_response(result, iterable_result):
-    """Toma un resultado de una consulta, y devuelve una respuesta
-    HTTP 200 con el resultado en formato GeoJSON.
+class ChunkSink:
+    """Archivo de sólo escritura en memoria, utilizado por los escritores de
+    pyarrow. Permite obtener los bytes escritos incrementalmente, para
+    generar respuestas streaming.
+
+    Attributes:
+        closed (bool): Verdadero si el archivo fue cerrado.
+        _chunks (list): Bytes escritos desde la última llamada a 'drain'.
+        _position (int): Cantidad total de bytes escritos.
+
+    """
+
+    def __init__(self):
+        self.closed = False
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        """Devuelve los bytes escritos desde la última llamada a 'drain'.
+
+        Returns:
+            bytes: Bytes escritos.
+
+        """
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def columnar_columns(csv_fields, fields=None):
+    """Calcula las columnas de una tabla columnar (Arrow o Parquet) a partir
+    de los campos CSV de una entidad. Los nombres de las columnas son los
+    mismos que los utilizados en el formato CSV.
 
     Args:
-        result (list, dict): Entidad o lista de entidades.
-        iterable_result (bool): Verdadero si el resultado es iterable. Si no lo
-            es, internamente se crea una lista de un elemento con el resultado
-            adentro.
+        csv_fields (list): Campos CSV de la entidad (ver 'STATES_CSV_FIELDS',
+            'DEPARTMENTS_CSV_FIELDS', etc.).
+        fields (list): Campos a incluir (o None para incluir todos).
 
     Returns:
-        flask.Response: Respuesta HTTP con contenido GeoJSON.
+        tuple: Lista de paths (listas de keys) a utilizar para obtener el
+            valor de cada columna desde resultados no aplanados, y esquema
+            Arrow de la tabla.
 
     """
-    if iterable_result:
-        items = result
+    paths = []
+    schema_fields = []
+    for original_field, csv_field_name in csv_fields:
+        if fields is not None and original_field not in fields:
+            continue
+
+        if original_field in FLOAT_FIELDS:
+            arrow_type = pyarrow.float64()
+        elif original_field in INT_FIELDS:
+            arrow_type = pyarrow.int64()
+        else:
+            arrow_type = pyarrow.string()
+
+        paths.append(original_field.split('.'))
+        schema_fields.append(pyarrow.field(FLAT_SEP.join(csv_field_name),
+                                           arrow_type))
+
+    return paths, pyarrow.schema(schema_fields)
+
+
+def path_value(item, path):
+    """Obtiene un valor de un diccionario anidado.
+
+    Args:
+        item (dict): Diccionario.
+        path (list): Lista de keys a recorrer.
+
+    Returns:
+        object: Valor encontrado, o None si alguna key no existe.
+
+    """
+    for key in path:
+        if item is None:
+            return None
+
+        item = item.get(key)
+
+    return item
+
+
+def columnar_chunks(batches, paths, schema, output_format):
+    """Genera el contenido de una tabla en formato Arrow (IPC streaming) o
+    Parquet, a partir de lotes de resultados. Cada columna de cada lote se
+    construye directamente a partir de los resultados recibidos, sin
+    convertirlos a filas intermedias.
+
+    Args:
+        batches (iterable): Lotes (listas) de resultados no aplanados.
+        paths (list): Paths de cada columna (ver 'columnar_columns').
+        schema (pyarrow.Schema): Esquema de la tabla.
+        output_format (str): Formato a utilizar ('arrow' o 'parquet').
+
+    Yields:
+        bytes: Contenido de la tabla.
+
+    """
+    sink = ChunkSink()
+    if output_format == 'arrow':
+        writer = pyarrow.ipc.new_stream(sink, schema)
     else:
-        items = [result]
+        writer = pyarrow.parquet.ParquetWriter(sink, schema)
+
+    for batch in batches:
+        arrays = [
+            pyarrow.array([path_value(item, path) for item in batch],
+                          type=field.type)
+            for path, field in zip(paths, schema)
+        ]
+
+        writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays,
+                                                           schema=schema))
+        yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
+
+
+def create_columnar_response(name, result, fmt):
+    """Toma un resultado (iterable) de una consulta, y devuelve una respuesta
+    HTTP 200 con el resultado en formato Arrow o Parquet.
+
+    Args:
+        name (str): Nombre de la entidad que fue consultada.
+        result (list): Lista de entidades.
+        fmt (dict): Parámetros de formato.
+
+    Returns:
+        flask.Response: Respuesta HTTP con contenido Arrow o Parquet.
+
+    """
+    paths, schema = columnar_columns(fmt[N.CSV_FIELDS], fmt[N.FIELDS])
+    content = b''.join(columnar_chunks([result], paths, schema,
+                                       fmt[N.FORMAT]))
+
+    return columnar_response(name, content, fmt[N.FORMAT])
+
+
+def create_columnar_export_response(name, batches, csv_fields,
+                                    output_format):
+    """Toma lotes de documentos de un índice, y devuelve una respuesta HTTP
+    200 con todos los documentos en formato Arrow o Parquet. El contenido de
+    la respuesta es generado incrementalmente (un lote a la vez).
+
+    Args:
+        name (str): Nombre de la entidad exportada.
+        batches (iterable): Lotes (listas) de documentos, con la estructura
+            almacenada en Elasticsearch.
+        csv_fields (list): Campos CSV de la entidad, utilizados para definir
+            las columnas de la tabla.
+        output_format (str): Formato a utilizar ('arrow' o 'parquet').
+
+    Returns:
+        flask.Response: Respuesta HTTP con contenido Arrow o Parquet.
+
+    """
+    paths, schema = columnar_columns(csv_fields)
+    content = columnar_chunks(batches, paths, schema, output_format)
+
+    return columnar_response(name, content, output_format)
+
+
+def create_export_response(name, batches, csv_fields, output_format):
+    """Toma lotes de documentos de un índice, y devuelve una respuesta HTTP
+    200 con todos los documentos en el formato especificado. El contenido de
+    la respuesta es generado incrementalmente (un lote a la vez), por lo que
+    la memoria utilizada no depende de la cantidad de documentos.
+
+    Args:
+        name (str): Nombre de la entidad exportada.
+        batches (iterable): Lotes (listas) de documentos, con la estructura
+            almacenada en Elasticsearch.
+        csv_fields (list): Campos CSV de la entidad, utilizados para definir
+            las columnas de los formatos CSV, Arrow y Parquet.
+        output_format (str): Formato a utilizar ('csv', 'ndjson', 'arrow' o
+            'parquet').
+
+    Returns:
+        flask.Response: Respuesta HTTP con los documentos exportados.
+
+    """
+    if output_format in COLUMNAR_FORMATS:
+        return create_columnar_export_response(name, batches, csv_fields,
+                                               output_format)
+
+    if output_format == 'csv':
+        paths = [field.split('.') for field, _ in csv_fields]
+
+        def export_generator():
+            yield csv_line(FLAT_SEP.join(csv_field_name)
+                           for _, csv_field_name in csv_fields)
+
+            for batch in batches:
+                yield ''.join(csv_line(path_value(doc, path)
+                                       for path in paths)
+                              for doc in batch)
+
+        mimetype, ext = 'text/csv', 'csv'
+    else:
+        dumps = json_dumps_function()
+
+        def export_generator():
+            for batch in batches:
+                yield ''.join(dumps(doc) + '\n' for doc in batch)
+
+        mimetype, ext = 'application/x-ndjson', 'ndjson'
+
+    resp = Response(export_generator(), mimetype=mimetype)
+    return make_response((resp, {
+        'Content-Disposition': 'attachment; filename={}.{}'.format(
+            name.lower(), ext)
+    }))
 
-    features = []
+
+def columnar_response(name, content, output_format):
+    """Crea una respuesta HTTP 200 con contenido Arrow o Parquet.
+
+    Args:
+        name (str): Nombre de la entidad.
+        content (bytes, iterable): Contenido de la respuesta.
+        output_format (str): Formato del contenido ('arrow' o 'parquet').
+
+    Returns:
+        flask.Response: Respuesta HTTP.
+
+    """
+    resp = Response(content, mimetype=COLUMNAR_MIMETYPES[output_format])
+    return make_response((resp, {
+        'Content-Disposition': 'attachment; filename={}.{}'.format(
+            name.lower(), output_format)
+    }))
+
+
+def json_dumps_function():
+    """Devuelve una función que serializa valores a JSON, respetando las
+    opciones de serialización de la aplicación Flask activa. La función
+    devuelta puede ser utilizada fuera del contexto de la aplicación (por
+    ejemplo, desde generadores de respuestas streaming).
+
+    Returns:
+        function: Función que toma un valor y devuelve su representación JSON.
+
+    """
+    return functools.partial(json.dumps,
+                             ensure_ascii=current_app.config['JSON_AS_ASCII'],
+                             sort_keys=current_app.config['JSON_SORT_KEYS'],
+                             separators=(',', ':'))
+
+
+def geojson_features(items):
+    """Toma una lista de entidades y genera un Feature GeoJSON (en forma de
+    diccionario) por cada entidad con coordenadas. Los diccionarios generados
+    tienen la misma estructura que los objetos de la librería 'geojson', pero
+    se evita el costo de construirlos y validarlos.
+
+    Args:
+        items (list): Lista de entidades.
+
+    Yields:
+        dict: Feature GeoJSON.
+
+    """
     for item in items:
         lat, lon = None, None
         if N.LAT in item and N.LON in item:
@@ -296,15 +663,106 @@ def create_geojson_response(result, iterable_result):
             lon = centroid[N.LON]
 
         if lat and lon:
-            point = geojson.Point((lat, lon))
-            features.append(geojson.Feature(geometry=point, properties=item))
+            yield {
+                'type': 'Feature',
+                'geometry': {
+                    'type': 'Point',
+                    'coordinates': [lat, lon]
+                },
+                'properties': item
+            }
+
+
+def create_geojson_response(result, iterable_result):
+    """Toma un resultado de una consulta, y devuelve una respuesta
+    HTTP 200 con el resultado en formato GeoJSON. El contenido de la respuesta
+    es generado incrementalmente (un Feature a la vez).
+
+    Args:
+        result (list, dict): Entidad o lista de entidades.
+        iterable_result (bool): Verdadero si el resultado es iterable. Si no lo
+            es, internamente se crea una lista de un elemento con el resultado
+            adentro.
+
+    Returns:
+        flask.Response: Respuesta HTTP con contenido GeoJSON.
+
+    """
+    if iterable_result:
+        items = result
+    else:
+        items = [result]
+
+    dumps = json_dumps_function()
+
+    def geojson_generator():
+        yield '{"type":"FeatureCollection","features":['
+
+        for i, feature in enumerate(geojson_features(items)):
+            yield (',' if i else '') + dumps(feature)
+
+        yield ']}'
+
+    return make_response(Response(geojson_generator(),
+                                  mimetype='application/json'))
+
+
+def compact_columns(fmt):
+    """Calcula el plan de proyección de la forma compacta de un resultado:
+    las columnas a incluir, en el orden de los campos CSV de la entidad
+    (seguidos por el resto de los campos pedidos, ordenados
+    alfabéticamente).
+
+    Args:
+        fmt (dict): Parámetros de formato.
+
+    Returns:
+        tuple: Lista de paths (listas de keys) a utilizar para obtener el
+            valor de cada columna, y lista de nombres de columnas.
+
+    """
+    fields = fmt[N.FIELDS]
+    ordered = [
+        field for field, _ in fmt.get(N.CSV_FIELDS, [])
+        if field in fields
+    ]
+    ordered.extend(sorted(set(fields) - set(ordered)))
+
+    sep = FLAT_SEP if fmt.get(N.FLATTEN, False) else '.'
+    paths = [field.split('.') for field in ordered]
+    names = [field.replace('.', sep) for field in ordered]
+
+    return paths, names
+
+
+def format_result_compact(result, fmt):
+    """Toma un resultado (iterable) de una consulta, y lo devuelve en forma
+    compacta: una lista de nombres de columnas y una lista de filas, cada una
+    conteniendo los valores de una entidad.
+
+    Args:
+        result (list): Lista de entidades.
+        fmt (dict): Parámetros de formato.
+
+    Returns:
+        dict: Resultado en forma compacta.
+
+    """
+    paths, names = compact_columns(fmt)
 
-    return make_response(jsonify(geojson.FeatureCollection(features)))
+    return {
+        N.COLUMNS: names,
+        N.ROWS: [[path_value(item, path) for path in paths]
+                 for item in result]
+    }
 
 
 def format_result_json(name, result, fmt, iterable_result):
     """Toma el resultado de una consulta, y la devuelve con una estructura
-    apropiada para ser convertida a JSON.
+    apropiada para ser convertida a JSON. Si se especificó el parámetro
+    'compacto', el resultado se devuelve en forma compacta (ver
+    'format_result_compact'). Si la consulta fue paginada por cursor, se
+    incluye el cursor de la página siguiente.
 
     Args:
         name (str): Nombre de la entidad consultada.
@@ -316,14 +774,24 @@ def format_result_json(name, result, fmt, iterable_result):
         dict: Resultados con esctructura y formato apropiados.
 
     """
-    if fmt.get(N.FLATTEN, False):
-        if iterable_result:
-            for match in result:
-                flatten_dict(match, max_depth=3)
-        else:
-            flatten_dict(result, max_depth=3)
+    if fmt.get(N.COMPACT, False) and iterable_result:
+        formatted = {name: format_result_compact(result, fmt)}
+    else:
+        if fmt.get(N.FLATTEN, False):
+            if iterable_result:
+                for match in result:
+                    flatten_dict(match, max_depth=3)
+            else:
+                flatten_dict(result, max_depth=3)
+
+        formatted = {name: result}
 
-    return {name: result}
+    if N.NEXT in fmt:
+        # Consulta paginada por cursor: incluir el cursor de la página
+        # siguiente (o None, si no hay más resultados).
+        formatted[N.NEXT] = fmt[N.NEXT]
+
+    return formatted
 
 
 def create_json_response_single(name, result, fmt, iterable_result):
@@ -344,12 +812,12 @@ def create_json_response_single(name, result, fmt, iterable_result):
     return make_response(jsonify(json_response))
 
 
-def create_json_response_bulk(name, results, formats, iterable_result):
+def create_json_response_bulk(names, results, formats, iterable_result):
     """Toma una lista de resultados de una consulta o más, y devuelve una
     respuesta HTTP 200 con los resultados en formato JSON.
 
     Args:
-        name (str): Nombre de la entidad consultada.
+        names (list): Nombre de la entidad consultada por cada consulta.
         results (list): Lista de resultados.
         formats (list): Lista de parámetros de formato por consulta.
         iterable_result (bool): Verdadero si todos los resultados son
@@ -361,7 +829,7 @@ def create_json_response_bulk(name, results, formats, iterable_result):
     """
     json_results = [
         format_result_json(name, result, fmt, iterable_result)
-        for result, fmt in zip(results, formats)
+        for name, result, fmt in zip(names, results, formats)
     ]
 
     return make_response(jsonify({
@@ -369,6 +837,138 @@ def create_json_response_bulk(name, results, formats, iterable_result):
     }))
 
 
+def create_ndjson_response_bulk(names, results, formats, iterable_result):
+    """Toma una lista de resultados de una consulta o más, y devuelve una
+    respuesta HTTP 200 con los resultados en formato NDJSON (JSON delimitado
+    por líneas). Cada línea contiene el resultado de una consulta, con la
+    misma estructura que los elementos de la lista 'resultados' de las
+    respuestas JSON. El contenido de la respuesta es generado
+    incrementalmente (una consulta a la vez).
+
+    Args:
+        names (list): Nombre de la entidad consultada por cada consulta.
+        results (list): Lista de resultados.
+        formats (list): Lista de parámetros de formato por consulta.
+        iterable_result (bool): Verdadero si todos los resultados son
+            iterables.
+
+    Returns:
+        flask.Response: Respuesta HTTP con contenido NDJSON.
+
+    """
+    dumps = json_dumps_function()
+
+    def ndjson_generator():
+        for name, result, fmt in zip(names, results, formats):
+            json_result = format_result_json(name, result, fmt,
+                                             iterable_result)
+            yield dumps(json_result) + '\n'
+
+    return make_response(Response(ndjson_generator(),
+                                  mimetype='application/x-ndjson'))
+
+
+def create_msgpack_response_single(name, result, fmt, iterable_result):
+    """Toma un resultado de una consulta, y devuelve una respuesta
+    HTTP 200 con el resultado en formato MessagePack. La estructura del
+    contenido es la misma que la de las respuestas JSON.
+
+    Args:
+        name (str): Nombre de la entidad consultada.
+        result (list, dict): Entidad o lista de entidades.
+        fmt (dict): Parámetros de formato.
+        iterable_result (bool): Verdadero si el resultado es iterable.
+
+    Returns:
+        flask.Response: Respuesta HTTP con contenido MessagePack.
+
+    """
+    content = format_result_json(name, result, fmt, iterable_result)
+    return make_response(Response(msgpack.packb(content, use_bin_type=True),
+                                  mimetype=MSGPACK_MIMETYPE))
+
+
+def create_msgpack_response_bulk(names, results, formats, iterable_result):
+    """Toma una lista de resultados de una consulta o más, y devuelve una
+    respuesta HTTP 200 con los resultados en formato MessagePack. La
+    estructura del contenido es la misma que la de las respuestas JSON, y es
+    generada incrementalmente (una consulta a la vez).
+
+    Args:
+        names (list): Nombre de la entidad consultada por cada consulta.
+        results (list): Lista de resultados.
+        formats (list): Lista de parámetros de formato por consulta.
+        iterable_result (bool): Verdadero si todos los resultados son
+            iterables.
+
+    Returns:
+        flask.Response: Respuesta HTTP con contenido MessagePack.
+
+    """
+    packer = msgpack.Packer(use_bin_type=True)
+
+    def msgpack_generator():
+        yield (packer.pack_map_header(1) + packer.pack(N.RESULTS) +
+               packer.pack_array_header(len(results)))
+
+        for name, result, fmt in zip(names, results, formats):
+            yield packer.pack(format_result_json(name, result, fmt,
+                                                 iterable_result))
+
+    return make_response(Response(msgpack_generator(),
+                                  mimetype=MSGPACK_MIMETYPE))
+
+
+def create_count_response(total, groups, group_by, output_format):
+    """Toma el resultado de una consulta de conteo, y devuelve una respuesta
+    HTTP 200 con el resultado en el formato especificado. En los formatos
+    JSON y MessagePack, la respuesta contiene la cantidad total de
+    resultados, y la cantidad por grupo (si se especificó 'agrupar'). En el
+    formato CSV, se incluye una fila por grupo, o una única fila con la
+    cantidad total.
+
+    Args:
+        total (int): Cantidad total de resultados.
+        groups (list): Lista de tuplas (valor, cantidad) por grupo, o None.
+        group_by (str): Campo utilizado para agrupar los resultados, o None.
+        output_format (str): Formato de la respuesta ('json', 'csv' o
+            'msgpack').
+
+    Returns:
+        flask.Response: Respuesta HTTP 200.
+
+    """
+    if output_format == 'csv':
+        def csv_generator():
+            if groups is None:
+                yield csv_line([N.COUNT])
+                yield csv_line([total])
+            else:
+                yield csv_line([group_by.replace('.', FLAT_SEP), N.COUNT])
+                for value, count in groups:
+                    yield csv_line([value, count])
+
+        resp = Response(csv_generator(), mimetype='text/csv')
+        return make_response((resp, {
+            'Content-Disposition': 'attachment; filename={}.csv'.format(
+                N.COUNT)
+        }))
+
+    content = {N.COUNT: total}
+    if groups is not None:
+        content[N.GROUPS] = [
+            {N.ID: value, N.COUNT: count}
+            for value, count in groups
+        ]
+
+    if output_format == 'msgpack':
+        return make_response(Response(
+            msgpack.packb(content, use_bin_type=True),
+            mimetype=MSGPACK_MIMETYPE))
+
+    return make_response(jsonify(content))
+
+
 def filter_result_fields(result, fields_dict, max_depth=3):
     """Remueve campos de un resultado recursivamente de acuerdo a las
     especificaciones de un diccionario de campos.
@@ -476,22 +1076,54 @@ def create_ok_response(name, result, fmt, iterable_result=True):
         return create_csv_response(name, result, fmt)
     elif fmt[N.FORMAT] == 'geojson':
         return create_geojson_response(result, iterable_result)
+    elif fmt[N.FORMAT] == 'msgpack':
+        return create_msgpack_response_single(name, result, fmt,
+                                              iterable_result)
+    elif fmt[N.FORMAT] in COLUMNAR_FORMATS:
+        if not iterable_result:
+            raise RuntimeError(
+                'Se requieren datos iterables para crear una respuesta ' +
+                'columnar.')
+
+        return create_columnar_response(name, result, fmt)
 
 
-def create_ok_response_bulk(name, results, formats, iterable_result=True):
+def create_ok_response_bulk(name, results, formats, iterable_result=True,
+                            output_format='json'):
     """Toma una lista de resultados de una consulta o más, y devuelve una
-    respuesta HTTP 200 con los resultados en formato JSON.
+    respuesta HTTP 200 con los resultados en el formato especificado.
 
     Args:
-        name (str): Nombre de la entidad consultada.
+        name (str, list): Nombre de la entidad consultada, o lista de
+            nombres (uno por consulta) si se consultaron distintas entidades.
+            En ese caso, no se admite el formato CSV.
         results (list): Lista de resultados.
         formats (list): Lista de parámetros de formato por consulta.
         iterable_result (bool): Verdadero si todos los resultados son
             iterables.
+        output_format (str): Formato de la respuesta ('json', 'ndjson',
+            'csv' o 'msgpack').
 
     Returns:
         flask.Response: Respuesta HTTP 200.
 
     """
     format_results_fields(results, formats, iterable_result)
-    return create_json_response_bulk(name, results, formats, iterable_result)
+    names = name if isinstance(name, list) else [name] * len(results)
+
+    if output_format == 'json':
+        return create_json_response_bulk(names, results, formats,
+                                         iterable_result)
+    elif output_format == 'ndjson':
+        return create_ndjson_response_bulk(names, results, formats,
+                                           iterable_result)
+    elif output_format == 'csv':
+        if not iterable_result or isinstance(name, list):
+            raise RuntimeError(
+                'Se requieren datos iterables de una única entidad para ' +
+                'crear una respuesta CSV.')
+
+        return create_csv_response_bulk(name, results, formats)
+    elif output_format == 'msgpack':
+        return create_msgpack_response_bulk(names, results, formats,
+                                            iterable_result)
@@ -12,6 +12,7 @@ DEPARTMENTS = 'departamentos'
 MUNICIPALITIES = 'municipios'
 STATES = 'provincias'
 PLACES = 'ubicaciones'
+QUERIES = 'consultas'
 
 # Fields
 ID = 'id'
@@ -56,9 +57,18 @@ FLATTEN = 'aplanar'
 MAX = 'max'
 FORMAT = 'formato'
 EXACT = 'exacto'
+COMPACT = 'compacto'
+CURSOR = 'cursor'
+COUNT = 'cantidad'
+GROUP = 'agrupar'
 
 # Results
 RESULTS = 'resultados'
+QUERY_INDEX = 'indice_consulta'
+COLUMNS = 'columnas'
+ROWS = 'filas'
+NEXT = 'siguiente'
+GROUPS = 'grupos'
 
 # Elasticsearch
 STATE_ID = 'provincia.id'
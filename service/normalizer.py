@@ -4,10 +4,80 @@ Contiene funciones que manejan la lógica de procesamiento
 de los recursos que expone la API.
 """
 
-from service import data, params, formatter
+from service import data, params, formatter, compression, snapshots
 from service import names as N
-from flask import current_app
+from service import strings
+from service.cache import TTLCache
+from flask import current_app, after_this_request
 from contextlib import contextmanager
+from urllib.parse import urlencode
+import hashlib
+import json
+
+DEFAULT_INDEX_NAMES_TTL = 30
+DEFAULT_NAME_IDS_TTL = 3600
+DEFAULT_NAME_IDS_CACHE_SIZE = 10000
+DEFAULT_CACHE_MAX_AGE = 0
+DEFAULT_PROXY_CACHE_MAX_AGE = 0
+DEFAULT_NAME_CASCADE = False
+DEFAULT_ROUTING_ENABLED = False
+DEFAULT_STATS_LOG_INTERVAL = 300
+EXPORT_CSV_FIELDS = {
+    N.STATES: formatter.STATES_CSV_FIELDS,
+    N.DEPARTMENTS: formatter.DEPARTMENTS_CSV_FIELDS,
+    N.MUNICIPALITIES: formatter.MUNICIPALITIES_CSV_FIELDS,
+    N.LOCALITIES: formatter.LOCALITIES_CSV_FIELDS,
+    N.STREETS: formatter.STREETS_CSV_FIELDS
+}
+
+STATES_KEY_TRANSLATIONS = {
+    N.ID: 'entity_id',
+    N.NAME: 'name',
+    N.EXACT: 'exact',
+    N.ORDER: 'order',
+    N.FIELDS: 'fields',
+    N.CURSOR: 'search_after'
+}
+DEPARTMENTS_KEY_TRANSLATIONS = {
+    **STATES_KEY_TRANSLATIONS,
+    N.STATE: 'state'
+}
+MUNICIPALITIES_KEY_TRANSLATIONS = {
+    **DEPARTMENTS_KEY_TRANSLATIONS,
+    N.DEPT: 'department'
+}
+LOCALITIES_KEY_TRANSLATIONS = {
+    **MUNICIPALITIES_KEY_TRANSLATIONS,
+    N.MUN: 'municipality'
+}
+
+# Entidades aceptadas por el recurso de consultas múltiples, junto con los
+# parámetros, traducciones de keys y campos CSV de cada una.
+MULTI_ENTITIES = {
+    N.STATES: (params.PARAMS_STATES, STATES_KEY_TRANSLATIONS,
+               formatter.STATES_CSV_FIELDS),
+    N.DEPARTMENTS: (params.PARAMS_DEPARTMENTS, DEPARTMENTS_KEY_TRANSLATIONS,
+                    formatter.DEPARTMENTS_CSV_FIELDS),
+    N.MUNICIPALITIES: (params.PARAMS_MUNICIPALITIES,
+                       MUNICIPALITIES_KEY_TRANSLATIONS,
+                       formatter.MUNICIPALITIES_CSV_FIELDS),
+    N.LOCALITIES: (params.PARAMS_LOCALITIES, LOCALITIES_KEY_TRANSLATIONS,
+                   formatter.LOCALITIES_CSV_FIELDS)
+}
+
+# Parámetros de queries que filtran por entidad contenedora, junto con el
+# índice de cada entidad.
+HIERARCHY_PARAMS = [
+    ('state', N.STATES),
+    ('department', N.DEPARTMENTS),
+    ('municipality', N.MUNICIPALITIES)
+]
+
+MSGPACK_MIMETYPES = [
+    formatter.MSGPACK_MIMETYPE,
+    'application/msgpack',
+    'application/vnd.msgpack'
+]
 
 
 def get_elasticsearch():
@@ -32,6 +102,30 @@ def get_elasticsearch():
     return current_app.elasticsearch
 
 
+def name_cascade():
+    """Indica si las búsquedas por nombre deben realizarse por niveles (ver
+    'data.search_multi'), según la configuración 'NAME_CASCADE_ENABLED'.
+
+    Returns:
+        bool: Verdadero si se deben buscar nombres por niveles.
+
+    """
+    return current_app.config.get('NAME_CASCADE_ENABLED',
+                                  DEFAULT_NAME_CASCADE)
+
+
+def log_stats():
+    """Registra periódicamente en el log 'georef.stats' las estadísticas
+    acumuladas por el proceso actual, según la configuración
+    'STATS_LOG_INTERVAL' (en segundos, 0 para no registrarlas).
+
+    """
+    interval = current_app.config.get('STATS_LOG_INTERVAL',
+                                      DEFAULT_STATS_LOG_INTERVAL)
+    compression.stats.log_periodically(interval)
+    data.name_tier_stats.log_periodically(interval)
+
+
 def get_postgres_db_connection_pool():
     """Devuelve la pool de conexiones a PostgreSQL activa para la sesión
     de flask. La pool es creada si no existía.
@@ -65,6 +159,318 @@ def get_postgres_db_connection(pool):
         pool.putconn(connection)
 
 
+def get_index_names(aliases):
+    """Devuelve los nombres de los índices concretos a los que apuntan los
+    alias especificados. Los nombres se almacenan temporalmente (ver
+    'INDEX_NAMES_TTL') para evitar consultar a Elasticsearch en cada request.
+
+    Args:
+        aliases (list): Lista de nombres de alias.
+
+    Raises:
+        data.DataConnectionException: En caso de ocurrir un error de
+            conexión con la capa de manejo de datos.
+
+    Returns:
+        list: Nombres de los índices.
+
+    """
+    if not hasattr(current_app, 'index_names_cache'):
+        current_app.index_names_cache = TTLCache(current_app.config.get(
+            'INDEX_NAMES_TTL', DEFAULT_INDEX_NAMES_TTL))
+
+    es = get_elasticsearch()
+    return current_app.index_names_cache.get(
+        tuple(aliases), lambda: data.get_index_names(es, aliases))
+
+
+def resolve_hierarchy_names(queries):
+    """Reemplaza, en una o más queries, los nombres de entidades contenedoras
+    (parámetros 'state', 'department' y 'municipality') por las listas de
+    IDs de las entidades con esos nombres. De esta forma, las búsquedas
+    filtran por IDs en lugar de comparar nombres en cada documento.
+
+    Los nombres no resueltos se buscan todos juntos (ver
+    'data.search_entity_ids'), y los resultados se almacenan temporalmente
+    (ver 'NAME_IDS_TTL' y 'NAME_IDS_CACHE_SIZE'), asociados a los índices
+    concretos consultados. Si un nombre no coincide con ninguna entidad, o
+    coincide con demasiadas, se mantiene la búsqueda por nombre.
+
+    Args:
+        queries (list): Queries a modificar.
+
+    Raises:
+        data.DataConnectionException: En caso de ocurrir un error de
+            conexión con la capa de manejo de datos.
+
+    """
+    targets = []
+    for query in queries:
+        for param, index in HIERARCHY_PARAMS:
+            value = query.get(param)
+            if isinstance(value, str) and not value.isdigit():
+                targets.append((query, param, index))
+
+    if not targets:
+        return
+
+    if not hasattr(current_app, 'name_ids_cache'):
+        current_app.name_ids_cache = TTLCache(
+            current_app.config.get('NAME_IDS_TTL', DEFAULT_NAME_IDS_TTL),
+            current_app.config.get('NAME_IDS_CACHE_SIZE',
+                                   DEFAULT_NAME_IDS_CACHE_SIZE))
+
+    indices = {
+        index: tuple(get_index_names([index]))
+        for index in {index for _, _, index in targets}
+    }
+
+    keys = [
+        (index, indices[index], query[param], bool(query.get('exact')))
+        for query, param, index in targets
+    ]
+
+    es = get_elasticsearch()
+    ids_list = current_app.name_ids_cache.get_many(
+        keys, lambda missing: data.search_entity_ids(es, [
+            (index, name, exact) for index, _, name, exact in missing
+        ]))
+
+    for (query, param, _), ids in zip(targets, ids_list):
+        if ids:
+            query[param] = ids
+
+
+def set_queries_routing(queries):
+    """Agrega a una o más queries el valor de routing a utilizar en su
+    búsqueda (ver 'data.query_routing'), si se activó la configuración
+    'ROUTING_ENABLED'. Se debe llamar luego de 'resolve_hierarchy_names',
+    ya que los IDs de provincias resueltos también determinan el routing.
+
+    Args:
+        queries (list): Lista de tuplas (índice, query) a modificar.
+
+    """
+    if not current_app.config.get('ROUTING_ENABLED',
+                                  DEFAULT_ROUTING_ENABLED):
+        return
+
+    for index, query in queries:
+        routing = data.query_routing(index, query)
+        if routing:
+            query['routing'] = routing
+
+
+def build_etag(name, aliases, parsed_params):
+    """Construye un ETag fuerte para una consulta. El ETag se deriva de los
+    nombres de los índices concretos utilizados (que cambian en cada
+    reindexación) y de los parámetros de la consulta ya parseados, por lo que
+    dos consultas equivalentes (por ejemplo, con parámetros en distinto orden)
+    obtienen el mismo valor.
+
+    Args:
+        name (str): Nombre del recurso consultado.
+        aliases (list): Alias de los índices utilizados por la consulta.
+        parsed_params (dict): Parámetros parseados de la consulta.
+
+    Raises:
+        data.DataConnectionException: En caso de ocurrir un error de
+            conexión con la capa de manejo de datos.
+
+    Returns:
+        str: ETag de la consulta.
+
+    """
+    canonical = json.dumps({
+        'recurso': name,
+        'indices': get_index_names(aliases),
+        'parametros': parsed_params
+    }, sort_keys=True, separators=(',', ':'), default=str)
+
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+def matching_etag(request, etag):
+    """Busca, en el header 'If-None-Match' de una request, el ETag
+    especificado o alguna de sus variantes comprimidas (ver
+    'compression.compress_response').
+
+    Args:
+        request (flask.Request): Request HTTP recibida.
+        etag (str): ETag de la consulta.
+
+    Returns:
+        str: ETag encontrado, o None si ninguno coincide.
+
+    """
+    if request.if_none_match.star_tag:
+        return etag
+
+    candidates = [etag] + [
+        '{}-{}'.format(etag, encoding)
+        for encoding, _ in compression.COMPRESSORS
+    ]
+
+    for candidate in candidates:
+        if request.if_none_match.contains(candidate):
+            return candidate
+
+    return None
+
+
+def set_cache_headers(response, aliases):
+    """Agrega a una respuesta los headers utilizados por clientes y proxies
+    para cachearla. El header 'Surrogate-Key' contiene los alias de los
+    índices utilizados para generar la respuesta, de forma que la misma pueda
+    ser invalidada cuando alguno de ellos es actualizado (ver la opción
+    'PURGE_HOOK' del script de indexación).
+
+    Args:
+        response (flask.Response): Respuesta HTTP a modificar.
+        aliases (list): Alias de los índices utilizados por la consulta.
+
+    """
+    max_age = current_app.config.get('CACHE_MAX_AGE', DEFAULT_CACHE_MAX_AGE)
+    proxy_max_age = current_app.config.get('PROXY_CACHE_MAX_AGE',
+                                           DEFAULT_PROXY_CACHE_MAX_AGE)
+
+    response.headers['Surrogate-Key'] = ' '.join(aliases)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.cache_control.s_maxage = proxy_max_age
+    # Tiene prioridad sobre Cache-Control en nginx, y no es enviado al
+    # cliente.
+    response.headers['X-Accel-Expires'] = str(proxy_max_age)
+
+
+def negotiate_format(request, parsed_params, received_params):
+    """Si el parámetro 'formato' no fue especificado, elige el formato de la
+    respuesta a partir del header 'Accept' de la request (JSON o
+    MessagePack). En ese caso, la respuesta incluirá el header 'Vary: Accept'.
+
+    Args:
+        request (flask.Request): Request HTTP recibida.
+        parsed_params (dict): Parámetros parseados, a modificar.
+        received_params (dict): Parámetros recibidos (query string o cuerpo
+            de la request), sin parsear. Puede ser None.
+
+    """
+    if received_params and N.FORMAT in received_params:
+        return
+
+    @after_this_request
+    def add_vary_header(response):
+        response.vary.add('Accept')
+        return response
+
+    # A igual calidad, se prioriza JSON (el primer elemento de la lista)
+    mimetype = request.accept_mimetypes.best_match(
+        ['application/json'] + MSGPACK_MIMETYPES)
+
+    if mimetype in MSGPACK_MIMETYPES:
+        parsed_params[N.FORMAT] = 'msgpack'
+
+
+def validate_cursor(parsed_params, sort_length):
+    """Comprueba que el cursor de paginación recibido (si existe) contenga un
+    valor por cada criterio de ordenamiento de la consulta. Esto no sucede,
+    por ejemplo, si se reutiliza un cursor cambiando el parámetro 'orden'.
+
+    Args:
+        parsed_params (dict): Parámetros parseados de la consulta.
+        sort_length (int): Cantidad de criterios de ordenamiento de la
+            consulta.
+
+    Raises:
+        params.ParameterParsingException: Si el cursor no es válido.
+
+    """
+    cursor = parsed_params.get(N.CURSOR)
+    if cursor and len(cursor) != sort_length:
+        raise params.ParameterParsingException({
+            N.CURSOR: params.ParamError(params.ParamErrorType.VALUE_ERROR,
+                                        strings.CURSOR_INVALID,
+                                        'querystring')
+        })
+
+
+def is_count_query(parsed_params):
+    """Determina si una consulta es de conteo (parámetros 'cantidad' o
+    'agrupar').
+
+    Args:
+        parsed_params (dict): Parámetros parseados de la consulta.
+
+    Returns:
+        bool: Verdadero si la consulta es de conteo.
+
+    """
+    return bool(parsed_params.get(N.COUNT) or parsed_params.get(N.GROUP))
+
+
+def validate_count_format(parsed_params):
+    """Comprueba que el formato pedido para una consulta de conteo (si lo
+    es) sea uno de los formatos admitidos por 'create_count_response'.
+
+    Args:
+        parsed_params (dict): Parámetros parseados de la consulta.
+
+    Raises:
+        params.ParameterParsingException: Si el formato no es válido.
+
+    """
+    if is_count_query(parsed_params) and \
+       parsed_params[N.FORMAT] not in formatter.COUNT_FORMATS:
+        raise params.ParameterParsingException({
+            N.FORMAT: params.ParamError(
+                params.ParamErrorType.INVALID_CHOICE,
+                strings.COUNT_FORMAT_INVALID.format(
+                    ', '.join(formatter.COUNT_FORMATS)),
+                'querystring')
+        })
+
+
+def next_page_cursor(result, last_sort, page_size):
+    """Genera el cursor de la página siguiente de una consulta paginada.
+
+    Args:
+        result (list): Resultados de la página actual.
+        last_sort (list): Valores de ordenamiento del último resultado (ver
+            'data.search_page').
+        page_size (int): Tamaño de página pedido (parámetro 'max').
+
+    Returns:
+        str: Cursor de la página siguiente, o None si la página actual es la
+            última.
+
+    """
+    if last_sort is None or len(result) < page_size:
+        return None
+
+    return params.encode_cursor(last_sort)
+
+
+def set_next_page_link(request, response, cursor):
+    """Agrega a una respuesta el header 'Link' con la URL de la página
+    siguiente de una consulta paginada. El header se utiliza en todos los
+    formatos, incluyendo los que no pueden contener el cursor (CSV, GeoJSON,
+    etc.).
+
+    Args:
+        request (flask.Request): Request HTTP recibida.
+        response (flask.Response): Respuesta HTTP a modificar.
+        cursor (str): Cursor de la página siguiente (o None).
+
+    """
+    if not cursor:
+        return
+
+    args = request.args.copy()
+    args[N.CURSOR] = cursor
+    response.headers['Link'] = '<{}?{}>; rel="next"'.format(
+        request.base_url, urlencode(list(args.items(multi=True))))
+
+
 def get_index_source(index):
     """Devuelve la fuente para un índice dado.
 
@@ -135,32 +541,104 @@ def process_entity_single(request, name, param_parser, key_translations,
     """
     try:
         qs_params = param_parser.parse_get_params(request.args)
+        # Con 'orden=nombre', se ordena por nombre y luego por ID
+        validate_cursor(qs_params, 2 if qs_params[N.ORDER] == N.NAME else 1)
+        validate_count_format(qs_params)
     except params.ParameterParsingException as e:
         return formatter.create_param_error_response_single(e.errors)
 
+    negotiate_format(request, qs_params, request.args)
+
+    etag = build_etag(name, [name], qs_params)
+    client_etag = matching_etag(request, etag)
+    if client_etag:
+        response = formatter.create_not_modified_response(client_etag)
+        set_cache_headers(response, [name])
+        return response
+
+    response = snapshots.create_snapshot_response(request, etag)
+    if response:
+        set_cache_headers(response, [name])
+        return response
+
     # Construir query a partir de parámetros
     query = translate_keys(qs_params, key_translations,
-                           ignore=[N.FLATTEN, N.FORMAT])
+                           ignore=[N.FLATTEN, N.FORMAT, N.COMPACT, N.COUNT,
+                                   N.GROUP])
 
     # Construir reglas de formato a partir de parámetros
     fmt = {
         key: qs_params[key]
-        for key in [N.FLATTEN, N.FIELDS, N.FORMAT]
+        for key in [N.FLATTEN, N.FIELDS, N.FORMAT, N.COMPACT]
         if key in qs_params
     }
     fmt[N.CSV_FIELDS] = csv_fields
 
+    resolve_hierarchy_names([query])
+    set_queries_routing([(name, query)])
+
     es = get_elasticsearch()
-    result = data.search_entities(es, name, [query])[0]
+    if is_count_query(qs_params):
+        group_by = qs_params.get(N.GROUP)
+        total, groups = data.count_entities(es, name, query, group_by)
+        response = formatter.create_count_response(
+            total, groups, group_by, qs_params[N.FORMAT])
+    else:
+        if qs_params[N.CURSOR] is None:
+            result = data.search_entities(es, name, [query],
+                                          name_cascade())[0]
+        else:
+            result, last_sort = data.search_entities_page(es, name, query)
+            fmt[N.NEXT] = next_page_cursor(result, last_sort,
+                                           qs_params[N.MAX])
 
-    source = get_index_source(name)
-    for match in result:
-        match[N.SOURCE] = source
+        source = get_index_source(name)
+        for match in result:
+            match[N.SOURCE] = source
+
+        response = formatter.create_ok_response(name, result, fmt)
+
+    response.set_etag(etag)
+    set_cache_headers(response, [name])
+    set_next_page_link(request, response, fmt.get(N.NEXT))
+    return response
+
+
+def build_entity_query_format(parsed_params, key_translations, csv_fields):
+    """Construye dos diccionarios a partir de parámetros de consulta
+    recibidos en una operación bulk, el primero representando la query a
+    Elasticsearch a realizar y el segundo representando las propiedades de
+    formato (presentación) que se le debe dar a los datos obtenidos de la
+    misma.
+
+    Args:
+        parsed_params (dict): Parámetros de una consulta para un índice de
+            entidades.
+        key_translations (dict): Traducciones de keys a utilizar para
+            convertir los parámetros a una query a Elasticsearch.
+        csv_fields (dict): Diccionario a utilizar para modificar los campos
+            cuando se utiliza el formato CSV.
+
+    Returns:
+        tuple: diccionario de query y diccionario de formato
+    """
+    # Construir query a partir de parámetros
+    query = translate_keys(parsed_params, key_translations,
+                           ignore=[N.FLATTEN, N.FORMAT, N.COMPACT])
 
-    return formatter.create_ok_response(name, result, fmt)
+    # Construir reglas de formato a partir de parámetros
+    fmt = {
+        key: parsed_params[key]
+        for key in [N.FLATTEN, N.FIELDS, N.COMPACT]
+        if key in parsed_params
+    }
+    fmt[N.CSV_FIELDS] = csv_fields
+
+    return query, fmt
 
 
-def process_entity_bulk(request, name, param_parser, key_translations):
+def process_entity_bulk(request, name, param_parser, key_translations,
+                        csv_fields):
     """Procesa una request POST para consultar datos de una lista de entidades.
     En caso de ocurrir un error de parseo, se retorna una respuesta HTTP 400.
 
@@ -172,6 +650,8 @@ def process_entity_bulk(request, name, param_parser, key_translations):
         key_translations (dict): Traducciones de keys a utilizar para convertir
             los diccionarios de parámetros del usuario a una lista de
             diccionarios representando las queries a Elasticsearch.
+        csv_fields (dict): Diccionario a utilizar para modificar los campos
+            cuando se utiliza el formato CSV.
 
     Raises:
         data.DataConnectionException: En caso de ocurrir un error de
@@ -183,35 +663,33 @@ def process_entity_bulk(request, name, param_parser, key_translations):
     try:
         body_params = param_parser.parse_post_params(
             request.args, request.json and request.json.get(name))
+        bulk_params = param_parser.parse_post_bulk_params(request.json)
     except params.ParameterParsingException as e:
         return formatter.create_param_error_response_bulk(e.errors)
 
+    negotiate_format(request, bulk_params, request.json)
+
     queries = []
     formats = []
     for parsed_params in body_params:
-        # Construir query a partir de parámetros
-        query = translate_keys(parsed_params, key_translations,
-                               ignore=[N.FLATTEN, N.FORMAT])
-
-        # Construir reglas de formato a partir de parámetros
-        fmt = {
-            key: parsed_params[key]
-            for key in [N.FLATTEN, N.FIELDS]
-            if key in parsed_params
-        }
-
+        query, fmt = build_entity_query_format(parsed_params,
+                                               key_translations, csv_fields)
         queries.append(query)
         formats.append(fmt)
 
+    resolve_hierarchy_names(queries)
+    set_queries_routing([(name, query) for query in queries])
+
     es = get_elasticsearch()
-    results = data.search_entities(es, name, queries)
+    results = data.search_entities(es, name, queries, name_cascade())
 
     source = get_index_source(name)
     for result in results:
         for match in result:
             match[N.SOURCE] = source
 
-    return formatter.create_ok_response_bulk(name, results, formats)
+    return formatter.create_ok_response_bulk(
+        name, results, formats, output_format=bulk_params[N.FORMAT])
 
 
 def process_entity(request, name, param_parser, key_translations, csv_fields):
@@ -239,10 +717,51 @@ def process_entity(request, name, param_parser, key_translations, csv_fields):
                                          key_translations, csv_fields)
         else:
             return process_entity_bulk(request, name, param_parser,
-                                       key_translations)
+                                       key_translations, csv_fields)
+    except data.DataConnectionException:
+        return formatter.create_internal_error_response()
+
+
+def process_export(request, name):
+    """Procesa una request GET para exportar todos los datos de una entidad
+    (o de calles) en formato CSV, NDJSON o columnar. Los documentos se
+    obtienen del índice por lotes (API scroll), y la respuesta es generada
+    incrementalmente.
+    En caso de ocurrir un error de parseo, se retorna una respuesta HTTP 400.
+    En caso de ocurrir un error interno, se retorna una respuesta HTTP 500.
+
+    Args:
+        request (flask.Request): Request GET de flask.
+        name (str): Nombre de la entidad a exportar.
+
+    Returns:
+        flask.Response: respuesta HTTP
+    """
+    try:
+        qs_params = params.PARAMS_EXPORT.parse_get_params(request.args)
+    except params.ParameterParsingException as e:
+        return formatter.create_param_error_response_single(e.errors)
+
+    csv_fields = EXPORT_CSV_FIELDS[name]
+    source = get_index_source(name)
+    fields = [field for field, _ in csv_fields if field != N.SOURCE]
+
+    try:
+        es = get_elasticsearch()
+        batches = data.scan_index(es, name, fields=fields)
     except data.DataConnectionException:
         return formatter.create_internal_error_response()
 
+    def add_source(batches):
+        for batch in batches:
+            for doc in batch:
+                doc[N.SOURCE] = source
+
+            yield batch
+
+    return formatter.create_export_response(
+        name, add_source(batches), csv_fields, qs_params[N.FORMAT])
+
 
 def process_state(request):
     """Procesa una request GET o POST para consultar datos de provincias.
@@ -254,13 +773,9 @@ def process_state(request):
     Returns:
         flask.Response: respuesta HTTP
     """
-    return process_entity(request, N.STATES, params.PARAMS_STATES, {
-            N.ID: 'entity_id',
-            N.NAME: 'name',
-            N.EXACT: 'exact',
-            N.ORDER: 'order',
-            N.FIELDS: 'fields'
-    }, formatter.STATES_CSV_FIELDS)
+    return process_entity(request, N.STATES, params.PARAMS_STATES,
+                          STATES_KEY_TRANSLATIONS,
+                          formatter.STATES_CSV_FIELDS)
 
 
 def process_department(request):
@@ -274,14 +789,9 @@ def process_department(request):
         flask.Response: respuesta HTTP
     """
     return process_entity(request, N.DEPARTMENTS,
-                          params.PARAMS_DEPARTMENTS, {
-                              N.ID: 'entity_id',
-                              N.NAME: 'name',
-                              N.STATE: 'state',
-                              N.EXACT: 'exact',
-                              N.ORDER: 'order',
-                              N.FIELDS: 'fields'
-                          }, formatter.DEPARTMENTS_CSV_FIELDS)
+                          params.PARAMS_DEPARTMENTS,
+                          DEPARTMENTS_KEY_TRANSLATIONS,
+                          formatter.DEPARTMENTS_CSV_FIELDS)
 
 
 def process_municipality(request):
@@ -295,15 +805,9 @@ def process_municipality(request):
         flask.Response: respuesta HTTP
     """
     return process_entity(request, N.MUNICIPALITIES,
-                          params.PARAMS_MUNICIPALITIES, {
-                              N.ID: 'entity_id',
-                              N.NAME: 'name',
-                              N.STATE: 'state',
-                              N.DEPT: 'department',
-                              N.EXACT: 'exact',
-                              N.ORDER: 'order',
-                              N.FIELDS: 'fields'
-                          }, formatter.MUNICIPALITIES_CSV_FIELDS)
+                          params.PARAMS_MUNICIPALITIES,
+                          MUNICIPALITIES_KEY_TRANSLATIONS,
+                          formatter.MUNICIPALITIES_CSV_FIELDS)
 
 
 def process_locality(request):
@@ -316,16 +820,9 @@ def process_locality(request):
     Returns:
         flask.Response: respuesta HTTP
     """
-    return process_entity(request, N.LOCALITIES, params.PARAMS_LOCALITIES, {
-            N.ID: 'entity_id',
-            N.NAME: 'name',
-            N.STATE: 'state',
-            N.DEPT: 'department',
-            N.MUN: 'municipality',
-            N.EXACT: 'exact',
-            N.ORDER: 'order',
-            N.FIELDS: 'fields'
-    }, formatter.LOCALITIES_CSV_FIELDS)
+    return process_entity(request, N.LOCALITIES, params.PARAMS_LOCALITIES,
+                          LOCALITIES_KEY_TRANSLATIONS,
+                          formatter.LOCALITIES_CSV_FIELDS)
 
 
 def build_street_query_format(parsed_params):
@@ -349,15 +846,16 @@ def build_street_query_format(parsed_params):
         N.DEPT: 'department',
         N.EXACT: 'exact',
         N.FIELDS: 'fields',
-        N.ROAD_TYPE: 'road_type'
-    }, ignore=[N.FLATTEN, N.FORMAT])
+        N.ROAD_TYPE: 'road_type',
+        N.CURSOR: 'search_after'
+    }, ignore=[N.FLATTEN, N.FORMAT, N.COMPACT, N.COUNT, N.GROUP])
 
     query['excludes'] = [N.GEOM]
 
     # Construir reglas de formato a partir de parámetros
     fmt = {
         key: parsed_params[key]
-        for key in [N.FLATTEN, N.FIELDS, N.FORMAT]
+        for key in [N.FLATTEN, N.FIELDS, N.FORMAT, N.COMPACT]
         if key in parsed_params
     }
     fmt[N.CSV_FIELDS] = formatter.STREETS_CSV_FIELDS
@@ -381,19 +879,48 @@ def process_street_single(request):
     """
     try:
         qs_params = params.PARAMS_STREETS.parse_get_params(request.args)
+        validate_cursor(qs_params, 1)
+        validate_count_format(qs_params)
     except params.ParameterParsingException as e:
         return formatter.create_param_error_response_single(e.errors)
 
+    negotiate_format(request, qs_params, request.args)
+
+    etag = build_etag(N.STREETS, [N.STREETS], qs_params)
+    client_etag = matching_etag(request, etag)
+    if client_etag:
+        response = formatter.create_not_modified_response(client_etag)
+        set_cache_headers(response, [N.STREETS])
+        return response
+
     query, fmt = build_street_query_format(qs_params)
+    resolve_hierarchy_names([query])
+    set_queries_routing([(N.STREETS, query)])
 
     es = get_elasticsearch()
-    result = data.search_streets(es, [query])[0]
+    if is_count_query(qs_params):
+        group_by = qs_params[N.GROUP]
+        total, groups = data.count_streets(es, query, group_by)
+        response = formatter.create_count_response(
+            total, groups, group_by, qs_params[N.FORMAT])
+    else:
+        if qs_params[N.CURSOR] is None:
+            result = data.search_streets(es, [query], name_cascade())[0]
+        else:
+            result, last_sort = data.search_streets_page(es, query)
+            fmt[N.NEXT] = next_page_cursor(result, last_sort,
+                                           qs_params[N.MAX])
 
-    source = get_index_source(N.STREETS)
-    for match in result:
-        match[N.SOURCE] = source
+        source = get_index_source(N.STREETS)
+        for match in result:
+            match[N.SOURCE] = source
 
-    return formatter.create_ok_response(N.STREETS, result, fmt)
+        response = formatter.create_ok_response(N.STREETS, result, fmt)
+
+    response.set_etag(etag)
+    set_cache_headers(response, [N.STREETS])
+    set_next_page_link(request, response, fmt.get(N.NEXT))
+    return response
 
 
 def process_street_bulk(request):
@@ -413,9 +940,13 @@ def process_street_bulk(request):
     try:
         body_params = params.PARAMS_STREETS.parse_post_params(
             request.args, request.json and request.json.get(N.STREETS))
+        bulk_params = params.PARAMS_STREETS.parse_post_bulk_params(
+            request.json)
     except params.ParameterParsingException as e:
         return formatter.create_param_error_response_bulk(e.errors)
 
+    negotiate_format(request, bulk_params, request.json)
+
     queries = []
     formats = []
     for parsed_params in body_params:
@@ -423,15 +954,19 @@ def process_street_bulk(request):
         queries.append(query)
         formats.append(fmt)
 
+    resolve_hierarchy_names(queries)
+    set_queries_routing([(N.STREETS, query) for query in queries])
+
     es = get_elasticsearch()
-    results = data.search_streets(es, queries)
+    results = data.search_streets(es, queries, name_cascade())
 
     source = get_index_source(N.STREETS)
     for result in results:
         for match in result:
             match[N.SOURCE] = source
 
-    return formatter.create_ok_response_bulk(N.STREETS, results, formats)
+    return formatter.create_ok_response_bulk(
+        N.STREETS, results, formats, output_format=bulk_params[N.FORMAT])
 
 
 def process_street(request):
@@ -454,6 +989,70 @@ def process_street(request):
         return formatter.create_internal_error_response()
 
 
+def process_multi(request):
+    """Procesa una request POST con consultas a distintas entidades
+    (provincias, departamentos, municipios, localidades y calles). Todas las
+    consultas se ejecutan con una única búsqueda MultiSearch, y los
+    resultados se devuelven en el orden en que fueron recibidas.
+    En caso de ocurrir un error de parseo, se retorna una respuesta HTTP 400.
+    En caso de ocurrir un error interno, se retorna una respuesta HTTP 500.
+
+    Args:
+        request (flask.Request): Request POST de flask.
+
+    Returns:
+        flask.Response: respuesta HTTP
+    """
+    param_sets = {
+        name: param_parser
+        for name, (param_parser, _, _) in MULTI_ENTITIES.items()
+    }
+    param_sets[N.STREETS] = params.PARAMS_STREETS
+
+    try:
+        body_params = params.parse_post_params_multi(
+            request.args, request.json and request.json.get(N.QUERIES),
+            param_sets)
+        bulk_params = params.PARAMS_QUERIES.parse_post_bulk_params(
+            request.json)
+    except params.ParameterParsingException as e:
+        return formatter.create_param_error_response_bulk(e.errors)
+
+    negotiate_format(request, bulk_params, request.json)
+
+    names = []
+    queries = []
+    formats = []
+    for name, parsed_params in body_params:
+        if name == N.STREETS:
+            query, fmt = build_street_query_format(parsed_params)
+        else:
+            _, key_translations, csv_fields = MULTI_ENTITIES[name]
+            query, fmt = build_entity_query_format(parsed_params,
+                                                   key_translations,
+                                                   csv_fields)
+
+        names.append(name)
+        queries.append((name, query))
+        formats.append(fmt)
+
+    try:
+        resolve_hierarchy_names([query for _, query in queries])
+        set_queries_routing(queries)
+        es = get_elasticsearch()
+        results = data.search_multi(es, queries, name_cascade())
+    except data.DataConnectionException:
+        return formatter.create_internal_error_response()
+
+    for name, result in zip(names, results):
+        source = get_index_source(name)
+        for match in result:
+            match[N.SOURCE] = source
+
+    return formatter.create_ok_response_bulk(
+        names, results, formats, output_format=bulk_params[N.FORMAT])
+
+
 def build_addresses_result(result, query, source):
     """Construye resultados para una consulta al endpoint de direcciones.
     Modifica los resultados contenidos en la lista 'result', agregando
@@ -516,7 +1115,7 @@ def build_address_query_format(parsed_params):
         N.STATE: 'state',
         N.EXACT: 'exact',
         N.ROAD_TYPE: 'road_type'
-    }, ignore=[N.FLATTEN, N.FORMAT, N.FIELDS])
+    }, ignore=[N.FLATTEN, N.FORMAT, N.FIELDS, N.COMPACT])
 
     query['fields'] = parsed_params[N.FIELDS] + [N.GEOM, N.START_R, N.END_L]
     query['excludes'] = [N.START_L, N.END_R]
@@ -524,7 +1123,7 @@ def build_address_query_format(parsed_params):
     # Construir reglas de formato a partir de parámetros
     fmt = {
         key: parsed_params[key]
-        for key in [N.FLATTEN, N.FIELDS, N.FORMAT]
+        for key in [N.FLATTEN, N.FIELDS, N.FORMAT, N.COMPACT]
         if key in parsed_params
     }
     fmt[N.CSV_FIELDS] = formatter.ADDRESSES_CSV_FIELDS
@@ -551,15 +1150,29 @@ def process_address_single(request):
     except params.ParameterParsingException as e:
         return formatter.create_param_error_response_single(e.errors)
 
+    negotiate_format(request, qs_params, request.args)
+
+    etag = build_etag(N.ADDRESSES, [N.STREETS], qs_params)
+    client_etag = matching_etag(request, etag)
+    if client_etag:
+        response = formatter.create_not_modified_response(client_etag)
+        set_cache_headers(response, [N.STREETS])
+        return response
+
     query, fmt = build_address_query_format(qs_params)
+    resolve_hierarchy_names([query])
+    set_queries_routing([(N.STREETS, query)])
 
     es = get_elasticsearch()
-    result = data.search_streets(es, [query])[0]
+    result = data.search_streets(es, [query], name_cascade())[0]
 
     source = get_index_source(N.STREETS)
     build_addresses_result(result, query, source)
 
-    return formatter.create_ok_response(N.ADDRESSES, result, fmt)
+    response = formatter.create_ok_response(N.ADDRESSES, result, fmt)
+    response.set_etag(etag)
+    set_cache_headers(response, [N.STREETS])
+    return response
 
 
 def process_address_bulk(request):
@@ -579,9 +1192,13 @@ def process_address_bulk(request):
     try:
         body_params = params.PARAMS_ADDRESSES.parse_post_params(
             request.args, request.json and request.json.get(N.ADDRESSES))
+        bulk_params = params.PARAMS_ADDRESSES.parse_post_bulk_params(
+            request.json)
     except params.ParameterParsingException as e:
         return formatter.create_param_error_response_bulk(e.errors)
 
+    negotiate_format(request, bulk_params, request.json)
+
     queries = []
     formats = []
     for parsed_params in body_params:
@@ -589,14 +1206,18 @@ def process_address_bulk(request):
         queries.append(query)
         formats.append(fmt)
 
+    resolve_hierarchy_names(queries)
+    set_queries_routing([(N.STREETS, query) for query in queries])
+
     es = get_elasticsearch()
-    results = data.search_streets(es, queries)
+    results = data.search_streets(es, queries, name_cascade())
 
     source = get_index_source(N.STREETS)
     for result, query in zip(results, queries):
         build_addresses_result(result, query, source)
 
-    return formatter.create_ok_response_bulk(N.ADDRESSES, results, formats)
+    return formatter.create_ok_response_bulk(
+        N.ADDRESSES, results, formats, output_format=bulk_params[N.FORMAT])
 
 
 def process_address(request):
@@ -748,6 +1369,8 @@ def process_place_single(request):
     except params.ParameterParsingException as e:
         return formatter.create_param_error_response_single(e.errors)
 
+    negotiate_format(request, qs_params, request.args)
+
     query, fmt = build_place_query_format(qs_params)
 
     es = get_elasticsearch()
@@ -774,9 +1397,13 @@ def process_place_bulk(request):
     try:
         body_params = params.PARAMS_PLACE.parse_post_params(
             request.args, request.json and request.json.get(N.PLACES))
+        bulk_params = params.PARAMS_PLACE.parse_post_bulk_params(
+            request.json)
     except params.ParameterParsingException as e:
         return formatter.create_param_error_response_bulk(e.errors)
 
+    negotiate_format(request, bulk_params, request.json)
+
     queries = []
     formats = []
     for parsed_params in body_params:
@@ -787,8 +1414,9 @@ def process_place_bulk(request):
     es = get_elasticsearch()
     results = process_place_queries(es, queries)
 
-    return formatter.create_ok_response_bulk(N.PLACE, results, formats,
-                                             iterable_result=False)
+    return formatter.create_ok_response_bulk(
+        N.PLACE, results, formats, iterable_result=False,
+        output_format=bulk_params[N.FORMAT])
 
 
 def process_place(request):
@@ -6,13 +6,17 @@ HTTP.
 
 import service.names as N
 from service import strings
+from service import formatter
 
+import base64
+import json
 import re
 from enum import Enum, unique
 from collections import namedtuple
 
 MAX_BULK_LEN = 5000
 MAX_SIZE_LEN = MAX_BULK_LEN
+CURSOR_START = '*'
 
 
 class ParameterParsingException(Exception):
@@ -342,6 +346,53 @@ class IntParameter(Parameter):
                 strings.INT_VAL_BIG_GLOBAL.format(self._upper_limit))
 
 
+class CursorParameter(Parameter):
+    """Representa un parámetro de tipo cursor de paginación. El valor '*'
+    indica la primera página de resultados; el resto de los valores deben ser
+    cursores generados por la API (ver 'encode_cursor').
+
+    Se heredan las propiedades y métodos de la clase Parameter, definiendo
+    nuevamente el método '_parse_value' para implementar lógica de parseo y
+    validación propias de CursorParameter.
+
+    """
+
+    def _parse_value(self, val):
+        if val == CURSOR_START:
+            return []
+
+        try:
+            values = json.loads(base64.urlsafe_b64decode(val.encode()))
+        except ValueError:
+            raise ValueError(strings.CURSOR_INVALID)
+
+        if not values or not isinstance(values, list):
+            raise ValueError(strings.CURSOR_INVALID)
+
+        # Los valores de ordenamiento son siempre escalares: otros valores
+        # (por ejemplo, de un cursor modificado) generarían un error en
+        # Elasticsearch.
+        if not all(isinstance(value, (str, int, float)) for value in values):
+            raise ValueError(strings.CURSOR_INVALID)
+
+        return values
+
+
+def encode_cursor(values):
+    """Genera un cursor de paginación a partir de los valores de
+    ordenamiento del último resultado de una página.
+
+    Args:
+        values (list): Valores de ordenamiento (ver 'data.search_page').
+
+    Returns:
+        str: Cursor (opaco para el usuario) de la página siguiente.
+
+    """
+    content = json.dumps(values, separators=(',', ':'))
+    return base64.urlsafe_b64encode(content.encode()).decode()
+
+
 class FloatParameter(Parameter):
     """Representa un parámetro de tipo float.
 
@@ -416,14 +467,20 @@ class EndpointParameters():
             parámetros aceptados vía querystring en requests GET Y parámetros
             aceptados vía body en requests POST (compartidos).
 
+        _bulk_params (dict): Similar a 'get_qs_params', pero contiene
+            parámetros aceptados en el nivel superior del body en requests
+            POST, que aplican a todas las operaciones bulk recibidas.
+
     """
 
-    def __init__(self, shared_params=None, get_qs_params=None):
+    def __init__(self, shared_params=None, get_qs_params=None,
+                 bulk_params=None):
         """Inicializa un objeto de tipo EndpointParameters.
 
         Args:
             get_qs_params (dict): Ver atributo 'get_qs_params'.
             shared_params (dict): Ver atributo 'shared_params'.
+            bulk_params (dict): Ver atributo 'bulk_params'.
 
         """
         shared_params = shared_params or {}
@@ -431,6 +488,7 @@ class EndpointParameters():
 
         self._get_qs_params = {**get_qs_params, **shared_params}
         self._post_body_params = shared_params
+        self._bulk_params = bulk_params or {}
 
     def parse_params_dict(self, params, received, from_source):
         """Parsea parámetros (clave-valor) recibidos en una request HTTP,
@@ -572,6 +630,38 @@ class EndpointParameters():
 
         return results
 
+    def parse_post_bulk_params(self, body):
+        """Parsea parámetros (clave-valor) recibidos en el nivel superior del
+        body de una request HTTP POST, que aplican a todas las operaciones
+        bulk. Las claves del body que no correspondan a parámetros bulk son
+        ignoradas.
+
+        Args:
+            body (dict): Body de la request HTTP.
+
+        Returns:
+            dict: Valor de retorno de 'parse_dict_params'.
+
+        Raises:
+            ParameterParsingException: Excepción con errores de parseo
+                de parámetros.
+
+        """
+        received = {}
+        if hasattr(body, 'get'):
+            received = {
+                name: body[name]
+                for name in self._bulk_params
+                if name in body
+            }
+
+        try:
+            return self.parse_params_dict(self._bulk_params, received, 'body')
+        except ParameterParsingException as e:
+            # Los errores de parámetros bulk se informan como una lista,
+            # al igual que el resto de los errores en requests POST.
+            raise ParameterParsingException([e.errors])
+
     def parse_get_params(self, qs_params):
         """Parsea parámetros (clave-valor) recibidos en una request HTTP GET
         utilizando el conjunto de parámetros internos.
@@ -591,6 +681,94 @@ class EndpointParameters():
                                       'querystring')
 
 
+def parse_post_params_multi(qs_params, body_params, param_sets):
+    """Parsea operaciones bulk de distintos tipos recibidas en el body de una
+    request HTTP POST. Cada operación es un objeto con una única clave (el
+    nombre del recurso a consultar), cuyo valor contiene los parámetros de la
+    consulta. Las operaciones de cada recurso se parsean en conjunto con el
+    objeto EndpointParameters correspondiente (ver 'parse_post_params').
+
+    Args:
+        qs_params (dict): Parámetros recibidos en el query string.
+        body_params (list): Lista de operaciones recibidas en el body.
+        param_sets (dict): Objetos EndpointParameters a utilizar, por nombre
+            de recurso.
+
+    Returns:
+        list: Lista de tuplas (nombre de recurso, parámetros parseados), en
+            el orden en que fueron recibidas las operaciones.
+
+    Raises:
+        ParameterParsingException: Excepción con errores de parseo
+            de parámetros.
+
+    """
+    if qs_params:
+        raise ParameterParsingException([
+            {'querystring': ParamError(ParamErrorType.INVALID_LOCATION,
+                                       strings.BULK_QS_INVALID,
+                                       'querystring')}
+        ])
+
+    if not body_params or not isinstance(body_params, list):
+        raise ParameterParsingException([
+            {'body': ParamError(ParamErrorType.INVALID_BULK,
+                                strings.INVALID_BULK, 'body')}
+        ])
+
+    if len(body_params) > MAX_BULK_LEN:
+        raise ParameterParsingException([
+            {'body': ParamError(
+                ParamErrorType.INVALID_BULK_LEN,
+                strings.BULK_LEN_ERROR.format(MAX_BULK_LEN), 'body')}
+        ])
+
+    # Agrupar las operaciones por recurso, recordando su posición
+    groups = {}
+    errors_list = [{} for _ in body_params]
+    for i, operation in enumerate(body_params):
+        if not isinstance(operation, dict) or len(operation) != 1 or \
+           next(iter(operation)) not in param_sets:
+            errors_list[i]['body'] = ParamError(
+                ParamErrorType.INVALID_BULK_ENTRY,
+                strings.INVALID_QUERIES_ENTRY.format(', '.join(param_sets)),
+                'body')
+            continue
+
+        name, entry = next(iter(operation.items()))
+        groups.setdefault(name, []).append((i, entry))
+
+    results = [None] * len(body_params)
+    for name, entries in groups.items():
+        positions = [i for i, _ in entries]
+        try:
+            parsed_list = param_sets[name].parse_post_params(
+                None, [entry for _, entry in entries])
+        except ParameterParsingException as e:
+            for i, errors in zip(positions, e.errors):
+                errors_list[i].update(errors)
+            continue
+
+        for i, parsed in zip(positions, parsed_list):
+            results[i] = name, parsed
+
+    if any(errors_list):
+        raise ParameterParsingException(errors_list)
+
+    # Cada grupo valida la suma de sus parámetros 'max', pero el límite
+    # aplica a la request completa: validar la suma de todas las operaciones.
+    if sum(parsed.get(N.MAX, 0) for _, parsed in results) > MAX_SIZE_LEN:
+        error = ParamError(ParamErrorType.INVALID_SET,
+                           strings.INT_VAL_BIG_GLOBAL.format(MAX_SIZE_LEN),
+                           'body')
+        raise ParameterParsingException([
+            {N.MAX: error} if N.MAX in parsed else {}
+            for _, parsed in results
+        ])
+
+    return results
+
+
 PARAMS_STATES = EndpointParameters(shared_params={
     N.ID: IdParameter(length=2),
     N.NAME: StrParameter(),
@@ -599,9 +777,17 @@ PARAMS_STATES = EndpointParameters(shared_params={
     N.FIELDS: StrListParameter(constants=[N.ID, N.NAME, N.SOURCE],
                                optionals=[N.C_LAT, N.C_LON]),
     N.MAX: IntParameter(default=24, lower_limit=1, upper_limit=MAX_SIZE_LEN),
-    N.EXACT: BoolParameter()
+    N.EXACT: BoolParameter(),
+    N.COMPACT: BoolParameter()
 }, get_qs_params={
-    N.FORMAT: StrParameter(default='json', choices=['json', 'csv', 'geojson'])
+    N.FORMAT: StrParameter(default='json',
+                           choices=['json', 'csv', 'geojson', 'msgpack'] +
+                           formatter.COLUMNAR_FORMATS),
+    N.CURSOR: CursorParameter(),
+    N.COUNT: BoolParameter()
+}, bulk_params={
+    N.FORMAT: StrParameter(default='json',
+                           choices=['json', 'ndjson', 'csv', 'msgpack'])
 })
 
 PARAMS_DEPARTMENTS = EndpointParameters(shared_params={
@@ -614,9 +800,18 @@ PARAMS_DEPARTMENTS = EndpointParameters(shared_params={
                                optionals=[N.C_LAT, N.C_LON, N.STATE_ID,
                                           N.STATE_NAME]),
     N.MAX: IntParameter(default=10, lower_limit=1, upper_limit=MAX_SIZE_LEN),
-    N.EXACT: BoolParameter()
+    N.EXACT: BoolParameter(),
+    N.COMPACT: BoolParameter()
 }, get_qs_params={
-    N.FORMAT: StrParameter(default='json', choices=['json', 'csv', 'geojson'])
+    N.FORMAT: StrParameter(default='json',
+                           choices=['json', 'csv', 'geojson', 'msgpack'] +
+                           formatter.COLUMNAR_FORMATS),
+    N.CURSOR: CursorParameter(),
+    N.COUNT: BoolParameter(),
+    N.GROUP: StrParameter(choices=[N.STATE_ID])
+}, bulk_params={
+    N.FORMAT: StrParameter(default='json',
+                           choices=['json', 'ndjson', 'csv', 'msgpack'])
 })
 
 PARAMS_MUNICIPALITIES = EndpointParameters(shared_params={
@@ -631,9 +826,18 @@ PARAMS_MUNICIPALITIES = EndpointParameters(shared_params={
                                           N.STATE_NAME, N.DEPT_ID,
                                           N.DEPT_NAME]),
     N.MAX: IntParameter(default=10, lower_limit=1, upper_limit=MAX_SIZE_LEN),
-    N.EXACT: BoolParameter()
+    N.EXACT: BoolParameter(),
+    N.COMPACT: BoolParameter()
 }, get_qs_params={
-    N.FORMAT: StrParameter(default='json', choices=['json', 'csv', 'geojson'])
+    N.FORMAT: StrParameter(default='json',
+                           choices=['json', 'csv', 'geojson', 'msgpack'] +
+                           formatter.COLUMNAR_FORMATS),
+    N.CURSOR: CursorParameter(),
+    N.COUNT: BoolParameter(),
+    N.GROUP: StrParameter(choices=[N.STATE_ID, N.DEPT_ID])
+}, bulk_params={
+    N.FORMAT: StrParameter(default='json',
+                           choices=['json', 'ndjson', 'csv', 'msgpack'])
 })
 
 PARAMS_LOCALITIES = EndpointParameters(shared_params={
@@ -650,9 +854,18 @@ PARAMS_LOCALITIES = EndpointParameters(shared_params={
                                           N.MUN_ID, N.MUN_NAME,
                                           N.LOCALITY_TYPE]),
     N.MAX: IntParameter(default=10, lower_limit=1, upper_limit=MAX_SIZE_LEN),
-    N.EXACT: BoolParameter()
+    N.EXACT: BoolParameter(),
+    N.COMPACT: BoolParameter()
 }, get_qs_params={
-    N.FORMAT: StrParameter(default='json', choices=['json', 'csv', 'geojson'])
+    N.FORMAT: StrParameter(default='json',
+                           choices=['json', 'csv', 'geojson', 'msgpack'] +
+                           formatter.COLUMNAR_FORMATS),
+    N.CURSOR: CursorParameter(),
+    N.COUNT: BoolParameter(),
+    N.GROUP: StrParameter(choices=[N.STATE_ID, N.DEPT_ID])
+}, bulk_params={
+    N.FORMAT: StrParameter(default='json',
+                           choices=['json', 'ndjson', 'csv', 'msgpack'])
 })
 
 PARAMS_ADDRESSES = EndpointParameters(shared_params={
@@ -668,9 +881,14 @@ PARAMS_ADDRESSES = EndpointParameters(shared_params={
                                           N.FULL_NAME, N.LOCATION_LAT,
                                           N.LOCATION_LON]),
     N.MAX: IntParameter(default=10, lower_limit=1, upper_limit=MAX_SIZE_LEN),
-    N.EXACT: BoolParameter()
+    N.EXACT: BoolParameter(),
+    N.COMPACT: BoolParameter()
 }, get_qs_params={
-    N.FORMAT: StrParameter(default='json', choices=['json', 'csv'])
+    N.FORMAT: StrParameter(default='json',
+                           choices=['json', 'csv', 'msgpack'])
+}, bulk_params={
+    N.FORMAT: StrParameter(default='json',
+                           choices=['json', 'ndjson', 'csv', 'msgpack'])
 })
 
 PARAMS_STREETS = EndpointParameters(shared_params={
@@ -686,9 +904,18 @@ PARAMS_STREETS = EndpointParameters(shared_params={
                                           N.DEPT_ID, N.DEPT_NAME, N.FULL_NAME,
                                           N.ROAD_TYPE]),
     N.MAX: IntParameter(default=10, lower_limit=1, upper_limit=MAX_SIZE_LEN),
-    N.EXACT: BoolParameter()
+    N.EXACT: BoolParameter(),
+    N.COMPACT: BoolParameter()
 }, get_qs_params={
-    N.FORMAT: StrParameter(default='json', choices=['json', 'csv'])
+    N.FORMAT: StrParameter(default='json',
+                           choices=['json', 'csv', 'msgpack'] +
+                           formatter.COLUMNAR_FORMATS),
+    N.CURSOR: CursorParameter(),
+    N.COUNT: BoolParameter(),
+    N.GROUP: StrParameter(choices=[N.STATE_ID, N.DEPT_ID])
+}, bulk_params={
+    N.FORMAT: StrParameter(default='json',
+                           choices=['json', 'ndjson', 'csv', 'msgpack'])
 })
 
 PARAMS_PLACE = EndpointParameters(shared_params={
@@ -699,5 +926,20 @@ PARAMS_PLACE = EndpointParameters(shared_params={
                                optionals=[N.DEPT_ID, N.DEPT_NAME, N.MUN_ID,
                                           N.MUN_NAME, N.LAT, N.LON])
 }, get_qs_params={
-    N.FORMAT: StrParameter(default='json', choices=['json', 'geojson'])
+    N.FORMAT: StrParameter(default='json',
+                           choices=['json', 'geojson', 'msgpack'])
+}, bulk_params={
+    N.FORMAT: StrParameter(default='json',
+                           choices=['json', 'ndjson', 'msgpack'])
+})
+
+PARAMS_EXPORT = EndpointParameters(get_qs_params={
+    N.FORMAT: StrParameter(default='csv',
+                           choices=['csv', 'ndjson'] +
+                           formatter.COLUMNAR_FORMATS)
+})
+
+PARAMS_QUERIES = EndpointParameters(bulk_params={
+    N.FORMAT: StrParameter(default='json',
+                           choices=['json', 'ndjson', 'msgpack'])
 })
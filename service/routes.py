@@ -4,7 +4,7 @@ Declara las rutas de los recursos que expone la API e
 invoca las funciones que procesan dichos recursos.
 """
 
-from service import app, normalizer, formatter
+from service import app, normalizer, formatter, compression
 from flask import request, Blueprint
 from functools import wraps
 
@@ -34,6 +34,17 @@ def handle_404(e):
     return formatter.create_404_error_response()
 
 
+@app.after_request
+def compress_response(response):
+    return compression.compress_response(request, response)
+
+
+@app.after_request
+def log_stats(response):
+    normalizer.log_stats()
+    return response
+
+
 # API v1.0
 bp_v1_0 = Blueprint('georef_v1.0', __name__)
 
@@ -74,6 +85,17 @@ def get_placement():
     return normalizer.process_place(request)
 
 
+@bp_v1_0.route('/consultas', methods=['POST'])
+def get_multi():
+    return normalizer.process_multi(request)
+
+
+@bp_v1_0.route('/<any({}):name>/exportar'.format(
+    ', '.join(normalizer.EXPORT_CSV_FIELDS)))
+def get_export(name):
+    return normalizer.process_export(request, name)
+
+
 # Última versión de la API
 app.register_blueprint(bp_v1_0, url_prefix='/api')
 
@@ -0,0 +1,165 @@
+"""Módulo 'snapshots' de georef-api
+
+Contiene funciones que generan y sirven snapshots: respuestas precalculadas
+(comprimidas con gzip) de consultas sin filtros a los índices de entidades.
+Los snapshots se generan luego de cada reindexación, y se identifican por el
+ETag de la consulta correspondiente, que depende de los índices utilizados y
+de los parámetros recibidos (ver 'normalizer.build_etag').
+"""
+
+import gzip
+import json
+import logging
+import os
+from flask import current_app, Response
+from service import names as N
+from service import params
+
+SNAPSHOT_ENTITIES = [N.STATES, N.DEPARTMENTS, N.MUNICIPALITIES]
+SNAPSHOT_FORMATS = ['json', 'csv', 'geojson']
+SNAPSHOT_HEADERS = ['Content-Type', 'Content-Disposition']
+
+DATA_EXT = '.gz'
+HEADERS_EXT = '.json'
+
+logger = logging.getLogger('georef')
+
+
+def snapshot_queries():
+    """Genera las consultas cuyas respuestas deben ser precalculadas: para
+    cada entidad y formato, la consulta sin parámetros y la consulta con el
+    máximo valor posible de 'max' (listado completo).
+
+    Yields:
+        tuple: Path del recurso y parámetros de la consulta.
+
+    """
+    for entity in SNAPSHOT_ENTITIES:
+        for fmt in SNAPSHOT_FORMATS:
+            yield '/api/' + entity, {N.FORMAT: fmt}
+            yield '/api/' + entity, {N.FORMAT: fmt,
+                                     N.MAX: params.MAX_SIZE_LEN}
+
+
+def write_snapshot(directory, etag, response):
+    """Almacena el contenido y los headers de una respuesta HTTP como
+    snapshot. Los archivos se escriben primero con un nombre temporal, para
+    que la API nunca lea un snapshot incompleto; el archivo de headers se
+    escribe último, ya que su existencia indica que el snapshot está
+    completo.
+
+    Args:
+        directory (str): Directorio de snapshots.
+        etag (str): ETag de la respuesta.
+        response (flask.Response): Respuesta HTTP generada por la API.
+
+    """
+    headers = {
+        header: response.headers[header]
+        for header in SNAPSHOT_HEADERS
+        if header in response.headers
+    }
+
+    for ext, content in [
+            (DATA_EXT, gzip.compress(response.get_data())),
+            (HEADERS_EXT, json.dumps(headers).encode())
+    ]:
+        path = os.path.join(directory, etag + ext)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(content)
+
+        os.replace(path + '.tmp', path)
+
+
+def generate_snapshots(app, directory):
+    """Genera los snapshots de todas las consultas listadas por
+    'snapshot_queries', utilizando la API directamente (sin servidor HTTP).
+    Elimina los snapshots generados anteriormente que ya no son utilizados
+    (por ejemplo, los de índices reemplazados).
+
+    Args:
+        app (flask.Flask): Aplicación de la API.
+        directory (str): Directorio de snapshots.
+
+    Returns:
+        list: ETags de los snapshots vigentes.
+
+    """
+    os.makedirs(directory, exist_ok=True)
+    client = app.test_client()
+    etags = []
+
+    for path, query_params in snapshot_queries():
+        response = client.get(path, query_string=query_params)
+        etag, _ = response.get_etag()
+
+        if response.status_code != 200 or not etag:
+            logger.warning('No se pudo generar el snapshot de {} ({}).'.format(
+                path, query_params))
+            continue
+
+        if not os.path.isfile(os.path.join(directory, etag + DATA_EXT)):
+            write_snapshot(directory, etag, response)
+
+        etags.append(etag)
+
+    for filename in os.listdir(directory):
+        etag, ext = os.path.splitext(filename)
+        if ext in [DATA_EXT, HEADERS_EXT] and etag not in etags:
+            os.remove(os.path.join(directory, filename))
+
+    return etags
+
+
+def create_snapshot_response(request, etag):
+    """Crea una respuesta HTTP a partir del snapshot de una consulta, si
+    existe. Si se configuró 'SNAPSHOTS_ACCEL_REDIRECT', el contenido es
+    enviado por nginx (header X-Accel-Redirect). En caso contrario, si el
+    cliente acepta gzip, el contenido es enviado sin descomprimir.
+
+    Args:
+        request (flask.Request): Request HTTP recibida.
+        etag (str): ETag de la consulta.
+
+    Returns:
+        flask.Response: Respuesta HTTP con el contenido del snapshot, o None
+            si el snapshot no existe (o si no se configuró el uso de
+            snapshots).
+
+    """
+    directory = current_app.config.get('SNAPSHOTS_DIR')
+    if not directory:
+        return None
+
+    path = os.path.join(directory, etag)
+
+    try:
+        with open(path + HEADERS_EXT) as f:
+            headers = json.load(f)
+
+        accel_prefix = current_app.config.get('SNAPSHOTS_ACCEL_REDIRECT')
+        if accel_prefix:
+            response = Response(headers=headers)
+            # nginx debe servir el archivo con la directiva 'gzip_static',
+            # que agrega la extensión '.gz' al path recibido.
+            response.headers['X-Accel-Redirect'] = '{}/{}'.format(
+                accel_prefix.rstrip('/'), etag)
+            response.set_etag(etag)
+            return response
+
+        with open(path + DATA_EXT, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        # El snapshot no existe, o fue eliminado por una reindexación.
+        return None
+
+    if request.accept_encodings['gzip']:
+        response = Response(data, headers=headers)
+        response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag('{}-gzip'.format(etag))
+    else:
+        response = Response(gzip.decompress(data), headers=headers)
+        response.set_etag(etag)
+
+    response.vary.add('Accept-Encoding')
+    return response
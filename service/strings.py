@@ -31,3 +31,8 @@ INT_VAL_BIG_GLOBAL = 'La suma de parámetros \'max\' debe ser menor o igual \
 que {}.'
 NOT_FOUND = 'No se encontró la URL especificada.'
 ID_PARAM_INVALID = 'El ID debe ser numérico y de longitud {}.'
+CURSOR_INVALID = 'El cursor no es válido para la consulta.'
+COUNT_FORMAT_INVALID = 'Las consultas de conteo (parámetros \'cantidad\' y \
+\'agrupar\') solo admiten los siguientes formatos: {}.'
+INVALID_QUERIES_ENTRY = 'Las operaciones deben ser objetos con una única \
+clave, que debe tomar uno de los siguientes valores: {}.'
@@ -0,0 +1,56 @@
+from unittest import TestCase, mock
+from service.cache import TTLCache
+
+
+class TTLCacheTest(TestCase):
+    def test_expired_value(self):
+        """Un valor expirado debería ser obtenido nuevamente."""
+        cache = TTLCache(10)
+
+        with mock.patch('time.monotonic', return_value=0):
+            self.assertEqual(cache.get('a', lambda: 1), 1)
+            self.assertEqual(cache.get('a', lambda: 2), 1)
+
+        with mock.patch('time.monotonic', return_value=10):
+            self.assertEqual(cache.get('a', lambda: 2), 2)
+
+    def test_max_size(self):
+        """La cantidad de valores almacenados no debería superar el tamaño
+        máximo, sin importar la cantidad de claves distintas utilizadas."""
+        cache = TTLCache(3600, max_size=10)
+
+        for i in range(1000):
+            cache.get(i, lambda: i)
+            cache.get_many([str(i), -i], lambda keys: keys)
+
+        self.assertEqual(len(cache), 10)
+
+    def test_lru_eviction(self):
+        """Al superarse el tamaño máximo, se debería descartar el valor
+        utilizado menos recientemente."""
+        cache = TTLCache(3600, max_size=2)
+        cache.get('a', lambda: 1)
+        cache.get('b', lambda: 2)
+        cache.get('a', lambda: None)
+        cache.get('c', lambda: 3)
+
+        self.assertEqual(cache.get_many(['a', 'b', 'c'],
+                                        lambda keys: [None] * len(keys)),
+                         [1, None, 3])
+
+    def test_expired_values_evicted_first(self):
+        """Al superarse el tamaño máximo, se deberían descartar primero los
+        valores expirados."""
+        cache = TTLCache(10, max_size=2)
+
+        with mock.patch('time.monotonic', return_value=0):
+            cache.get('a', lambda: 1)
+
+        with mock.patch('time.monotonic', return_value=5):
+            cache.get('b', lambda: 2)
+
+        with mock.patch('time.monotonic', return_value=12):
+            cache.get('b', lambda: None)
+            cache.get('c', lambda: 3)
+            self.assertEqual(len(cache), 2)
+            self.assertEqual(cache.get('b', lambda: None), 2)
@@ -0,0 +1,102 @@
+from unittest import TestCase
+import unittest
+import gzip
+from flask import request, Response
+from service import app, compression
+
+CSV_CONTENT = 'id,nombre\n' + '06,BUENOS AIRES\n' * 1000
+
+
+class CompressionTest(TestCase):
+    def test_gzip_response(self):
+        """Una respuesta de tamaño mayor al mínimo debería ser comprimida si
+        el cliente acepta gzip."""
+        resp = self.compress(Response(CSV_CONTENT, mimetype='text/csv'),
+                             'gzip')
+
+        self.assertEqual(resp.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(resp.get_data()).decode(),
+                         CSV_CONTENT)
+
+    def test_gzip_streaming_response(self):
+        """Una respuesta streaming debería ser comprimida
+        incrementalmente."""
+        lines = CSV_CONTENT.splitlines(keepends=True)
+        resp = self.compress(Response((line for line in lines),
+                                      mimetype='text/csv'), 'gzip')
+
+        self.assertTrue(resp.is_streamed)
+        self.assertEqual(resp.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(resp.get_data()).decode(),
+                         CSV_CONTENT)
+
+    def test_small_response(self):
+        """Las respuestas de tamaño menor al mínimo no deberían ser
+        comprimidas."""
+        content = 'id,nombre\n06,BUENOS AIRES\n'
+        resp = self.compress(Response((line for line in [content]),
+                                      mimetype='text/csv'), 'gzip')
+
+        self.assertNotIn('Content-Encoding', resp.headers)
+        self.assertEqual(resp.get_data(as_text=True), content)
+
+    def test_no_accepted_encoding(self):
+        """Las respuestas no deberían ser comprimidas si el cliente no acepta
+        ninguna codificación soportada."""
+        resp = self.compress(Response(CSV_CONTENT, mimetype='text/csv'),
+                             'identity')
+
+        self.assertNotIn('Content-Encoding', resp.headers)
+        self.assertIn('Accept-Encoding', resp.vary)
+
+    def test_etag_per_encoding(self):
+        """El ETag de una respuesta comprimida debería ser distinto al de la
+        respuesta sin comprimir."""
+        resp = Response(CSV_CONTENT, mimetype='text/csv')
+        resp.set_etag('foo')
+        resp = self.compress(resp, 'gzip')
+
+        self.assertEqual(resp.get_etag(), ('foo-gzip', False))
+
+    @unittest.skipIf(compression.brotli is None, 'brotli no instalado')
+    def test_brotli_preferred(self):
+        """Si el cliente acepta gzip y brotli con igual calidad, se debería
+        utilizar brotli."""
+        resp = self.compress(Response(CSV_CONTENT, mimetype='text/csv'),
+                             'gzip, br')
+
+        self.assertEqual(resp.headers['Content-Encoding'], 'br')
+        self.assertEqual(
+            compression.brotli.decompress(resp.get_data()).decode(),
+            CSV_CONTENT)
+
+    def test_stats(self):
+        """Se deberían registrar estadísticas de compresión."""
+        before = compression.stats.snapshot().get('gzip', {})
+        resp = self.compress(Response(CSV_CONTENT, mimetype='text/csv'),
+                             'gzip')
+        after = compression.stats.snapshot()['gzip']
+
+        self.assertEqual(after['bytes_originales'] -
+                         before.get('bytes_originales', 0), len(CSV_CONTENT))
+        self.assertEqual(after['bytes_comprimidos'] -
+                         before.get('bytes_comprimidos', 0),
+                         len(resp.get_data()))
+
+    def test_stats_log(self):
+        """Las estadísticas deberían registrarse en el log como máximo una
+        vez por intervalo."""
+        stats = compression.CompressionStats()
+        stats.record('gzip', 1000, 100, 0.5)
+
+        with self.assertLogs('georef.stats', 'INFO') as logs:
+            stats.log_periodically(3600)
+            stats.log_periodically(3600)
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("'bytes_ahorrados': 900", logs.output[0])
+
+    def compress(self, response, accept_encoding):
+        headers = {'Accept-Encoding': accept_encoding}
+        with app.test_request_context(headers=headers):
+            return compression.compress_response(request, response)
@@ -0,0 +1,166 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import TestCase
+from scripts import download
+
+CONTENT = bytes(range(256)) * 64
+ETAG = '"v1"'
+
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    """Servidor HTTP de prueba: sirve 'CONTENT' con el header 'ETag', y
+    responde a los headers 'If-None-Match', 'Range' e 'If-Range'. Si el
+    servidor tiene definido 'range_shift', las respuestas parciales
+    comienzan en una posición distinta a la solicitada.
+
+    """
+
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        etag_matches = self.headers.get('If-Range', ETAG) == ETAG
+        match = re.match(r'bytes=(\d+)-$', self.headers.get('Range', ''))
+
+        if self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.send_header('ETag', ETAG)
+            self.end_headers()
+        elif match and etag_matches:
+            start = int(match.group(1))
+            if start >= len(CONTENT):
+                self.send_response(416)
+                self.send_header('Content-Range',
+                                 'bytes */{}'.format(len(CONTENT)))
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            start = max(start - self.server.range_shift, 0)
+            self.send_content(206, start)
+        else:
+            self.send_content(200, 0)
+
+    def send_content(self, status, start):
+        body = CONTENT[start:]
+        self.send_response(status)
+        self.send_header('ETag', ETAG)
+        self.send_header('Content-Length', str(len(body)))
+        if status == 206:
+            self.send_header('Content-Range', 'bytes {}-{}/{}'.format(
+                start, len(CONTENT) - 1, len(CONTENT)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.sent_bytes += len(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class DownloadToFileTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), RangeRequestHandler)
+        cls.url = 'http://127.0.0.1:{}/datos.json'.format(
+            cls.server.server_port)
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.thread.join()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.sent_bytes = 0
+        self.server.range_shift = 0
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'datos.json')
+        self.part_path = self.path + download.PART_SUFFIX
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_part(self, content):
+        with open(self.part_path, 'wb') as f:
+            f.write(content)
+
+        download.write_metadata(self.part_path, {
+            'url': self.url,
+            'etag': ETAG,
+            'last_modified': None
+        })
+
+    def assert_downloaded(self, metadata):
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), CONTENT)
+
+        self.assertEqual(metadata['sha256'],
+                         hashlib.sha256(CONTENT).hexdigest())
+        self.assertEqual(metadata['size'], len(CONTENT))
+        self.assertEqual(metadata['etag'], ETAG)
+        self.assertFalse(os.path.exists(self.part_path))
+        self.assertFalse(os.path.exists(
+            download.metadata_filepath(self.part_path)))
+
+    def test_download(self):
+        """Sin descargas anteriores, se debería descargar el archivo
+        completo."""
+        metadata = download.download_to_file(self.url, self.path)
+
+        self.assert_downloaded(metadata)
+        self.assertNotIn('Range', self.server.requests[0])
+
+    def test_resume_partial_download(self):
+        """Si existe un archivo parcial, se debería continuar su descarga
+        (HTTP 206)."""
+        self.write_part(CONTENT[:1000])
+        metadata = download.download_to_file(self.url, self.path)
+
+        self.assert_downloaded(metadata)
+        self.assertEqual(self.server.requests[0]['Range'], 'bytes=1000-')
+        self.assertEqual(self.server.requests[0]['If-Range'], ETAG)
+        self.assertEqual(self.server.sent_bytes, len(CONTENT) - 1000)
+
+    def test_not_modified(self):
+        """Si el archivo no fue modificado desde la descarga anterior (HTTP
+        304), no se debería escribir el archivo."""
+        previous = {
+            'url': self.url,
+            'etag': ETAG,
+            'last_modified': None,
+            'sha256': None
+        }
+
+        self.assertIsNone(download.download_to_file(self.url, self.path,
+                                                    previous=previous))
+        self.assertEqual(self.server.requests[0]['If-None-Match'], ETAG)
+        self.assertFalse(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(self.part_path))
+
+    def test_range_not_satisfiable(self):
+        """Si el rango solicitado no es válido (HTTP 416), se debería
+        descargar nuevamente el archivo completo."""
+        self.write_part(CONTENT + b'basura')
+        metadata = download.download_to_file(self.url, self.path)
+
+        self.assert_downloaded(metadata)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertNotIn('Range', self.server.requests[1])
+
+    def test_content_range_mismatch(self):
+        """Si la respuesta parcial no comienza en la posición solicitada,
+        no se debería agregar al archivo parcial, y se debería descargar
+        nuevamente el archivo completo."""
+        self.server.range_shift = 100
+        self.write_part(CONTENT[:1000])
+        metadata = download.download_to_file(self.url, self.path)
+
+        self.assert_downloaded(metadata)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertNotIn('Range', self.server.requests[1])
@@ -1,5 +1,11 @@
 from unittest import TestCase
-from service import formatter
+import unittest
+from service import app, formatter
+from service import names as N
+import copy
+import io
+import json
+import geojson
 
 
 class FormattingTest(TestCase):
@@ -91,3 +97,153 @@ class FormattingTest(TestCase):
                 }
             }
         })
+
+    def test_geojson_response_equivalence(self):
+        """El contenido de una respuesta GeoJSON debería ser equivalente al
+        construido utilizando los objetos de la librería geojson."""
+        items = [
+            {
+                'id': '06',
+                'nombre': 'BUENOS AIRES',
+                'centroide': {
+                    'lat': -36.677,
+                    'lon': -60.558
+                }
+            },
+            {
+                'id': '14',
+                'nombre': 'CÓRDOBA',
+                'centroide': {
+                    'lat': -32.142933,
+                    'lon': -63.801753
+                },
+                'provincia': {
+                    'id': '14',
+                    'nombre': 'CÓRDOBA'
+                }
+            },
+            {
+                'id': '99',
+                'nombre': 'SIN CENTROIDE'
+            }
+        ]
+
+        expected = geojson.FeatureCollection([
+            geojson.Feature(geometry=geojson.Point((
+                item['centroide']['lat'], item['centroide']['lon'])),
+                properties={
+                    key: value for key, value in item.items()
+                    if key != 'centroide'
+                })
+            for item in items
+            if 'centroide' in item
+        ])
+
+        with app.test_request_context():
+            resp = formatter.create_geojson_response(copy.deepcopy(items),
+                                                     True)
+
+        self.assertEqual(json.loads(resp.get_data(as_text=True)),
+                         json.loads(geojson.dumps(expected)))
+
+    def test_geojson_response_single(self):
+        """Se debería poder crear una respuesta GeoJSON a partir de un
+        resultado no iterable con coordenadas 'lat' y 'lon'."""
+        place = {
+            'lat': -27.2741,
+            'lon': -66.7529,
+            'fuente': 'IGN'
+        }
+
+        with app.test_request_context():
+            resp = formatter.create_geojson_response(dict(place), False)
+
+        self.assertEqual(json.loads(resp.get_data(as_text=True)), {
+            'type': 'FeatureCollection',
+            'features': [
+                {
+                    'type': 'Feature',
+                    'geometry': {
+                        'type': 'Point',
+                        'coordinates': [-27.2741, -66.7529]
+                    },
+                    'properties': {
+                        'fuente': 'IGN'
+                    }
+                }
+            ]
+        })
+
+    def test_compact_result(self):
+        """La forma compacta de un resultado debería contener una columna por
+        campo pedido (en el orden de los campos CSV), y una fila por
+        entidad."""
+        result = [
+            {
+                'id': '06',
+                'nombre': 'BUENOS AIRES',
+                'centroide': {'lat': -36.6, 'lon': -60.5}
+            }
+        ]
+
+        fmt = {
+            N.FIELDS: [N.NAME, N.C_LAT, N.ID],
+            N.CSV_FIELDS: formatter.STATES_CSV_FIELDS,
+            N.COMPACT: True
+        }
+
+        compact = formatter.format_result_json(N.STATES, result, fmt, True)
+        compact_flat = formatter.format_result_json(
+            N.STATES, result, dict(fmt, aplanar=True), True)
+
+        self.assertEqual(compact, {
+            'provincias': {
+                'columnas': ['id', 'nombre', 'centroide.lat'],
+                'filas': [['06', 'BUENOS AIRES', -36.6]]
+            }
+        })
+        self.assertEqual(compact_flat['provincias']['columnas'],
+                         ['id', 'nombre', 'centroide_lat'])
+
+    @unittest.skipIf(not formatter.COLUMNAR_FORMATS, 'pyarrow no instalado')
+    def test_columnar_response(self):
+        """Las respuestas Arrow y Parquet deberían contener las mismas
+        columnas que las respuestas CSV, con tipos apropiados."""
+        result = [
+            {
+                'id': '06',
+                'nombre': 'BUENOS AIRES',
+                'centroide': {'lat': -36.6, 'lon': -60.5}
+            },
+            {
+                'id': '14',
+                'nombre': 'CÓRDOBA',
+                'centroide': {'lat': -32.1, 'lon': -63.8}
+            }
+        ]
+
+        tables = {}
+        for output_format in formatter.COLUMNAR_FORMATS:
+            with app.test_request_context():
+                resp = formatter.create_ok_response(
+                    N.STATES, copy.deepcopy(result), {
+                        N.FORMAT: output_format,
+                        N.FIELDS: [N.ID, N.NAME, N.C_LAT, N.C_LON],
+                        N.CSV_FIELDS: formatter.STATES_CSV_FIELDS
+                    })
+                data = resp.get_data()
+
+            if output_format == 'arrow':
+                reader = formatter.pyarrow.ipc.open_stream(data)
+                tables[output_format] = reader.read_all()
+            else:
+                tables[output_format] = formatter.pyarrow.parquet.read_table(
+                    io.BytesIO(data))
+
+        for table in tables.values():
+            self.assertEqual(table.to_pydict(), {
+                'provincia_id': ['06', '14'],
+                'provincia_nombre': ['BUENOS AIRES', 'CÓRDOBA'],
+                'provincia_centroide_lat': [-36.6, -32.1],
+                'provincia_centroide_lon': [-60.5, -63.8]
+            })
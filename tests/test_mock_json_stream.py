@@ -0,0 +1,126 @@
+import io
+import json
+import os
+import tempfile
+from unittest import TestCase
+from scripts import json_stream
+
+DOCUMENT = {
+    'timestamp': '1700000000',
+    'version': '2.0.0',
+    'entidades': [
+        {
+            'id': '06',
+            'nombre': 'BUENOS AIRES',
+            'centroide': {'lat': -36.677, 'lon': -60.5583},
+            'geometria': {
+                'type': 'Polygon',
+                'coordinates': [[[-58.5, -34.25], [-1e-05, 2.5E+3], [0, 0]]]
+            },
+            'poblacion': 17541141,
+            'activa': True,
+            'fuente': None
+        },
+        {'id': '14', 'nombre': 'CÓRDOBA \\"\u00e1\\"', 'vecinos': []},
+        {},
+        []
+    ],
+    'extra': {'a': [1, {'b': 'c'}], 'd': -0.0}
+}
+
+# Separadores con espacios en blanco variados, para que los límites entre
+# lecturas caigan en distintas posiciones
+TEXT = json.dumps(DOCUMENT, indent='\t', separators=(' ,\n', ' : '),
+                  ensure_ascii=False)
+
+
+class JSONStreamParserTest(TestCase):
+    def parse(self, text, chunk_size):
+        parser = json_stream.JSONStreamParser(io.StringIO(text), chunk_size)
+        result = {}
+
+        for key, value in parser.members('entidades'):
+            result[key] = list(value) if key == 'entidades' else value
+
+        return result
+
+    def test_chunk_sizes(self):
+        """El resultado debería ser igual al de 'json.load', sin importar la
+        cantidad de caracteres leídos por vez."""
+        for chunk_size in range(1, len(TEXT) + 2):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(self.parse(TEXT, chunk_size),
+                                 json.loads(TEXT))
+
+    def test_split_number(self):
+        """Un número dividido entre dos lecturas debería decodificarse
+        completo."""
+        text = '{"entidades": [-12.5e+3, 42], "version": 1234}'
+
+        for chunk_size in range(1, len(text) + 1):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(self.parse(text, chunk_size), {
+                    'entidades': [-12500.0, 42],
+                    'version': 1234
+                })
+
+    def test_empty_containers(self):
+        """Un objeto o arreglo de documentos vacío debería ser aceptado."""
+        for chunk_size in [1, 2, 1024]:
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(self.parse(' { } ', chunk_size), {})
+                self.assertEqual(
+                    self.parse('{"entidades" : [ ] }', chunk_size),
+                    {'entidades': []})
+
+    def test_unconsumed_array(self):
+        """Si el generador de documentos no es consumido, sus elementos
+        deberían ser descartados al continuar la iteración."""
+        parser = json_stream.JSONStreamParser(io.StringIO(TEXT), 7)
+        keys = [key for key, _ in parser.members('entidades')]
+
+        self.assertEqual(keys, list(DOCUMENT))
+
+    def test_truncated(self):
+        """Un archivo truncado debería generar un error, sin importar la
+        posición del corte ni la cantidad de caracteres leídos por vez."""
+        for end in range(len(TEXT)):
+            for chunk_size in [1, 5, 1024]:
+                with self.subTest(end=end, chunk_size=chunk_size):
+                    with self.assertRaises(ValueError):
+                        self.parse(TEXT[:end], chunk_size)
+
+    def test_invalid_separator(self):
+        """Un separador inválido entre documentos debería generar un
+        error."""
+        with self.assertRaises(ValueError):
+            self.parse('{"entidades": [1; 2]}', 4)
+
+
+class DataFileTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'datos.json')
+
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(TEXT)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_read_metadata(self):
+        """Se deberían leer los metadatos del archivo y contar sus
+        documentos."""
+        metadata, count = json_stream.read_metadata(self.path, 'entidades')
+
+        self.assertEqual(metadata, {
+            key: value for key, value in DOCUMENT.items()
+            if key != 'entidades'
+        })
+        self.assertEqual(count, len(DOCUMENT['entidades']))
+
+    def test_iter_documents(self):
+        """Se deberían recorrer los documentos del archivo."""
+        self.assertEqual(
+            list(json_stream.iter_documents(self.path, 'entidades')),
+            DOCUMENT['entidades'])
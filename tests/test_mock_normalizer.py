@@ -1,11 +1,18 @@
 import elasticsearch
 import psycopg2
 import logging
+import json
+import msgpack
 
 from unittest import TestCase
 from unittest import mock
 import random
-from service import app
+import unittest
+import copy
+import gzip
+import os
+import tempfile
+from service import app, snapshots, formatter, params, data
 
 ENDPOINTS = [
     '/calles',
@@ -17,11 +24,26 @@ ENDPOINTS = [
 
 MOCK_STREET = {
     'nomenclatura': 'SANTA FE, SAAVEDRA, BUENOS AIRES',
-    'inicio_derecha': 0,
-    'fin_izquierda': 1000,
+    'altura': {
+        'inicio': {
+            'derecha': 0
+        },
+        'fin': {
+            'izquierda': 1000
+        }
+    },
     'geometria': None
 }
 
+MOCK_STATE = {
+    'id': '06',
+    'nombre': 'BUENOS AIRES',
+    'centroide': {
+        'lat': -36.677,
+        'lon': -60.558
+    }
+}
+
 logging.getLogger('georef').setLevel(logging.CRITICAL)
 
 
@@ -31,6 +53,12 @@ class NormalizerTest(TestCase):
         self.app = app.test_client()
         self.base_url = '/api/v1.0'
 
+        # Evitar reutilizar conexiones (mocks) creadas en otras pruebas
+        for attr in ['elasticsearch', 'postgres_pool', 'index_names_cache',
+                     'name_ids_cache']:
+            if hasattr(app, attr):
+                delattr(app, attr)
+
     @mock.patch("elasticsearch.Elasticsearch", autospec=True)
     def test_elasticsearch_connection_error(self, es):
         """Se debería devolver un error 500 cuando falla la conexión a
@@ -61,6 +89,7 @@ class NormalizerTest(TestCase):
     def test_elasticsearch_msearch_error(self, es):
         """Se debería devolver un error 500 cuando falla la query
         MultiSearch."""
+        self.set_index_aliases(es)
         es.return_value.msearch.side_effect = \
             elasticsearch.ElasticsearchException()
         self.assert_500_error(random.choice(ENDPOINTS))
@@ -69,6 +98,7 @@ class NormalizerTest(TestCase):
     def test_elasticsearch_msearch_results_error(self, es):
         """Se debería devolver un error 500 cuando falla la query
         MultiSearch (retorna errores)."""
+        self.set_index_aliases(es)
         es.return_value.msearch.return_value = {
             'responses': [
                 {
@@ -82,15 +112,509 @@ class NormalizerTest(TestCase):
 
         self.assert_500_error(random.choice(ENDPOINTS))
 
+    @mock.patch("elasticsearch.Elasticsearch", autospec=True)
+    def test_bulk_ndjson_format(self, es):
+        """El formato NDJSON en bulk debería devolver una línea JSON por
+        consulta, en el mismo orden que las consultas."""
+        self.set_msearch_responses(es, [[MOCK_STATE], []])
+        resp = self.app.post(self.base_url + '/provincias', json={
+            'provincias': [
+                {'nombre': 'buenos aires'},
+                {'nombre': 'foobar'}
+            ],
+            'formato': 'ndjson'
+        })
+
+        lines = resp.get_data(as_text=True).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [
+            {'provincias': [dict(MOCK_STATE, fuente='IGN')]},
+            {'provincias': []}
+        ])
+
+    @mock.patch("elasticsearch.Elasticsearch", autospec=True)
+    def test_bulk_msgpack_format(self, es):
+        """El formato MessagePack en bulk debería devolver la misma
+        estructura que el formato JSON."""
+        self.set_msearch_responses(es, [[MOCK_STATE], []])
+        body = {
+            'provincias': [
+                {'nombre': 'buenos aires'},
+                {'nombre': 'foobar'}
+            ]
+        }
+
+        resp_json = self.app.post(self.base_url + '/provincias', json=body)
+        resp_msgpack = self.app.post(self.base_url + '/provincias',
+                                     json=dict(body, formato='msgpack'))
+
+        self.assertEqual(resp_msgpack.mimetype, 'application/x-msgpack')
+        self.assertEqual(msgpack.unpackb(resp_msgpack.get_data(), raw=False),
+                         resp_json.json)
+
+    @mock.patch("elasticsearch.Elasticsearch", autospec=True)
+    def test_bulk_compact(self, es):
+        """El parámetro 'compacto' debería aplicarse a cada consulta de una
+        operación bulk por separado."""
+        self.set_msearch_responses(es, [[MOCK_STATE], [MOCK_STATE]])
+        resp = self.app.post(self.base_url + '/provincias', json={
+            'provincias': [
+                {'nombre': 'buenos aires', 'compacto': True,
+                 'campos': 'id,nombre'},
+                {'nombre': 'buenos aires', 'campos': 'id,nombre'}
+            ]
+        })
+
+        self.assertEqual(resp.json['resultados'], [
+            {
+                'provincias': {
+                    'columnas': ['id', 'nombre', 'fuente'],
+                    'filas': [['06', 'BUENOS AIRES', 'IGN']]
+                }
+            },
+            {
+                'provincias': [
+                    {'id': '06', 'nombre': 'BUENOS AIRES', 'fuente': 'IGN'}
+                ]
+            }
+        ])
+
+    @mock.patch("elasticsearch.Elasticsearch", autospec=True)
+    def test_multi_bulk(self, es):
+        """Las consultas a distintas entidades deberían ejecutarse con una
+        única búsqueda MultiSearch, indicando el índice de cada consulta, y
+        sus resultados deberían devolverse en el orden recibido."""
+        street = {'id': '0614001000010', 'nombre': 'SANTA FE'}
+        self.set_msearch_responses(es, [[MOCK_STATE], [street]])
+
+        resp = self.app.post(self.base_url + '/consultas', json={
+            'consultas': [
+                {'provincias': {'nombre': 'buenos aires',
+                                'campos': 'id,nombre'}},
+                {'calles': {'nombre': 'santa fe', 'campos': 'id,nombre'}}
+            ]
+        })
+        body = es.return_value.msearch.call_args[1]['body']
+
+        self.assertEqual(es.return_value.msearch.call_count, 1)
+        self.assertEqual([header['index'] for header in body[::2]],
+                         [['provincias'], ['calles']])
+        self.assertEqual(resp.json['resultados'], [
+            {
+                'provincias': [
+                    {'id': '06', 'nombre': 'BUENOS AIRES', 'fuente': 'IGN'}
+                ]
+            },
+            {
+                'calles': [
+                    {'id': '0614001000010', 'nombre': 'SANTA FE',
+                     'fuente': 'INDEC'}
+                ]
+            }
+        ])
+
+    @mock.patch("elasticsearch.Elasticsearch", autospec=True)
+    def test_bulk_id_lookup(self, es):
+        """Las consultas bulk que solo especifican un ID deberían resolverse
+        con una única búsqueda por índice, y sus resultados deberían
+        asignarse a cada consulta según el ID."""
+        state = {'id': '14', 'nombre': 'CÓRDOBA'}
+        self.set_msearch_responses(es, [[MOCK_STATE], [MOCK_STATE, state]])
+
+        resp = self.app.post(self.base_url + '/provincias', json={
+            'provincias': [
+                {'id': '14'},
+                {'nombre': 'buenos aires'},
+                {'id': '06', 'campos': 'id'},
+                {'id': '99'},
+                {'id': '14'}
+            ]
+        })
+        body = es.return_value.msearch.call_args[1]['body']
+
+        self.assertEqual(len(body), 4)
+        self.assertEqual(body[3]['query'],
+                         {'terms': {'id': ['14', '06', '99']}})
+        self.assertEqual([
+            [match['id'] for match in result['provincias']]
+            for result in resp.json['resultados']
+        ], [['14'], ['06'], ['06'], [], ['14']])
+
+    @mock.patch("elasticsearch.Elasticsearch", autospec=True)
+    def test_name_cascade(self, es):
+        """Con la búsqueda por niveles activada, solo las consultas sin
+        resultados deberían pasar al siguiente nivel de búsqueda."""
+        state = {'id': '14', 'nombre': 'CÓRDOBA'}
+        self.set_index_aliases(es)
+        es.return_value.msearch.side_effect = [
+            {'responses': [
+                {'hits': {'hits': [{'_source': dict(MOCK_STATE)}]}},
+                {'hits': {'hits': []}},
+                {'hits': {'hits': []}}
+            ]},
+            {'responses': [
+                {'hits': {'hits': [{'_source': dict(state)}]}},
+                {'hits': {'hits': []}}
+            ]}
+        ]
+        stats = data.name_tier_stats.snapshot()
+
+        with mock.patch.dict(app.config, {'NAME_CASCADE_ENABLED': True}):
+            resp = self.app.post(self.base_url + '/provincias', json={
+                'provincias': [
+                    {'nombre': 'buenos aires'},
+                    {'nombre': 'cordo'},
+                    {'nombre': 'xyz'}
+                ]
+            })
+
+        first, second = [call[1]['body']
+                         for call in es.return_value.msearch.call_args_list]
+        self.assertIn('nombre.exacto', first[1]['query']['match'])
+        self.assertEqual(second[1]['query'], {
+            'match_phrase_prefix': {'nombre': {'query': 'cordo'}}
+        })
+        self.assertEqual(second[3]['query']['match']['nombre']['fuzziness'],
+                         data.DEFAULT_FUZZINESS)
+        self.assertEqual([
+            [match['id'] for match in result['provincias']]
+            for result in resp.json['resultados']
+        ], [['06'], ['14'], []])
+
+        new_stats = data.name_tier_stats.snapshot()
+        for tier in [data.TIER_EXACT, data.TIER_PREFIX, 'sin_resultados']:
+            self.assertEqual(new_stats[tier], stats.get(tier, 0) + 1)
+
+    def test_name_tier_stats_log(self):
+        """Las estadísticas de búsquedas por nombre en niveles deberían
+        registrarse en el log como máximo una vez por intervalo."""
+        stats = data.NameTierStats()
+        stats.record(data.TIER_EXACT)
+        stats.record(None)
+
+        with self.assertLogs('georef.stats', 'INFO') as logs:
+            stats.log_periodically(3600)
+            stats.log_periodically(3600)
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("'sin_resultados': 1", logs.output[0])
+
+    @mock.patch("elasticsearch.Elasticsearch", autospec=True)
+    def test_routing(self, es):
+        """Las búsquedas sobre localidades y calles con un ID de provincia
+        (o un ID del cual derivarlo) deberían especificar un routing."""
+        self.set_msearch_results(es, [])
+        msearch = es.return_value.msearch
+        urls = [
+            ('/localidades?provincia=06', '06'),
+            ('/localidades?departamento=14007', '14'),
+            ('/calles?id=0602101000010', '06'),
+            ('/localidades?nombre=rosario', None),
+            ('/provincias?id=06', None)
+        ]
+
+        with mock.patch.dict(app.config, {'ROUTING_ENABLED': True}):
+            for url, routing in urls:
+                self.app.get(self.base_url + url)
+                header = msearch.call_args[1]['body'][0]
+                self.assertEqual(header.get('routing'), routing)
+
+    @mock.patch("elasticsearch.Elasticsearch", autospec=True)
+    def test_accept_msgpack(self, es):
+        """Si no se especifica el parámetro 'formato', se debería elegir el
+        formato de la respuesta utilizando el header Accept."""
+        self.set_msearch_results(es, [MOCK_STATE])
+        url = self.base_url + '/provincias'
+
+        resp_msgpack = self.app.get(url, headers={
+            'Accept': 'application/x-msgpack'
+        })
+        resp_json = self.app.get(url, headers={
+            'Accept': 'application/x-msgpack;q=0.5, application/json'
+        })
+        resp_param = self.app.get(url + '?formato=json', headers={
+            'Accept': 'application/x-msgpack'
+        })
+
+        self.assertEqual(resp_msgpack.mimetype, 'application/x-msgpack')
+        self.assertEqual(msgpack.unpackb(resp_msgpack.get_data(), raw=False),
+                         resp_json.json)
+        self.assertIn('Accept', resp_msgpack.vary)
+        self.assertEqual(resp_param.mimetype, 'application/json')
+        self.assertNotIn('Accept', resp_param.vary)
+
+    @mock.patch("elasticsearch.Elasticsearch", autospec=True)
+    def test_bulk_csv_format(self, es):
+        """El formato CSV en bulk debería incluir el índice de la consulta que
+        generó cada fila, y la unión de los campos pedidos."""
+        self.set_msearch_responses(es, [[], [MOCK_STATE, MOCK_STATE]])
+        resp = self.app.post(self.base_url + '/provincias', json={
+            'provincias': [
+                {'nombre': 'foobar', 'campos': 'id,centroide.lat'},
+                {'nombre': 'buenos aires', 'campos': 'id,nombre'}
+            ],
+            'formato': 'csv'
+        })
+
+        self.assertEqual(resp.get_data(as_text=True).splitlines(), [
+            'indice_consulta,provincia_id,provincia_nombre,'
+            'provincia_centroide_lat,provincia_fuente',
+            '1,06,BUENOS AIRES,,IGN',
+            '1,06,BUENOS AIRES,,IGN'
+        ])
+
+    @mock.patch("elasticsearch.Elasticsearch", autospec=True)
+    def test_etag(self, es):
+        """Las respuestas GET deberían incluir un ETag, igual para consultas
+        con parámetros equivalentes."""
+        self.set_msearch_results(es, [MOCK_STATE])
+        resp1 = self.app.get(self.base_url + '/provincias?nombre=bs&max=5')
+        resp2 = self.app.get(self.base_url + '/provincias?max=5&nombre=bs')
+        resp3 = self.app.get(self.base_url + '/provincias?nombre=bs')
+
+        etag, weak = resp1.get_etag()
+        self.assertTrue(etag and not weak)
+        self.assertEqual(resp2.get_etag(), (etag, False))
+        self.assertNotEqual(resp3.get_etag(), (etag, False))
+
+    @mock.patch("elasticsearch.Elasticsearch", autospec=True)
+    def test_etag_index_change(self, es):
+        """El ETag de una consulta debería cambiar al cambiar el índice
+        apuntado por el alias."""
+        self.set_msearch_results(es, [MOCK_STATE])
+        resp1 = self.app.get(self.base_url + '/provincias')
+
+        self.set_index_aliases(es, 'provincias-2')
+        app.index_names_cache.clear()
+        resp2 = self.app.get(self.base_url + '/provincias')
+
+        self.assertNotEqual(resp1.get_etag(), resp2.get_etag())
+
+    @mock.patch("elasticsearch.Elasticsearch", autospec=True)
+    def test_if_none_match(self, es):
+        """Una request con un ETag vigente en If-None-Match debería recibir
+        una respuesta 304, sin realizar búsquedas."""
+        self.set_msearch_results(es, [MOCK_STATE])
+        url = self.base_url + '/provincias?nombre=bs'
+        etag, _ = self.app.get(url).get_etag()
+        es.return_value.msearch.reset_mock()
+
+        for tag in [etag, etag + '-gzip']:
+            resp = self.app.get(url, headers={
+                'If-None-Match': '"{}"'.format(tag)
+            })
+
+            self.assertEqual(resp.status_code, 304)
+            self.assertEqual(resp.get_etag(), (tag, False))
+
+        self.assertFalse(es.return_value.msearch.called)
+
+    @mock.patch("elasticsearch.Elasticsearch", autospec=True)
+    def test_cache_headers(self, es):
+        """Las respuestas GET deberían incluir los alias de los índices
+        utilizados en el header Surrogate-Key."""
+        self.set_msearch_results(es, [MOCK_STREET])
+        resp = self.app.get(self.base_url + '/calles?nombre=santa fe')
+
+        self.assertEqual(resp.headers['Surrogate-Key'], 'calles')
+        self.assertTrue(resp.cache_control.public)
+        self.assertIn('X-Accel-Expires', resp.headers)
+
+    @mock.patch("elasticsearch.Elasticsearch", autospec=True)
+    def test_hierarchy_name_ids(self, es):
+        """Los nombres de entidades contenedoras deberían resolverse a IDs
+        con una búsqueda previa, reutilizada en consultas posteriores."""
+        self.set_msearch_responses(es, [[MOCK_STATE]])
+        msearch = es.return_value.msearch
+        url = self.base_url + '/departamentos?provincia=buenos aires'
+
+        self.app.get(url)
+        self.app.get(url + '&max=5')
+
+        lookup, search = [call[1]['body']
+                          for call in msearch.call_args_list[:2]]
+        self.assertEqual(lookup[1]['_source'], {'include': ['id']})
+        self.assertEqual(search[1]['query'],
+                         {'terms': {'provincia.id': ['06']}})
+
+        # La segunda consulta no debería volver a resolver el nombre
+        self.assertEqual(msearch.call_count, 3)
+
+    @mock.patch("elasticsearch.Elasticsearch", autospec=True)
+    def test_snapshots(self, es):
+        """Las consultas sin filtros deberían ser respondidas utilizando los
+        snapshots generados, sin realizar búsquedas."""
+        self.set_msearch_results(es, [MOCK_STATE])
+        url = self.base_url + '/provincias?formato=csv'
+        expected = self.app.get(url).get_data()
+
+        with tempfile.TemporaryDirectory() as directory:
+            with mock.patch.dict(app.config, {'SNAPSHOTS_DIR': directory}), \
+                    mock.patch.object(snapshots, 'SNAPSHOT_ENTITIES',
+                                      ['provincias']):
+                etags = snapshots.generate_snapshots(app, directory)
+                self.assertEqual(len(os.listdir(directory)),
+                                 len(set(etags)) * 2)
+
+                es.return_value.msearch.reset_mock()
+                resp_gzip = self.app.get(url, headers={
+                    'Accept-Encoding': 'gzip'
+                })
+                resp_plain = self.app.get(url)
+
+        self.assertFalse(es.return_value.msearch.called)
+        self.assertEqual(resp_gzip.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(resp_gzip.get_data()), expected)
+        self.assertEqual(resp_plain.get_data(), expected)
+        self.assertEqual(resp_plain.mimetype, 'text/csv')
+
+    @mock.patch("elasticsearch.Elasticsearch", autospec=True)
+    def test_cursor_pagination(self, es):
+        """Las consultas paginadas por cursor deberían incluir el cursor de la
+        página siguiente, generado a partir de los valores de ordenamiento
+        del último resultado."""
+        self.set_msearch_results(es, [MOCK_STATE])
+        es.return_value.msearch.side_effect = None
+        es.return_value.msearch.return_value = {
+            'responses': [{
+                'hits': {
+                    'hits': [{'_source': MOCK_STATE.copy(), 'sort': ['06']}]
+                }
+            }]
+        }
+
+        resp = self.app.get(self.base_url + '/provincias?cursor=*&max=1')
+        cursor = params.encode_cursor(['06'])
+
+        self.assertEqual(resp.json['siguiente'], cursor)
+        self.assertIn('cursor=' + cursor, resp.headers['Link'])
+        self.assertTrue(resp.headers['Link'].endswith('rel="next"'))
+
+        resp = self.app.get(self.base_url + '/provincias',
+                            query_string={'cursor': cursor, 'max': 2})
+        _, query = es.return_value.msearch.call_args[1]['body']
+
+        self.assertIsNone(resp.json['siguiente'])
+        self.assertNotIn('Link', resp.headers)
+        self.assertEqual(query['search_after'], ['06'])
+        self.assertEqual(query['sort'], ['id'])
+
+    @mock.patch("elasticsearch.Elasticsearch", autospec=True)
+    def test_count_groups(self, es):
+        """Las consultas de conteo no deberían obtener documentos, y deberían
+        poder utilizar el caché de requests de Elasticsearch."""
+        self.set_index_aliases(es)
+        es.return_value.msearch.return_value = {
+            'responses': [{
+                'hits': {'total': 12, 'hits': []},
+                'aggregations': {
+                    'grupos': {
+                        'buckets': [
+                            {'key': '06', 'doc_count': 10},
+                            {'key': '14', 'doc_count': 2}
+                        ]
+                    }
+                }
+            }]
+        }
+
+        resp = self.app.get(self.base_url + '/localidades',
+                            query_string={'nombre': 'san martin',
+                                          'agrupar': 'provincia.id'})
+        header, query = es.return_value.msearch.call_args[1]['body']
+
+        self.assertEqual(resp.json, {
+            'cantidad': 12,
+            'grupos': [
+                {'id': '06', 'cantidad': 10},
+                {'id': '14', 'cantidad': 2}
+            ]
+        })
+        self.assertTrue(header['request_cache'])
+        self.assertEqual(query['size'], 0)
+        self.assertEqual(query['aggs']['grupos']['terms']['field'],
+                         'provincia.id')
+
+        resp = self.app.get(self.base_url + '/localidades',
+                            query_string={'agrupar': 'provincia.id',
+                                          'formato': 'csv'})
+
+        self.assertEqual(resp.get_data(as_text=True).splitlines(),
+                         ['provincia_id,cantidad', '06,10', '14,2'])
+
+    @mock.patch("elasticsearch.Elasticsearch", autospec=True)
+    def test_export_csv(self, es):
+        """El recurso de exportación debería devolver todos los documentos
+        del índice en formato CSV (formato por defecto), obtenidos por
+        lotes."""
+        batches = [[MOCK_STATE] * 3, [MOCK_STATE] * 2, []]
+        es.return_value.search = mock.MagicMock(
+            return_value=self.scroll_response(batches[0]))
+        es.return_value.scroll = mock.MagicMock(side_effect=[
+            self.scroll_response(batch) for batch in batches[1:]
+        ])
+        es.return_value.clear_scroll = mock.MagicMock()
+
+        resp = self.app.get(self.base_url + '/provincias/exportar')
+        lines = resp.get_data(as_text=True).splitlines()
+
+        self.assertEqual(resp.mimetype, 'text/csv')
+        self.assertEqual(lines[0], 'provincia_id,provincia_nombre,' +
+                         'provincia_centroide_lat,provincia_centroide_lon,' +
+                         'provincia_fuente')
+        self.assertEqual(lines[1:],
+                         ['06,BUENOS AIRES,-36.677,-60.558,IGN'] * 5)
+
+    @unittest.skipIf(not formatter.COLUMNAR_FORMATS, 'pyarrow no instalado')
+    @mock.patch("elasticsearch.Elasticsearch", autospec=True)
+    def test_export_arrow(self, es):
+        """El recurso de exportación debería devolver todos los documentos
+        del índice en formato Arrow, obtenidos por lotes."""
+        batches = [[MOCK_STATE] * 3, [MOCK_STATE] * 2, []]
+        # Los métodos del cliente aceptan parámetros adicionales (no
+        # incluidos en su firma) vía kwargs
+        es.return_value.search = mock.MagicMock(
+            return_value=self.scroll_response(batches[0]))
+        es.return_value.scroll = mock.MagicMock(side_effect=[
+            self.scroll_response(batch) for batch in batches[1:]
+        ])
+        es.return_value.clear_scroll = mock.MagicMock()
+
+        resp = self.app.get(self.base_url + '/provincias/exportar',
+                            query_string={'formato': 'arrow'})
+        table = formatter.pyarrow.ipc.open_stream(resp.get_data()).read_all()
+
+        self.assertEqual(resp.mimetype, 'application/vnd.apache.arrow.stream')
+        self.assertEqual(table.num_rows, 5)
+        self.assertEqual(table.column('provincia_fuente').to_pylist(),
+                         ['IGN'] * 5)
+
     def assert_500_error(self, url):
         resp = self.app.get(self.base_url + url)
         self.assertTrue(resp.status_code == 500 and 'errores' in resp.json)
 
+    def scroll_response(self, results):
+        # Respuesta de una búsqueda utilizando la API scroll
+        return {
+            '_scroll_id': 'mock',
+            '_shards': {'total': 1, 'successful': 1, 'skipped': 0},
+            'hits': {
+                'hits': [{'_source': result.copy()} for result in results]
+            }
+        }
+
+    def set_index_aliases(self, mock_es, index='index-1'):
+        # Índices concretos apuntados por los alias consultados
+        mock_es.return_value.indices = mock.MagicMock()
+        mock_es.return_value.indices.get_alias.return_value = {
+            index: {'aliases': {}}
+        }
+
     def set_msearch_results(self, mock_es, results):
         # Resultados para una búsqueda de una query sola
         hits = [{'_source': result.copy()} for result in results]
 
-        mock_es.return_value.msearch.return_value = {
+        self.set_index_aliases(mock_es)
+        response = {
             'responses': [
                 {
                     'hits': {
@@ -99,3 +623,24 @@ class NormalizerTest(TestCase):
                 }
             ]
         }
+
+        # Devolver una copia en cada búsqueda, ya que los resultados son
+        # modificados al generar las respuestas
+        mock_es.return_value.msearch.side_effect = \
+            lambda *args, **kwargs: copy.deepcopy(response)
+
+    def set_msearch_responses(self, mock_es, results_list):
+        # Resultados para una búsqueda de varias queries
+        self.set_index_aliases(mock_es)
+        mock_es.return_value.msearch.return_value = {
+            'responses': [
+                {
+                    'hits': {
+                        'hits': [
+                            {'_source': result.copy()} for result in results
+                        ]
+                    }
+                }
+                for results in results_list
+            ]
+        }
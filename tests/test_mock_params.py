@@ -1,6 +1,7 @@
 from unittest import TestCase
 from service import app
 from service.params import ParamErrorType as T
+from service.params import encode_cursor
 from random import choice
 
 ENDPOINTS = [
@@ -286,6 +287,44 @@ class ParamParsingTest(TestCase):
             {(T.VALUE_ERROR.value, 'max')}
         ], body=body)
 
+    def test_invalid_cursor_param(self):
+        """El parámetro 'cursor' no debería aceptar valores que no hayan sido
+        generados por la API."""
+        self.assert_errors_match(choice(ENDPOINTS) + '?cursor=foobar', {
+            (T.VALUE_ERROR.value, 'cursor')
+        })
+
+    def test_cursor_param_values(self):
+        """El parámetro 'cursor' no debería aceptar cursores con valores de
+        ordenamiento no escalares."""
+        for values in [[{}], [[1]], ['06', None]]:
+            url = '/provincias?cursor=' + encode_cursor(values)
+            self.assert_errors_match(url, {
+                (T.VALUE_ERROR.value, 'cursor')
+            })
+
+    def test_cursor_param_order(self):
+        """El parámetro 'cursor' no debería aceptar cursores generados para
+        otro orden de resultados."""
+        url = '/provincias?orden=nombre&cursor=' + encode_cursor(['06'])
+        self.assert_errors_match(url, {
+            (T.VALUE_ERROR.value, 'cursor')
+        })
+
+    def test_count_format(self):
+        """Las consultas de conteo no deberían aceptar formatos que no puedan
+        representar cantidades."""
+        self.assert_errors_match('/provincias?cantidad&formato=geojson', {
+            (T.INVALID_CHOICE.value, 'formato')
+        })
+
+    def test_count_group_choice(self):
+        """El parámetro 'agrupar' debería tomar uno de los valores
+        permitidos."""
+        self.assert_errors_match('/departamentos?agrupar=departamento.id', {
+            (T.INVALID_CHOICE.value, 'agrupar')
+        })
+
     def test_empty_float_param(self):
         """Los parámtros de tipo float no deberían aceptar strings
         vacíos."""
@@ -368,6 +407,58 @@ class ParamParsingTest(TestCase):
             }
         ], body=body)
 
+    def test_multi_bulk_errors(self):
+        """En consultas a distintas entidades, los errores de cada operación
+        deberían informarse en la posición en que fue recibida."""
+        body = {
+            'consultas': [
+                {'provincias': {'nombre': 'cordoba'}},
+                {'ubicaciones': {'lat': 0, 'lon': 0}},
+                {'calles': {'foo': 'bar'}},
+                {'provincias': {'nombre': ''}}
+            ]
+        }
+
+        self.assert_errors_match('/consultas', [
+            set(),
+            {(T.INVALID_BULK_ENTRY.value, 'body')},
+            {(T.UNKNOWN_PARAM.value, 'foo')},
+            {(T.VALUE_ERROR.value, 'nombre')}
+        ], body=body)
+
+    def test_multi_bulk_max_sum(self):
+        """En consultas a distintas entidades, la suma de los parámetros
+        'max' de todas las operaciones no debería superar el límite."""
+        body = {
+            'consultas': [
+                {'provincias': {'nombre': 'cordoba', 'max': 3000}},
+                {'municipios': {'nombre': 'capital'}},
+                {'departamentos': {'nombre': 'capital', 'max': 3000}}
+            ]
+        }
+
+        self.assert_errors_match('/consultas', [
+            {(T.INVALID_SET.value, 'max')},
+            {(T.INVALID_SET.value, 'max')},
+            {(T.INVALID_SET.value, 'max')}
+        ], body=body)
+
+    def test_bulk_invalid_format(self):
+        """En bulk, el parámetro 'formato' del body debería tomar uno de los
+        valores permitidos."""
+        body = {
+            'provincias': [
+                {
+                    'nombre': 'cordoba'
+                }
+            ],
+            'formato': 'geojson'
+        }
+
+        self.assert_errors_match('/provincias', [
+            {(T.INVALID_CHOICE.value, 'formato')}
+        ], body=body)
+
     def assert_errors_match(self, url, errors_set, body=None, method=None):
         url = self.url_base + url
         if not method: